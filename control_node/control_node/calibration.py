@@ -59,17 +59,20 @@ class Calibration:
 
         # TODO: set exposure on camera node automatically when detecting laser
         self.camera_client.set_exposure(0.001)
-        self.laser_client.start_laser(color=self.laser_color)
-
-        self.laser_client.set_color([0.0, 0.0, 0.0])
-        self.laser_client.start_laser()
+        self.laser_client.command(color=[0.0, 0.0, 0.0], play=True)
         for laser_pixel in pending_calibration_laser_pixels:
-            self.laser_client.set_point(laser_pixel)
-            self.laser_client.set_color(self.laser_color)
-            # Wait for galvo to settle and for camera frame capture
-            time.sleep(1)
+            # Move and turn on the laser in one update, so that no frame shows the laser at the
+            # previous point
+            update_id = self.laser_client.command(
+                points=[laser_pixel], color=self.laser_color
+            )
+            # Wait until the point is being drawn. add_point_correspondence keeps polling the
+            # camera until a frame containing it has been captured
+            self._wait_for_laser_update(update_id)
             self.add_point_correspondence(laser_pixel)
-            self.laser_client.set_color([0.0, 0.0, 0.0])
+            # Make sure the point is off before moving on, so it can't be captured again
+            update_id = self.laser_client.command(color=[0.0, 0.0, 0.0])
+            self._wait_for_laser_update(update_id)
 
         self.laser_client.stop_laser()
         self.camera_client.set_exposure(-1.0)
@@ -94,6 +97,10 @@ class Calibration:
 
         return True
 
+    def _wait_for_laser_update(self, update_id):
+        if not self.laser_client.wait_for_update(update_id) and self.logger:
+            self.logger.warning(f"Laser update {update_id} was not acknowledged")
+
     def camera_point_to_laser_pixel(self, camera_point):
         homogeneous_camera_point = np.hstack((camera_point, 1))
         transformed_point = homogeneous_camera_point @ self.camera_to_laser_transform
@@ -173,9 +173,13 @@ class Correct(State):
         laser_send_point = self.calibration.camera_point_to_laser_pixel(
             blackboard.curr_track.pos_wrt_cam
         )
-        self.laser_client.start_laser(
+        update_id = self.laser_client.start_laser(
             point=laser_send_point, color=self.tracking_laser_color
         )
+        # Don't count camera frames captured before the laser was on as missing the laser. 0
+        # if the point was rejected, so there is nothing to wait for
+        if update_id:
+            self.laser_client.wait_for_update(update_id)
         self.missing_laser_count = 0
         self.logger.info(
             f"laser_send_point: {laser_send_point} tracking_laser_color{self.tracking_laser_color}"
@@ -205,6 +209,7 @@ class Correct(State):
                 if self.missing_laser_count > 20:
                     self.logger.info("Laser missing during state correct")
                     return False
+                # Wait for the next camera frame
                 time.sleep(0.05)
                 return self._correct_laser(laser_send_point, blackboard)
 
@@ -213,6 +218,7 @@ class Correct(State):
             if self.missing_laser_count > 20:
                 self.logger.info("Laser missing during state correct")
                 return False
+            # Wait for the next camera frame
             time.sleep(0.05)
             return self._correct_laser(laser_send_point, blackboard)
 
@@ -237,7 +243,10 @@ class Correct(State):
                 self.logger.info("Failed to reach pos, outside of laser window")
                 return False
 
-            self.laser_client.set_point(laser_send_point)
+            update_id = self.laser_client.set_point(laser_send_point)
+            # Wait until the moved point is being drawn before looking for it again
+            if update_id:
+                self.laser_client.wait_for_update(update_id)
             self.missing_laser_count = 0
             return self._correct_laser(new_point, blackboard)
 
@@ -268,12 +277,18 @@ class Burn(State):
         self.logger.info("Entering State Burn")
         self.node.publish_state("Burn")
 
-        # Turn on burn laser
-        self.laser_client.start_laser(
-            point=blackboard.curr_track.corrected_laser_point,
-            color=self.burn_color,
+        # Burn for exactly burn_time_secs, timed by the laser node. Callbacks are still handled
+        # while waiting for the pulse to end
+        update_id = self.laser_client.pulse(
+            [blackboard.curr_track.corrected_laser_point],
+            self.burn_color,
+            self.burn_time_secs,
         )
-        time.sleep(self.burn_time_secs)
+        pulse_done = self.laser_client.wait_for_pulse(
+            update_id, timeout_sec=self.burn_time_secs + 1.0
+        )
+        if pulse_done is None or not pulse_done.completed:
+            self.logger.warning("Burn pulse did not complete")
 
         self.laser_client.stop_laser()
         self.runner_tracker.deactivate(blackboard.curr_track)
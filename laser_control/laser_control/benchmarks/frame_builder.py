@@ -0,0 +1,104 @@
+"""File: frame_builder.py
+
+Description: Benchmark comparing the vectorized FrameBuilder against the original per-laxel
+ctypes loop used to build DAC frames.
+
+Usage:
+
+  python3 -m laser_control.benchmarks.frame_builder --pps 30000 100000 --num_points 1 4 16
+"""
+
+import argparse
+import random
+import timeit
+
+from laser_control.laser_dac.frame_builder import FrameBuilder
+from laser_control.laser_dac.helios import (
+    HELIOS_POINT_DTYPE,
+    MAX_COLOR,
+    HeliosPoint,
+)
+
+
+def build_frame_loop(points, color, fps=30, pps=30000, transition_duration_ms=0.5):
+    """Reference implementation of the original per-laxel frame builder."""
+    laxels_per_transition = round(transition_duration_ms / (1000 / pps))
+    ppf = pps / fps
+    num_points = len(points)
+    laxels_per_point = round(ppf if num_points == 0 else ppf / num_points)
+    laxels_per_frame = (
+        laxels_per_point if num_points == 0 else laxels_per_point * num_points
+    )
+
+    FrameType = HeliosPoint * (laxels_per_frame)
+    frame = FrameType()
+
+    if num_points == 0:
+        for frameLaxelIdx in range(laxels_per_frame):
+            frame[frameLaxelIdx] = HeliosPoint(0, 0, 0, 0, 0, 0)
+    else:
+        for pointIdx, point in enumerate(points):
+            for laxelIdx in range(laxels_per_point):
+                isTransition = num_points > 1 and laxelIdx < laxels_per_transition
+                frameLaxelIdx = pointIdx * laxels_per_point + laxelIdx
+                frame[frameLaxelIdx] = HeliosPoint(
+                    int(point[0]),
+                    int(point[1]),
+                    0 if isTransition else int(color[0] * MAX_COLOR),
+                    0 if isTransition else int(color[1] * MAX_COLOR),
+                    0 if isTransition else int(color[2] * MAX_COLOR),
+                    0 if isTransition else int(color[3] * MAX_COLOR),
+                )
+    return frame
+
+
+def main(fps_list, pps_list, num_points_list, repeat):
+    color = (1.0, 0.0, 0.0, 0.1)
+    builder = FrameBuilder(HELIOS_POINT_DTYPE, MAX_COLOR)
+
+    print(
+        f"{'fps':>5} {'pps':>7} {'points':>7} {'loop (ms)':>10} {'numpy (ms)':>11} {'speedup':>8}"
+    )
+    for fps in fps_list:
+        for pps in pps_list:
+            for num_points in num_points_list:
+                points = [
+                    (random.randint(0, 4095), random.randint(0, 4095))
+                    for _ in range(num_points)
+                ]
+                loop_time = min(
+                    timeit.repeat(
+                        lambda: build_frame_loop(points, color, fps, pps),
+                        number=1,
+                        repeat=repeat,
+                    )
+                )
+                numpy_time = min(
+                    timeit.repeat(
+                        lambda: builder.build(points, color, fps, pps),
+                        number=1,
+                        repeat=repeat,
+                    )
+                )
+                print(
+                    f"{fps:>5} {pps:>7} {num_points:>7} {loop_time * 1000:>10.3f} "
+                    f"{numpy_time * 1000:>11.3f} {loop_time / numpy_time:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the vectorized frame builder against the per-laxel loop"
+    )
+    parser.add_argument("--fps", type=int, nargs="+", default=[30])
+    parser.add_argument("--pps", type=int, nargs="+", default=[30000, 65535, 100000])
+    parser.add_argument("--num_points", type=int, nargs="+", default=[0, 1, 4, 16])
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=20,
+        help="Number of frames to build per configuration. The fastest run is reported",
+    )
+
+    args = parser.parse_args()
+    main(args.fps, args.pps, args.num_points, args.repeat)
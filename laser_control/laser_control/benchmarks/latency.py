@@ -0,0 +1,159 @@
+"""File: latency.py
+
+Description: Measure the latency from a point update until the first frame containing it is
+written to the DAC. In local mode, the simulated DAC is driven in-process, and the time until
+the new point is actually emitted is reported as well. In ROS mode, updates are sent to a
+running laser control node with LaserNodeClient, so the latency includes the service hop.
+
+Usage:
+
+  python3 -m laser_control.benchmarks.latency --mode local --chunk_duration_ms 3
+  python3 -m laser_control.benchmarks.latency --mode ros --laser_node_name laser0
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+
+def print_percentiles(name, latencies_s):
+    latencies_ms = np.asarray(latencies_s, dtype=np.float64) * 1000
+    latencies_ms = latencies_ms[~np.isnan(latencies_ms)]
+    if len(latencies_ms) == 0:
+        print(f"  {name}: no samples")
+        return
+    p50, p95, p99 = np.percentile(latencies_ms, (50, 95, 99))
+    print(
+        f"  {name}: p50={p50:.2f} ms p95={p95:.2f} ms p99={p99:.2f} ms"
+        f" max={latencies_ms.max():.2f} ms (n={len(latencies_ms)})"
+    )
+
+
+def random_point():
+    return (random.randint(0, 4095), random.randint(0, 4095))
+
+
+def run_local(num_updates, fps, pps, prerender_frames, chunk_duration_ms):
+    from laser_control.laser_dac import SimDAC
+    from laser_control.laser_dac.sim import ETHER_DREAM_FIFO_DEPTH
+
+    # Chunks are streamed to a simulated FIFO, so that chunks queued ahead of the output show up
+    # in the latency
+    dac = SimDAC(fifo_depth=ETHER_DREAM_FIFO_DEPTH if chunk_duration_ms > 0 else None)
+    dac.initialize()
+    dac.connect(0)
+    dac.set_points([random_point()])
+    dac.play(fps, pps, 0.5, prerender_frames, chunk_duration_ms)
+
+    written_latencies = []
+    sent_times = []
+    for _ in range(num_updates):
+        # Send updates at random phases relative to the frames being written
+        time.sleep(random.uniform(0.5, 1.5) / fps)
+        point = random_point()
+        sent_time = time.monotonic()
+        sent_times.append((point, time.perf_counter()))
+        generation = dac.set_points([point])
+        written_latencies.append(
+            dac.written_time - sent_time
+            if dac.wait_for_generation(generation, timeout=1.0)
+            else np.nan
+        )
+    # Let the last update play out
+    time.sleep(0.2)
+    dac.stop()
+
+    # The simulated device records when each laxel was emitted, using time.perf_counter()
+    recording = dac.device.get_recording()
+    lit = recording[recording["i"] > 0]
+    emitted_latencies = []
+    for point, sent_time in sent_times:
+        emitted = lit[
+            (lit["x"] == point[0]) & (lit["y"] == point[1]) & (lit["t"] >= sent_time)
+        ]
+        emitted_latencies.append(
+            emitted["t"][0] - sent_time if len(emitted) > 0 else np.nan
+        )
+    dac.close()
+
+    print(
+        f"Local simulated DAC: {fps} fps, {pps} pps, prerender_frames={prerender_frames},"
+        f" chunk_duration_ms={chunk_duration_ms}"
+    )
+    print_percentiles("set_points to frame written", written_latencies)
+    print_percentiles("set_points to point emitted", emitted_latencies)
+
+
+def run_ros(num_updates, laser_node_name):
+    import rclpy
+
+    from laser_control.laser_node_client import LaserNodeClient
+    from laser_control_interfaces.msg import UpdateWritten
+
+    rclpy.init()
+    node = rclpy.create_node("laser_latency_benchmark")
+    node.logger = node.get_logger()
+    laser_client = LaserNodeClient(node, laser_node_name)
+    written = {}
+    node.create_subscription(
+        UpdateWritten,
+        f"/{laser_node_name}/update_written",
+        lambda msg: written.__setitem__(msg.update_id, msg),
+        100,
+    )
+    laser_client.wait_active()
+    laser_client.start_laser(point=random_point())
+
+    service_latencies = []
+    written_latencies = []
+    node_latencies = []
+    for _ in range(num_updates):
+        time.sleep(random.uniform(0.01, 0.05))
+        sent_time = time.monotonic()
+        update_id = laser_client.set_points([random_point()])
+        service_latencies.append(time.monotonic() - sent_time)
+        deadline = time.monotonic() + 1.0
+        while update_id not in written and time.monotonic() < deadline:
+            rclpy.spin_once(node, timeout_sec=0.01)
+        msg = written.pop(update_id, None)
+        written_latencies.append(
+            msg.written_time - sent_time if msg is not None else np.nan
+        )
+        node_latencies.append(
+            msg.written_time - msg.received_time if msg is not None else np.nan
+        )
+
+    laser_client.stop_laser()
+    node.destroy_node()
+    rclpy.shutdown()
+
+    print(f"Laser control node: {laser_node_name}")
+    print_percentiles("set_points service call", service_latencies)
+    print_percentiles("set_points to frame written", written_latencies)
+    print_percentiles("received by node to frame written", node_latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure point update to DAC write latency"
+    )
+    parser.add_argument("--mode", choices=("local", "ros"), default="local")
+    parser.add_argument("--num_updates", type=int, default=200)
+    parser.add_argument("--laser_node_name", default="laser0")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--pps", type=int, default=30000)
+    parser.add_argument("--prerender_frames", type=int, default=0)
+    parser.add_argument("--chunk_duration_ms", type=float, default=0.0)
+    args = parser.parse_args()
+    if args.mode == "local":
+        run_local(
+            args.num_updates,
+            args.fps,
+            args.pps,
+            args.prerender_frames,
+            args.chunk_duration_ms,
+        )
+    else:
+        run_ros(args.num_updates, args.laser_node_name)
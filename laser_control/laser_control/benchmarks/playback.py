@@ -0,0 +1,143 @@
+"""File: playback.py
+
+Description: Run DAC playback against the simulated DAC and report throughput, underflow and
+latency statistics. Does not require any hardware.
+
+Usage:
+
+  python3 -m laser_control.benchmarks.playback --num_points 4 --duration 5
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from laser_control.laser_dac import SimDAC
+
+
+def main(
+    num_points,
+    fps,
+    pps,
+    transition_duration_ms,
+    duration,
+    slew_rate,
+    optimize_path,
+    blanking_distances=None,
+    blanking_scales=None,
+    prerender_frames=0,
+    load_threads=0,
+):
+    dac = SimDAC(slew_rate=slew_rate)
+    dac.initialize()
+    dac.connect(0)
+    dac.set_color(1.0, 0.0, 0.0, 0.1)
+    dac.set_path_optimization(optimize_path)
+    dac.set_blanking_curve(blanking_distances, blanking_scales)
+    dac.set_points(
+        [(random.randint(0, 4095), random.randint(0, 4095)) for _ in range(num_points)]
+    )
+
+    # Simulate a node busy handling service calls by holding the GIL from other threads
+    loaded = True
+
+    def load():
+        while loaded:
+            sum(range(10000))
+
+    for _ in range(load_threads):
+        threading.Thread(target=load, daemon=True).start()
+
+    start = time.process_time()
+    dac.play(fps, pps, transition_duration_ms, prerender_frames)
+    time.sleep(duration)
+    prerender_stats = dac.get_prerender_stats()
+    dac.stop()
+    cpu_time = time.process_time() - start
+    loaded = False
+
+    stats = dac.device.get_stats()
+    wait_stats = dac.get_wait_stats()
+    telemetry = dac.get_telemetry()
+    dac.close()
+
+    print(f"Target: {fps} fps, {pps} pps, {num_points} points")
+    for key, value in stats.items():
+        print(
+            f"  {key}: {value:.6g}" if isinstance(value, float) else f"  {key}: {value}"
+        )
+    print(f"  wait_stats: {wait_stats}")
+    print(f"  prerender_stats: {prerender_stats}")
+    for name, histogram in telemetry.items():
+        print(
+            f"  {name}: p50={histogram['p50']:.4g} p95={histogram['p95']:.4g}"
+            f" p99={histogram['p99']:.4g} max={histogram['max']:.4g}"
+        )
+    print(f"  cpu_utilization: {cpu_time / duration:.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure DAC playback performance using the simulated DAC"
+    )
+    parser.add_argument("--num_points", type=int, default=4)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--pps", type=int, default=30000)
+    parser.add_argument("--transition_duration_ms", type=float, default=0.5)
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="Playback duration in seconds"
+    )
+    parser.add_argument(
+        "--slew_rate",
+        type=float,
+        default=2.0e6,
+        help="Simulated galvo slew rate in DAC units per second",
+    )
+
+    parser.add_argument(
+        "--optimize_path",
+        action="store_true",
+        help="Reorder points to minimize galvo travel",
+    )
+
+    parser.add_argument(
+        "--blanking_distances",
+        type=float,
+        nargs="+",
+        help="Jump distances of the blanking curve, as fractions of the field width",
+    )
+    parser.add_argument(
+        "--blanking_scales",
+        type=float,
+        nargs="+",
+        help="Fraction of the transition duration to blank for each blanking curve distance",
+    )
+
+    parser.add_argument(
+        "--prerender_frames",
+        type=int,
+        default=0,
+        help="Number of frames to render ahead of the DAC in a separate thread",
+    )
+    parser.add_argument(
+        "--load_threads",
+        type=int,
+        default=0,
+        help="Number of busy threads competing for the GIL during playback",
+    )
+
+    args = parser.parse_args()
+    main(
+        args.num_points,
+        args.fps,
+        args.pps,
+        args.transition_duration_ms,
+        args.duration,
+        args.slew_rate,
+        args.optimize_path,
+        args.blanking_distances,
+        args.blanking_scales,
+        args.prerender_frames,
+        args.load_threads,
+    )
@@ -1,2 +1,6 @@
 from .helios import HeliosDAC
 from .ether_dream import EtherDreamDAC
+from .sim import SimDAC
+from .dac_group import LaserDACGroup
+from .subprocess_dac import SubprocessDAC
+from .point_store import PlaybackParams
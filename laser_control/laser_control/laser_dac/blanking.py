@@ -0,0 +1,67 @@
+import numpy as np
+
+
+class BlankingModel:
+    """Scales the blanking time before each point by the distance the galvos have to jump.
+
+    The curve maps jump distance, as a fraction of the width of the DAC's field, to a fraction of
+    the transition duration (which is the blanking time needed for a full-field jump). Values in
+    between are linearly interpolated, so short hops can be given almost no blanking while long
+    jumps still get enough time for the galvos to settle.
+
+    Example usage:
+
+      # No blanking for tiny hops, ramping up to the full transition duration for half-field jumps
+      model = BlankingModel(distances=[0.0, 0.01, 0.5], scales=[0.0, 0.2, 1.0])
+      laxels = model.transition_laxels(points, field_size=4095, pps=30000, transition_duration_ms=0.5)
+
+    :param distances: increasing jump distances, as fractions of the field width
+    :param scales: fraction of the transition duration to blank for each distance
+    """
+
+    def __init__(self, distances=(0.0, 1.0), scales=(1.0, 1.0)):
+        distances = np.asarray(distances, dtype=np.float64)
+        scales = np.asarray(scales, dtype=np.float64)
+        if (
+            distances.ndim != 1
+            or len(distances) == 0
+            or distances.shape != scales.shape
+        ):
+            raise ValueError(
+                "Blanking curve distances and scales must be non-empty and the same length"
+            )
+        if np.any(np.diff(distances) <= 0):
+            raise ValueError("Blanking curve distances must be strictly increasing")
+        if np.any(scales < 0):
+            raise ValueError("Blanking curve scales must not be negative")
+        self.distances = distances
+        self.scales = scales
+
+    def transition_laxels(self, points, field_size, pps, transition_duration_ms):
+        """Return the number of blanking laxels to render before each point.
+
+        Frames are played back to back, so the first point is reached by jumping from the last.
+
+        :param points: (N, 2) array of points, in render order
+        :param field_size: width of the DAC's field, in DAC units
+        :param pps: target points per second
+        :param transition_duration_ms: blanking duration in ms for a full-field jump
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) < 2:
+            return np.zeros(len(points), dtype=np.intp)
+
+        jumps = np.linalg.norm(points - np.roll(points, 1, axis=0), axis=1) / field_size
+        return self.laxels_for_jumps(jumps, pps, transition_duration_ms)
+
+    def laxels_for_jumps(self, jumps, pps, transition_duration_ms):
+        """Return the number of blanking laxels to render for each jump.
+
+        :param jumps: array of jump distances, as fractions of the width of the DAC's field
+        :param pps: target points per second
+        :param transition_duration_ms: blanking duration in ms for a full-field jump
+        """
+        durations_ms = np.interp(jumps, self.distances, self.scales) * (
+            transition_duration_ms
+        )
+        return np.rint(durations_ms * pps / 1000).astype(np.intp)
@@ -0,0 +1,334 @@
+import threading
+import time
+
+import numpy as np
+
+from .point_store import to_point_arrays
+
+
+def _bounds_rect(bounds):
+    """Return (x_min, y_min, x_max, y_max) of the corners returned by LaserDAC.get_bounds."""
+    bounds = np.asarray(bounds, dtype=np.float64)
+    return np.concatenate((bounds.min(axis=0), bounds.max(axis=0)))
+
+
+class LaserDACGroup:
+    """Drives several DACs that together cover one workspace, such as projectors covering
+    adjacent sections of a bed, through a single interface.
+
+    Each DAC covers a rectangular region of the workspace, (x_min, y_min, x_max, y_max), which is
+    mapped linearly onto the DAC's full bounds. Points are given in workspace coordinates and
+    are routed to the DAC whose region contains them (the first one, if regions overlap). Points
+    outside of every region are ignored. Each DAC keeps its own point set and plays back in its
+    own thread, so a batch of points for all DACs is applied with a single call.
+
+    Methods that change the points return a list with the generation of each DAC's resulting
+    point set. See LaserDAC.
+
+    By default, the regions tile the DACs' fields side by side along x, so with a single DAC,
+    workspace coordinates are the same as DAC coordinates.
+
+    Example usage:
+
+      group = LaserDACGroup([dac0, dac1], regions=[(0, 0, 4095, 4095), (4096, 0, 8191, 4095)])
+      group.set_points([(100, 200), (5000, 300)])  # One point for each DAC
+      group.play()
+
+    :param dacs: connected LaserDACs
+    :param regions: optional sequence of (x_min, y_min, x_max, y_max) workspace regions, one
+    per DAC
+    """
+
+    def __init__(self, dacs, regions=None):
+        self.dacs = list(dacs)
+        self._dac_rects = np.array(
+            [_bounds_rect(dac.get_bounds(1.0)) for dac in self.dacs]
+        ).reshape(-1, 4)
+        if regions is None:
+            regions = self.default_regions(self._dac_rects)
+        regions = np.asarray(regions, dtype=np.float64).reshape(-1, 4)
+        if len(regions) != len(self.dacs):
+            raise ValueError(
+                f"Expected {len(self.dacs)} DAC regions, but got {len(regions)}"
+            )
+        if np.any(regions[:, 2:] <= regions[:, :2]):
+            raise ValueError("DAC region min coordinates must be less than max")
+        self.regions = regions
+        # Indices of the DACs that points were added to, for remove_point
+        self._added_to = []
+        # Serializes point updates, so that concurrent updates are applied to every DAC in the
+        # same order
+        self._lock = threading.Lock()
+        # Serializes play and stop, so that concurrent calls leave every DAC in the same state.
+        # Separate from _lock, so that point updates never wait for playback threads to join
+        self._playback_lock = threading.Lock()
+
+    @staticmethod
+    def default_regions(dac_rects):
+        """Return regions that tile the given DAC fields side by side along x.
+
+        :param dac_rects: (N, 4) array of (x_min, y_min, x_max, y_max) DAC bounds
+        """
+        dac_rects = np.asarray(dac_rects, dtype=np.float64).reshape(-1, 4)
+        widths = dac_rects[:, 2] - dac_rects[:, 0] + 1
+        x_offsets = np.cumsum(widths) - widths
+        regions = dac_rects.copy()
+        regions[:, 0] += x_offsets
+        regions[:, 2] += x_offsets
+        return regions
+
+    @property
+    def playing(self):
+        return any(dac.playing for dac in self.dacs)
+
+    def _route(self, points):
+        """Return the index of the DAC each point belongs to (-1 if none), and the points in
+        the coordinates of that DAC."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        in_region = np.all(
+            (points[:, np.newaxis, :] >= self.regions[np.newaxis, :, :2])
+            & (points[:, np.newaxis, :] <= self.regions[np.newaxis, :, 2:]),
+            axis=2,
+        )
+        dac_idxs = np.where(in_region.any(axis=1), in_region.argmax(axis=1), -1)
+        return dac_idxs, self._to_dac(points, np.maximum(dac_idxs, 0))
+
+    def _to_dac(self, points, dac_idxs):
+        regions = self.regions[dac_idxs]
+        dac_rects = self._dac_rects[dac_idxs]
+        dac_points = (points - regions[:, :2]) / (regions[:, 2:] - regions[:, :2]) * (
+            dac_rects[:, 2:] - dac_rects[:, :2]
+        ) + dac_rects[:, :2]
+        # Guard against rounding errors pushing points on the edge of a region out of bounds
+        return np.clip(dac_points, dac_rects[:, :2], dac_rects[:, 2:])
+
+    def _generations(self):
+        return [dac.point_store.snapshot().generation for dac in self.dacs]
+
+    def set_color(self, r=1.0, g=1.0, b=1.0, i=1.0):
+        with self._lock:
+            return [dac.set_color(r, g, b, i) for dac in self.dacs]
+
+    def get_bounds(self, scale=1.0):
+        """Return an array of points representing the corners of the outer bounds of the workspace"""
+        x_min, y_min = self.regions[:, :2].min(axis=0).tolist()
+        x_max, y_max = self.regions[:, 2:].max(axis=0).tolist()
+        x_offset = round((x_max - x_min) / 2 * (1.0 - scale))
+        y_offset = round((y_max - y_min) / 2 * (1.0 - scale))
+        return [
+            (x_min + x_offset, y_min + y_offset),
+            (x_min + x_offset, y_max - y_offset),
+            (x_max - x_offset, y_max - y_offset),
+            (x_max - x_offset, y_min + y_offset),
+        ]
+
+    def in_bounds(self, x, y):
+        return bool(self._route([(x, y)])[0][0] >= 0)
+
+    def add_point(self, x, y):
+        with self._lock:
+            generations = self._generations()
+            dac_idxs, dac_points = self._route([(x, y)])
+            if dac_idxs[0] >= 0:
+                dac_idx = dac_idxs[0]
+                generations[dac_idx] = self.dacs[dac_idx].add_point(*dac_points[0])
+                self._added_to.append(dac_idx)
+            return generations
+
+    def add_points(self, points, weights=None, colors=None):
+        """Append a batch of points, routing each point to its DAC.
+
+        :param points: (N, 2) array or sequence of (x, y) points, in workspace coordinates
+        :param weights: optional sequence of per-point dwell weights
+        :param colors: optional sequence of per-point (r, g, b, i) colors, or None to use the
+        global color
+        """
+        points, weights, colors = to_point_arrays(points, weights, colors)
+        dac_idxs, dac_points = self._route(points)
+        with self._lock:
+            generations = self._generations()
+            for dac_idx, dac in enumerate(self.dacs):
+                point_idxs = np.flatnonzero(dac_idxs == dac_idx)
+                if len(point_idxs) > 0:
+                    generations[dac_idx] = dac.add_points(
+                        dac_points[point_idxs], weights[point_idxs], colors[point_idxs]
+                    )
+            # remove_point removes points in the order they were added
+            self._added_to.extend(dac_idxs[dac_idxs >= 0].tolist())
+            return generations
+
+    def set_points(
+        self, points, weights=None, colors=None, color=None, playback_params=None
+    ):
+        """Replace all points of all DACs in a single call, routing each point to its DAC.
+
+        :param points: (N, 2) array or sequence of (x, y) points, in workspace coordinates
+        :param weights: optional sequence of per-point dwell weights
+        :param colors: optional sequence of per-point (r, g, b, i) colors, or None to use the
+        global color
+        :param color: optional new global (r, g, b, i) color, applied together with the points
+        :param playback_params: optional new PlaybackParams, applied together with the points
+        """
+        points, weights, colors = to_point_arrays(points, weights, colors)
+        dac_idxs, dac_points = self._route(points)
+        with self._lock:
+            generations = []
+            for dac_idx, dac in enumerate(self.dacs):
+                point_idxs = np.flatnonzero(dac_idxs == dac_idx)
+                generations.append(
+                    dac.set_points(
+                        dac_points[point_idxs],
+                        weights[point_idxs],
+                        colors[point_idxs],
+                        color=color,
+                        playback_params=playback_params,
+                    )
+                )
+            self._added_to = []
+            return generations
+
+    def set_paths(self, paths, color=None, playback_params=None):
+        """Replace all points and paths of all DACs, routing each polyline to the DAC whose region
+        contains the centroid of its vertices.
+
+        :param paths: sequence of polylines, each a sequence of (x, y) vertices, in workspace
+        coordinates
+        :param color: optional new global (r, g, b, i) color, applied together with the paths
+        :param playback_params: optional new PlaybackParams, applied together with the paths
+        """
+        with self._lock:
+            dac_paths = [[] for _ in self.dacs]
+            for path in paths:
+                vertices = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+                if len(vertices) == 0:
+                    continue
+                dac_idx = self._route(vertices.mean(axis=0))[0][0]
+                if dac_idx >= 0:
+                    dac_paths[dac_idx].append(
+                        self._to_dac(vertices, np.full(len(vertices), dac_idx))
+                    )
+            self._added_to = []
+            return [
+                dac.set_paths(polylines, color, playback_params)
+                for dac, polylines in zip(self.dacs, dac_paths)
+            ]
+
+    def remove_point(self):
+        """Remove the last added point."""
+        with self._lock:
+            generations = self._generations()
+            if self._added_to:
+                dac_idx = self._added_to.pop()
+                generations[dac_idx] = self.dacs[dac_idx].remove_point()
+            return generations
+
+    def clear_points(self):
+        with self._lock:
+            self._added_to = []
+            return [dac.clear_points() for dac in self.dacs]
+
+    def wait_for_generations(self, generations, timeout=None):
+        """Block until every DAC has written a frame rendered from its given generation. Returns
+        whether they all have. See LaserDAC.wait_for_generation.
+
+        :param generations: list of per-DAC generations returned by a method that changed the
+        points
+        :param timeout: max time to wait in seconds, or None to wait indefinitely
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for dac, generation in zip(self.dacs, generations):
+            remaining = (
+                None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            )
+            if not dac.wait_for_generation(generation, remaining):
+                return False
+        return True
+
+    def pulse(
+        self, generations, duration_s, off_color=(0.0, 0.0, 0.0, 0.0), callback=None
+    ):
+        """Pulse every DAC. See LaserDAC.pulse.
+
+        :param generations: list of per-DAC generations returned by the method that turned the
+        laser on
+        :param duration_s: on time, in seconds
+        :param off_color: (r, g, b, i) global color to set at the end of the pulse
+        :param callback: optional callable, called with (on_time, off_time, completed) once the
+        pulse has ended on every DAC, where on_time is the earliest and off_time the latest of
+        all DACs. off_time is None if the pulse was cancelled on any DAC, and completed is False
+        unless the pulse ran for its full duration on every DAC
+        """
+        results = []
+        results_lock = threading.Lock()
+
+        def on_dac_done(on_time, off_time, completed):
+            with results_lock:
+                results.append((on_time, off_time, completed))
+                if len(results) < len(self.dacs):
+                    return
+            on_times = [on for on, _, _ in results if on is not None]
+            off_times = [off for _, off, _ in results]
+            callback(
+                min(on_times, default=None),
+                None if None in off_times else max(off_times),
+                all(completed for _, _, completed in results),
+            )
+
+        with self._lock:
+            for dac, generation in zip(self.dacs, generations):
+                dac.pulse(
+                    generation,
+                    duration_s,
+                    off_color,
+                    on_dac_done if callback is not None else None,
+                )
+
+    def set_path_optimization(self, enabled):
+        for dac in self.dacs:
+            dac.set_path_optimization(enabled)
+
+    def set_blanking_curve(self, distances=None, scales=None):
+        for dac in self.dacs:
+            dac.set_blanking_curve(distances, scales)
+
+    def set_path_params(self, speed=10.0, corner_dwell_ms=0.2):
+        for dac in self.dacs:
+            dac.set_path_params(speed, corner_dwell_ms)
+
+    def set_playback_params(
+        self, fps=30, pps=30000, transition_duration_ms=0.5, color=None
+    ):
+        """Set the playback params of every DAC. See LaserDAC.set_playback_params."""
+        with self._lock:
+            return [
+                dac.set_playback_params(fps, pps, transition_duration_ms, color)
+                for dac in self.dacs
+            ]
+
+    def play(
+        self,
+        fps=30,
+        pps=30000,
+        transition_duration_ms=0.5,
+        prerender_frames=0,
+        chunk_duration_ms=0.0,
+    ):
+        with self._playback_lock:
+            for dac in self.dacs:
+                dac.play(
+                    fps,
+                    pps,
+                    transition_duration_ms,
+                    prerender_frames,
+                    chunk_duration_ms,
+                )
+
+    def stop(self):
+        with self._playback_lock:
+            for dac in self.dacs:
+                dac.stop()
+
+    def close(self):
+        self.stop()
+        for dac in self.dacs:
+            dac.close()
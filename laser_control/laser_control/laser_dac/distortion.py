@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class DistortionCorrection:
+    """Maps ideal coordinates to corrected DAC coordinates, to compensate for the geometric
+    (e.g. pincushion) distortion of the galvos.
+
+    The correction is a dense precomputed table of corrected (x, y) DAC coordinates, sampled on
+    a regular grid of ideal coordinates. Coordinates in between grid samples are bilinearly
+    interpolated, and coordinates outside of the grid are extrapolated from the nearest cell.
+
+    Tables are loaded from either a .npy file, containing just the (rows, cols, 2) table with the
+    grid spanning the DAC's bounds, or a .npz file, containing the table as "table" and,
+    optionally, the ideal coordinate range of the grid as "x_range" and "y_range".
+
+    Example usage:
+
+      correction = DistortionCorrection.load("galvo_lut.npz", dac.get_bounds())
+      corrected_points = correction.apply(points)
+
+    :param table: (rows, cols, 2) array of corrected (x, y) coordinates. Rows are spaced evenly
+    over y_range and columns over x_range
+    :param x_range: (min, max) ideal x coordinate of the grid
+    :param y_range: (min, max) ideal y coordinate of the grid
+    """
+
+    def __init__(self, table, x_range, y_range):
+        table = np.asarray(table, dtype=np.float64)
+        if table.ndim != 3 or table.shape[2] != 2 or min(table.shape[:2]) < 2:
+            raise ValueError(
+                "Distortion table must have shape (rows, cols, 2) with at least 2 rows and cols"
+            )
+        if x_range[1] <= x_range[0] or y_range[1] <= y_range[0]:
+            raise ValueError("Distortion table ranges must be increasing")
+        self.table = table
+        self.x_range = (float(x_range[0]), float(x_range[1]))
+        self.y_range = (float(y_range[0]), float(y_range[1]))
+
+    @classmethod
+    def load(cls, file, bounds):
+        """Load a table from a .npy or .npz file.
+
+        :param file: path to the file
+        :param bounds: corners of the DAC's bounds, as returned by LaserDAC.get_bounds(). Used as
+        the range of the grid when the file does not specify one
+        """
+        bounds = np.asarray(bounds, dtype=np.float64)
+        x_range = (bounds[:, 0].min(), bounds[:, 0].max())
+        y_range = (bounds[:, 1].min(), bounds[:, 1].max())
+        data = np.load(file)
+        if isinstance(data, np.ndarray):
+            return cls(data, x_range, y_range)
+        with data:
+            return cls(
+                data["table"],
+                data["x_range"] if "x_range" in data else x_range,
+                data["y_range"] if "y_range" in data else y_range,
+            )
+
+    def apply(self, points):
+        """Return the corrected DAC coordinates for an (N, 2) array of ideal coordinates."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        rows, cols = self.table.shape[:2]
+        # Fractional grid indices of each point, and the cell that contains it
+        col = (points[:, 0] - self.x_range[0]) / (self.x_range[1] - self.x_range[0])
+        row = (points[:, 1] - self.y_range[0]) / (self.y_range[1] - self.y_range[0])
+        col *= cols - 1
+        row *= rows - 1
+        col0 = np.clip(np.floor(col).astype(np.intp), 0, cols - 2)
+        row0 = np.clip(np.floor(row).astype(np.intp), 0, rows - 2)
+        tx = (col - col0)[:, np.newaxis]
+        ty = (row - row0)[:, np.newaxis]
+
+        top = self.table[row0, col0] * (1 - tx) + self.table[row0, col0 + 1] * tx
+        bottom = (
+            self.table[row0 + 1, col0] * (1 - tx) + self.table[row0 + 1, col0 + 1] * tx
+        )
+        return top * (1 - ty) + bottom * ty
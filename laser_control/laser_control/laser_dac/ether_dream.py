@@ -1,6 +1,9 @@
 import ctypes
+import json
+import os
+import numpy as np
+from .frame_builder import FrameBuilder
 from .laser_dac import LaserDAC
-import threading
 import time
 
 
@@ -11,6 +14,11 @@ Y_BOUNDS = (-32768, 32767)
 # Ether Dream DAC uses 16 bits (unsigned) for r, g, b, i
 MAX_COLOR = 65535
 
+# Ether Dream DACs broadcast once per second, so after this long, broadcasts from all online
+# DACs have been seen
+DISCOVERY_ROUND_S = 1.2
+DISCOVERY_POLL_INTERVAL_S = 0.01
+
 
 # Define point structure for Ether Dream
 class EtherDreamPoint(ctypes.Structure):
@@ -26,6 +34,10 @@ class EtherDreamPoint(ctypes.Structure):
     ]
 
 
+# NumPy equivalent of EtherDreamPoint, so that frames can be passed to the native library without copying
+ETHER_DREAM_POINT_DTYPE = np.dtype(EtherDreamPoint)
+
+
 class EtherDreamError(Exception):
     """Exception used when an error is detected with EtherDream."""
 
@@ -35,9 +47,17 @@ class EtherDreamError(Exception):
 class EtherDreamDAC(LaserDAC):
     """Ether Dream DAC
 
+    Ether Dream max rate: 100K pps
+
+    DACs are discovered by the broadcasts they send once per second, which the native library
+    keeps listening for in a background thread, so the table of known DACs stays up to date
+    without blocking. The order DACs are discovered in can change between runs, so when
+    id_cache_file is given, the ID of the DAC connected at each index is saved there, and later
+    runs connect to the same DAC as soon as its broadcast is seen.
+
     Example usage:
 
-      dac = EtherDreamDAC()
+      dac = EtherDreamDAC("libEtherDream.so", "ether_dream_ids.json")
       num_connected_dacs = dac.initialize()
       dac.connect(0)
 
@@ -52,40 +72,121 @@ class EtherDreamDAC(LaserDAC):
       dac.close()
     """
 
-    def __init__(self, lib_file):
-        self.points = []
-        self.points_lock = threading.Lock()
-        self.color = (1, 1, 1, 1)  # (r, g, b, i)
-        self.playing = False
+    supports_chunked_streaming = True
+
+    # time.monotonic() when the native library, which is shared by all instances, started
+    # listening for DACs
+    discovery_start_time = None
+    # DAC index -> ID of the DACs connected by instances in this process
+    connected_dac_ids = {}
+
+    def __init__(self, lib_file, id_cache_file=None):
+        """
+        :param lib_file: path to the native Ether Dream library
+        :param id_cache_file: optional path to a JSON file for the IDs of the DACs connected at
+        each index
+        """
+        super().__init__()
+        self.frame_builder = FrameBuilder(ETHER_DREAM_POINT_DTYPE, MAX_COLOR)
         self.connected_dac_id = 0
         self.lib = ctypes.cdll.LoadLibrary(lib_file)
+        self.id_cache_file = id_cache_file
 
     def initialize(self):
-        """Initialize the native library and search for online DACs"""
+        """Initialize the native library and start searching for online DACs in the background.
+        Returns the number of DACs found so far, without waiting for their broadcasts."""
 
         print("Initializing Ether Dream DAC")
-        self.lib.etherdream_lib_start()
-        print("Finding available Ether Dream DACs...")
-
-        # Ether Dream DACs broadcast once per second, so we need to wait for a bit
-        # longer than that to ensure that we see broadcasts from all online DACs
-        time.sleep(1.2)
-
+        if EtherDreamDAC.discovery_start_time is None:
+            self.lib.etherdream_lib_start()
+            EtherDreamDAC.discovery_start_time = time.monotonic()
         dac_count = self.lib.etherdream_dac_count()
-        print(f"Found {dac_count} Ether Dream DACs")
+        print(f"Found {dac_count} Ether Dream DACs so far")
         return dac_count
 
-    def connect(self, dac_idx):
+    def get_dac_ids(self):
+        """Return the IDs of the DACs found so far, in the order they were found."""
+        return [
+            self.lib.etherdream_get_id(idx)
+            for idx in range(self.lib.etherdream_dac_count())
+        ]
+
+    def _load_cached_ids(self):
+        if self.id_cache_file is None or not os.path.exists(self.id_cache_file):
+            return {}
+        try:
+            with open(self.id_cache_file) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read Ether Dream DAC IDs from {self.id_cache_file}: {e}")
+            return {}
+
+    def _save_cached_id(self, dac_idx, dac_id):
+        if self.id_cache_file is None:
+            return
+        cached_ids = self._load_cached_ids()
+        cached_ids[str(dac_idx)] = dac_id
+        try:
+            cache_dir = os.path.dirname(os.path.abspath(self.id_cache_file))
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(self.id_cache_file, "w") as f:
+                json.dump(cached_ids, f)
+        except OSError as e:
+            print(f"Could not save Ether Dream DAC IDs to {self.id_cache_file}: {e}")
+
+    def _find_dac_id(self, dac_idx, timeout):
+        """Wait until the DAC at dac_idx has been found, and return its ID."""
+        cached_ids = {
+            int(idx): dac_id for idx, dac_id in self._load_cached_ids().items()
+        }
+        cached_ids.update(EtherDreamDAC.connected_dac_ids)
+        cached_id = cached_ids.pop(dac_idx, None)
+        deadline = time.monotonic() + timeout
+        while True:
+            dac_ids = self.get_dac_ids()
+            if cached_id is not None and cached_id in dac_ids:
+                return cached_id
+            # The discovery order is only known once every DAC has had a chance to broadcast.
+            # By then, a cached DAC that has not been found is not online, so fall back to the
+            # order. DACs that are online and cached or connected at other indices are taken,
+            # so the remaining indices are assigned to the remaining DACs in order
+            round_done = (
+                time.monotonic() - EtherDreamDAC.discovery_start_time
+                >= DISCOVERY_ROUND_S
+            )
+            taken = {
+                idx: dac_id for idx, dac_id in cached_ids.items() if dac_id in dac_ids
+            }
+            unclaimed_ids = [
+                dac_id for dac_id in dac_ids if dac_id not in taken.values()
+            ]
+            unclaimed_idx = dac_idx - sum(1 for idx in taken if idx < dac_idx)
+            if round_done and unclaimed_idx < len(unclaimed_ids):
+                return unclaimed_ids[unclaimed_idx]
+            if time.monotonic() >= deadline:
+                raise EtherDreamError(
+                    f"Could not find DAC {dac_idx} ({len(dac_ids)} DACs found,"
+                    f" {len(dac_ids) - len(unclaimed_ids)} of them taken by other indices)"
+                )
+            time.sleep(DISCOVERY_POLL_INTERVAL_S)
+
+    def connect(self, dac_idx, timeout=3.0):
+        """Connect to a DAC, waiting for it to be found if needed.
+
+        :param dac_idx: index of the DAC, in the order DACs were first found
+        :param timeout: max time to wait for the DAC to be found, in seconds
+        """
+        if EtherDreamDAC.discovery_start_time is None:
+            raise EtherDreamError("initialize must be called before connect")
         print("Connecting to DAC...")
-        dac_id = self.lib.etherdream_get_id(dac_idx)
+        dac_id = self._find_dac_id(dac_idx, timeout)
         if self.lib.etherdream_connect(dac_id) < 0:
             raise EtherDreamError(f"Could not connect to DAC [{hex(dac_id)}]")
         self.connected_dac_id = dac_id
+        EtherDreamDAC.connected_dac_ids[dac_idx] = dac_id
+        self._save_cached_id(dac_idx, dac_id)
         print(f"Connected to DAC with ID: {hex(dac_id)}")
 
-    def set_color(self, r=1, g=1, b=1, i=1):
-        self.color = (r, g, b, i)
-
     def get_bounds(self, scale=1.0):
         """Return an array of points representing the corners of the outer bounds"""
         # Ether Dream DAC uses 16 bits (signed) for x and y
@@ -106,112 +207,25 @@ class EtherDreamDAC(LaserDAC):
             and y <= Y_BOUNDS[1]
         )
 
-    def add_point(self, x, y):
-        if self.in_bounds(x, y):
-            with self.points_lock:
-                self.points.append((x, y))
-
-    def remove_point(self):
-        """Remove the last added point."""
-        with self.points_lock:
-            if self.points:
-                self.points.pop()
-
-    def clear_points(self):
-        with self.points_lock:
-            self.points.clear()
-
-    def _get_frame(self, fps=30, pps=30000, transition_duration_ms=0.5):
-        """Return an array of EtherDreamPoints representing the next frame that should be rendered.
-
-        :param fps: target frames per second
-        :param pps: target points per second. This should not exceed the capability of the DAC and laser projector.
-        :param transition_duration_ms: duration in ms to turn the laser off between subsequent points. If we are
-        rendering more than one point, we need to provide enough time between subsequent points, or else there may
-        be visible streaks between the points as the galvos take time to move to the new position
-        """
-
-        # We'll use "laxel", or laser "pixel", to refer to each point that the laser projector renders, which
-        # disambiguates it from "point", which refers to the (x, y) coordinates we want to have rendered
-
-        with self.points_lock:
-            # Calculate how many laxels of transition we need to add per point
-            laxels_per_transition = round(transition_duration_ms / (1000 / pps))
-
-            # Calculate how many laxels we render each point
-            ppf = pps / fps
-            num_points = len(self.points)
-            laxels_per_point = round(ppf if num_points == 0 else ppf / num_points)
-            laxels_per_frame = (
-                laxels_per_point if num_points == 0 else laxels_per_point * num_points
-            )
-
-            # Prepare frame
-            FrameType = EtherDreamPoint * (laxels_per_frame)
-            frame = FrameType()
-
-            if num_points == 0:
-                # Even if there are no points to render, we still to send over laxels so that we don't underflow the DAC buffer
-                for frameLaxelIdx in range(laxels_per_frame):
-                    frame[frameLaxelIdx] = EtherDreamPoint(0, 0, 0, 0, 0, 0, 0, 0)
-            else:
-                for pointIdx, point in enumerate(self.points):
-                    for laxelIdx in range(laxels_per_point):
-                        # Pad BEFORE the "on" laxel so that the galvo settles first, and only if there is more than one point
-                        isTransition = (
-                            num_points > 1 and laxelIdx < laxels_per_transition
-                        )
-                        frameLaxelIdx = pointIdx * laxels_per_point + laxelIdx
-                        frame[frameLaxelIdx] = EtherDreamPoint(
-                            int(point[0]),
-                            int(point[1]),
-                            0 if isTransition else int(self.color[0] * MAX_COLOR),
-                            0 if isTransition else int(self.color[1] * MAX_COLOR),
-                            0 if isTransition else int(self.color[2] * MAX_COLOR),
-                            0 if isTransition else int(self.color[3] * MAX_COLOR),
-                            0,
-                            0,
-                        )
-            return frame
-
-    def play(self, fps=30, pps=30000, transition_duration_ms=0.5):
-        """Start playback of points.
-        Ether Dream max rate: 100K pps
-
-        :param fps: target frames per second
-        :param pps: target points per second. This should not exceed the capability of the DAC and laser projector.
-        :param transition_duration_ms: duration in ms to turn the laser off between subsequent points. If we are
-        rendering more than one point, we need to provide enough time between subsequent points, or else there may
-        be visible streaks between the points as the galvos take time to move to the new position
-        """
-
-        def playback_thread():
-            while self.playing:
-                frame = self._get_frame(fps, pps, transition_duration_ms)
-
-                self.lib.etherdream_wait_for_ready(self.connected_dac_id)
+    def _wait_for_ready(self):
+        self.lib.etherdream_wait_for_ready(self.connected_dac_id)
 
-                self.lib.etherdream_write(
-                    self.connected_dac_id,
-                    ctypes.pointer(frame),
-                    len(frame),
-                    len(frame) * fps,
-                    1,
-                )
-            self.lib.etherdream_stop(self.connected_dac_id)
-
-        if not self.playing:
-            self.playing = True
-            self.playback_thread = threading.Thread(target=playback_thread, daemon=True)
-            self.playback_thread.start()
+    def _write_frame(self, frame, pps):
+        self.lib.etherdream_write(
+            self.connected_dac_id,
+            frame.ctypes.data_as(ctypes.POINTER(EtherDreamPoint)),
+            len(frame),
+            pps,
+            1,
+        )
 
-    def stop(self):
-        if self.playing:
-            self.playing = False
-            self.playback_thread.join()
-            self.playback_thread = None
+    def _stop_output(self):
+        self.lib.etherdream_stop(self.connected_dac_id)
 
     def close(self):
         if self.connected_dac_id:
             self.lib.etherdream_stop(self.connected_dac_id)
             self.lib.etherdream_disconnect(self.connected_dac_id)
+            for dac_idx, dac_id in list(EtherDreamDAC.connected_dac_ids.items()):
+                if dac_id == self.connected_dac_id:
+                    del EtherDreamDAC.connected_dac_ids[dac_idx]
@@ -0,0 +1,172 @@
+import numpy as np
+
+
+class FrameBuilder:
+    """Builds laser frames as NumPy structured arrays.
+
+    The dtype passed in must match the memory layout of the DAC's native point struct so that
+    the resulting frame can be handed to the native library without copying. The underlying
+    buffer is reused across frames of the same size, so a returned frame is only valid until
+    the next call to build().
+
+    Example usage:
+
+      builder = FrameBuilder(HELIOS_POINT_DTYPE, MAX_COLOR)
+      frame = builder.build([(100, 200)], (1, 0, 0, 0.1), fps=30, pps=30000)
+      lib.WriteFrame(..., frame.ctypes.data_as(ctypes.POINTER(HeliosPoint)), len(frame))
+    """
+
+    def __init__(self, dtype, max_color):
+        self.dtype = dtype
+        self.max_color = max_color
+        self._buffer = np.zeros(0, dtype=dtype)
+
+    def _get_buffer(self, size):
+        if len(self._buffer) != size:
+            self._buffer = np.zeros(size, dtype=self.dtype)
+        return self._buffer
+
+    @staticmethod
+    def allocate_laxels(laxels_per_frame, weights):
+        """Split laxels_per_frame between points in proportion to their weights.
+
+        Uses the largest remainder method, so the counts always add up to laxels_per_frame.
+
+        :param laxels_per_frame: total number of laxels to allocate
+        :param weights: array of non-negative per-point weights
+        """
+        weights = np.clip(np.asarray(weights, dtype=np.float64), 0.0, None)
+        total_weight = weights.sum()
+        if total_weight <= 0:
+            weights = np.ones_like(weights)
+            total_weight = weights.sum()
+        shares = laxels_per_frame * weights / total_weight
+        counts = np.floor(shares).astype(np.intp)
+        remainder = laxels_per_frame - counts.sum()
+        if remainder > 0:
+            counts[np.argsort(counts - shares)[:remainder]] += 1
+        return counts
+
+    def build(
+        self,
+        points,
+        color,
+        fps=30,
+        pps=30000,
+        transition_duration_ms=0.5,
+        transition_laxels=None,
+        weights=None,
+        colors=None,
+    ):
+        """Return a structured array representing the frame for the given points.
+
+        :param points: sequence of (x, y) coordinates to render
+        :param color: (r, g, b, i) tuple with each channel in [0, 1]
+        :param fps: target frames per second
+        :param pps: target points per second
+        :param transition_duration_ms: duration in ms to turn the laser off before each point when
+        rendering more than one point
+        :param transition_laxels: optional array with the number of laxels to turn the laser off
+        before each point, which overrides transition_duration_ms
+        :param weights: optional array of per-point dwell weights. The laxels of the frame are
+        split between points in proportion to their weights. By default, points are split evenly
+        :param colors: optional (N, 4) array of per-point colors, which overrides color
+        """
+
+        # We'll use "laxel", or laser "pixel", to refer to each point that the laser projector renders, which
+        # disambiguates it from "point", which refers to the (x, y) coordinates we want to have rendered
+
+        # Calculate how many laxels of transition we need to add per point
+        laxels_per_transition = round(transition_duration_ms / (1000 / pps))
+
+        # Calculate how many laxels we render each point
+        ppf = pps / fps
+        num_points = len(points)
+
+        if num_points == 0:
+            # Even if there are no points to render, we still to send over laxels so that we don't underflow the DAC buffer
+            frame = self._get_buffer(round(ppf))
+            frame.fill(0)
+            return frame
+
+        points = np.asarray(points).reshape(-1, 2)
+        if weights is None and colors is None and transition_laxels is None:
+            return self._build_uniform(
+                points, color, round(ppf / num_points), laxels_per_transition
+            )
+
+        if weights is None:
+            laxel_counts = np.full(num_points, round(ppf / num_points), dtype=np.intp)
+        else:
+            laxel_counts = self.allocate_laxels(round(ppf), weights)
+        if transition_laxels is None:
+            transition_laxels = np.full(
+                num_points, laxels_per_transition if num_points > 1 else 0
+            )
+        if colors is None:
+            colors = np.tile(np.asarray(color, dtype=np.float64), (num_points, 1))
+
+        frame = self._get_buffer(int(laxel_counts.sum()))
+        frame["x"] = np.repeat(points[:, 0], laxel_counts)
+        frame["y"] = np.repeat(points[:, 1], laxel_counts)
+
+        # Pad BEFORE the "on" laxels so that the galvo settles first
+        point_starts = np.cumsum(laxel_counts) - laxel_counts
+        laxel_offsets = np.arange(len(frame)) - np.repeat(point_starts, laxel_counts)
+        blanked = laxel_offsets < np.repeat(transition_laxels, laxel_counts)
+        colors = (np.asarray(colors, dtype=np.float64) * self.max_color).astype(np.intp)
+        for channel_idx, channel in enumerate(("r", "g", "b", "i")):
+            frame[channel] = np.repeat(colors[:, channel_idx], laxel_counts)
+            frame[channel][blanked] = 0
+        return frame
+
+    def build_path(self, positions, lit, color, fps=30, pps=30000):
+        """Return a structured array representing the frame for a rendered path.
+
+        The path is repeated as many times as fits in a frame, and the rest of the frame is
+        padded with blanked laxels at the start of the path. A path that is longer than a frame
+        is rendered in full, so it plays at a lower frame rate.
+
+        :param positions: (N, 2) array of laxel positions, as returned by PathRenderer.render
+        :param lit: boolean array of whether the laser is on for each laxel
+        :param color: (r, g, b, i) tuple with each channel in [0, 1]
+        :param fps: target frames per second
+        :param pps: target points per second
+        """
+        laxels_per_frame = round(pps / fps)
+        num_laxels = len(positions)
+        repeats = max(laxels_per_frame // num_laxels, 1)
+        num_padding = max(laxels_per_frame - repeats * num_laxels, 0)
+        frame = self._get_buffer(num_padding + repeats * num_laxels)
+
+        frame["x"][:num_padding] = positions[0, 0]
+        frame["y"][:num_padding] = positions[0, 1]
+        frame["x"][num_padding:].reshape(repeats, num_laxels)[:] = positions[:, 0]
+        frame["y"][num_padding:].reshape(repeats, num_laxels)[:] = positions[:, 1]
+        for channel, value in zip(("r", "g", "b", "i"), color):
+            laxels = frame[channel]
+            laxels[:num_padding] = 0
+            laxels[num_padding:].reshape(repeats, num_laxels)[:] = np.where(
+                lit, int(value * self.max_color), 0
+            )
+        return frame
+
+    def _build_uniform(self, points, color, laxels_per_point, laxels_per_transition):
+        """Build a frame where every point gets the same number of laxels and the same color."""
+        num_points = len(points)
+        frame = self._get_buffer(laxels_per_point * num_points)
+
+        # View each channel as (num_points, laxels_per_point) so that every point can be written
+        # with a single broadcasted assignment, without allocating temporaries
+        frame["x"].reshape(num_points, laxels_per_point)[:] = points[:, 0:1]
+        frame["y"].reshape(num_points, laxels_per_point)[:] = points[:, 1:2]
+
+        # Pad BEFORE the "on" laxels so that the galvo settles first, and only if there is more than one point
+        num_transition_laxels = (
+            min(laxels_per_transition, laxels_per_point) if num_points > 1 else 0
+        )
+        for channel, value in zip(("r", "g", "b", "i"), color):
+            laxels = frame[channel].reshape(num_points, laxels_per_point)
+            laxels[:, :num_transition_laxels] = 0
+            laxels[:, num_transition_laxels:] = int(value * self.max_color)
+        return frame
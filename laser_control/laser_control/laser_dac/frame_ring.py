@@ -0,0 +1,113 @@
+import threading
+
+
+class FrameRing:
+    """Fixed-capacity ring of pre-rendered frames, shared by a render thread and a feeder thread.
+
+    The render thread puts frames into the ring ahead of time, and the feeder thread takes the
+    oldest one as soon as the DAC is ready for it, so a stall in rendering (e.g. waiting on the
+    GIL while the node handles service calls) does not delay the write. Every frame put into the
+    ring is assigned a sequence number, which identifies the frame boundary it was written at.
+
+    An underflow is counted when the feeder needs a frame but none is ready, in which case it
+    should repeat the last frame. An overflow is counted when a frame could not be put into the
+    ring because the feeder did not take any frames before the timeout, in which case the frame
+    is dropped. Frames that are replaced by newer content before being taken are flushed.
+
+    Frames put into the ring must not be modified afterwards.
+
+    Example usage:
+
+      ring = FrameRing(capacity=2)
+      # Render thread
+      ring.put(frame.copy(), timeout=0.1)
+      # Feeder thread
+      entry = ring.get(timeout=0.0)
+      if entry is not None:
+          sequence, frame = entry
+
+    :param capacity: max number of frames that can be rendered ahead
+    """
+
+    def __init__(self, capacity=2):
+        if capacity < 1:
+            raise ValueError("Frame ring capacity must be at least 1")
+        self.capacity = capacity
+        self._cond = threading.Condition()
+        self.reset()
+
+    def reset(self):
+        """Drop all queued frames and reset the counters. Call when playback (re)starts."""
+        with self._cond:
+            self._slots = [None] * self.capacity  # (sequence, frame)
+            self._read_idx = 0
+            self._count = 0
+            self._next_sequence = 0
+            self._started = False
+            self.frames_rendered = 0
+            self.frames_taken = 0
+            self.frames_flushed = 0
+            self.underflows = 0
+            self.overflows = 0
+            self.last_sequence = -1
+
+    def __len__(self):
+        with self._cond:
+            return self._count
+
+    def put(self, frame, timeout=None, flush=False):
+        """Add a frame to the ring. Return its sequence number, or None if it was dropped.
+
+        :param frame: frame to add, which must not be modified afterwards
+        :param timeout: max time in seconds to wait for a free slot. None waits indefinitely
+        :param flush: drop all queued frames first, e.g. because they show stale content
+        """
+        with self._cond:
+            if flush:
+                self.frames_flushed += self._count
+                self._count = 0
+            if not self._cond.wait_for(lambda: self._count < self.capacity, timeout):
+                self.overflows += 1
+                return None
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            write_idx = (self._read_idx + self._count) % self.capacity
+            self._slots[write_idx] = (sequence, frame)
+            self._count += 1
+            self.frames_rendered += 1
+            self._cond.notify_all()
+            return sequence
+
+    def get(self, timeout=0.0):
+        """Take the oldest frame from the ring. Return (sequence, frame), or None if none is ready.
+
+        :param timeout: max time in seconds to wait for a frame. None waits indefinitely
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._count > 0, timeout):
+                # Nothing has been played yet before the first frame, so it can't underflow
+                if self._started:
+                    self.underflows += 1
+                return None
+            entry = self._slots[self._read_idx]
+            self._slots[self._read_idx] = None
+            self._read_idx = (self._read_idx + 1) % self.capacity
+            self._count -= 1
+            self._started = True
+            self.frames_taken += 1
+            self.last_sequence = entry[0]
+            self._cond.notify_all()
+            return entry
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "queued": self._count,
+                "frames_rendered": self.frames_rendered,
+                "frames_taken": self.frames_taken,
+                "frames_flushed": self.frames_flushed,
+                "underflows": self.underflows,
+                "overflows": self.overflows,
+                "last_sequence": self.last_sequence,
+            }
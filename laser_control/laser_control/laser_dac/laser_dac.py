@@ -1,7 +1,95 @@
 from abc import ABC, abstractmethod
+import threading
+import time
+
+import numpy as np
+
+from .blanking import BlankingModel
+from .distortion import DistortionCorrection
+from .frame_ring import FrameRing
+from .path_optimizer import PathOptimizer
+from .path_renderer import PathRenderer
+from .point_store import PlaybackParams, PointStore, to_point_arrays
+from .telemetry import PlaybackTelemetry
+
+
+class _Pulse:
+    """State of a pulse started with LaserDAC.pulse."""
+
+    def __init__(self, generation, duration_s, off_color, callback):
+        self.generation = generation
+        self.duration_s = duration_s
+        self.off_color = off_color
+        self.callback = callback
+        # time.monotonic() when the first frame of the pulse was written
+        self.on_time = None
+        # Generation of the point set that ends the pulse, once published
+        self.off_generation = None
+        # time.monotonic() when the playback thread last checked the pulse
+        self.check_time = None
 
 
 class LaserDAC(ABC):
+    """Base class for laser DACs.
+
+    Holds the point set and color shared by all DAC implementations, and caches the most
+    recently rendered frame so that the playback thread only has to rebuild it when the
+    points, color or playback params change. Subclasses must set self.frame_builder.
+
+    Instead of points, the DAC can render paths (polylines), which the laser sweeps along at
+    a limited speed rather than dwelling on isolated points.
+
+    Points are kept in a PointStore as (N, 2) arrays, so point updates never block the playback
+    thread and the playback thread always renders a complete point set. Batches of points are
+    bounds checked with a single vectorized operation, so large point sets can be passed to
+    set_points or add_points as arrays without per-point overhead. Methods that change the points
+    return the generation of the resulting point set, as does set_color. The playback thread
+    takes a snapshot of the point set for each frame, so updates only take effect at frame
+    boundaries (or chunk boundaries, when streaming in chunks). Once a frame rendered from that
+    generation (or a later one) has been written to the DAC, written_generation is updated,
+    wait_for_generation returns, and the callbacks added with add_write_callback are called.
+
+    A pulse (see pulse) is timed by the playback thread from the frames it writes, so the
+    laser's on time does not depend on the latency of whoever requested it.
+    """
+
+    # Max number of laxels the DAC accepts per frame, if limited
+    max_frame_laxels = None
+    # Whether the DAC plays back short chunks of a frame without gaps in between
+    supports_chunked_streaming = False
+    # When streaming in chunks, the number of chunks to keep queued ahead of the output. Enough
+    # to ride out scheduling jitter, while point updates still reach the galvos within a few
+    # chunks
+    stream_queue_chunks = 3
+
+    def __init__(self):
+        self.point_store = PointStore()
+        self.playing = False
+        self.playback_thread = None
+        self.render_thread = None
+        self.frame_ring = None
+        self.frame_builder = None
+        self._frame_cache = None  # (key, frame)
+        # AdaptiveStatusWait, for DACs that are polled for status
+        self.status_wait = None
+        self.path_optimizer = None
+        self.blanking_model = None
+        self.path_renderer = PathRenderer()
+        self.distortion_correction = None
+        self.telemetry = PlaybackTelemetry()
+        # Generation of the most recently written frame, and time.monotonic() when it was written
+        self.written_generation = -1
+        self.written_time = None
+        self._written_condition = threading.Condition()
+        self._write_callbacks = []
+        self._pulse = None
+        self._pulse_lock = threading.Lock()
+        self._chunk_duration_ms = 0.0
+        # Playback params that the telemetry's target rates were last set for
+        self._telemetry_params = None
+        # Serializes play and stop, which may be called from different threads
+        self._playback_lock = threading.Lock()
+
     @abstractmethod
     def initialize(self):
         pass
@@ -10,34 +98,621 @@ class LaserDAC(ABC):
     def connect(self, dac_idx):
         pass
 
-    @abstractmethod
-    def set_color(self, r, g, b, i):
-        pass
+    @property
+    def points(self):
+        """The current points, as a read-only (N, 2) array."""
+        return self.point_store.snapshot().points
+
+    @property
+    def color(self):
+        """The global (r, g, b, i) color."""
+        return self.point_store.snapshot().color
+
+    @property
+    def playback_params(self):
+        """The current PlaybackParams."""
+        return self.point_store.snapshot().playback_params
+
+    def set_color(self, r=1.0, g=1.0, b=1.0, i=1.0):
+        point_set = self.point_store.set_color((r, g, b, i))
+        self._frame_cache = None
+        return point_set.generation
 
     @abstractmethod
     def get_bounds(self, scale):
         pass
 
     @abstractmethod
-    def add_point(self, x, y):
+    def in_bounds(self, x, y):
         pass
 
-    @abstractmethod
+    def _get_bounds_rect(self):
+        """Return the (min, max) corners of the DAC's bounds, as arrays."""
+        bounds = np.asarray(self.get_bounds(1.0), dtype=np.float64)
+        return bounds.min(axis=0), bounds.max(axis=0)
+
+    def _fit_to_bounds(self, points, weights, colors, clip):
+        """Return the points, weights and colors as arrays, with the points that are out of
+        bounds either removed or, if clip, clamped to the bounds."""
+        points, weights, colors = to_point_arrays(points, weights, colors)
+        min_bounds, max_bounds = self._get_bounds_rect()
+        if clip:
+            return np.clip(points, min_bounds, max_bounds), weights, colors
+        in_bounds = np.all((points >= min_bounds) & (points <= max_bounds), axis=1)
+        if in_bounds.all():
+            return points, weights, colors
+        return points[in_bounds], weights[in_bounds], colors[in_bounds]
+
+    def add_point(self, x, y):
+        point_set = self.point_store.snapshot()
+        if self.in_bounds(x, y):
+            point_set = self.point_store.append((x, y))
+            self._frame_cache = None
+        return point_set.generation
+
+    def add_points(self, points, weights=None, colors=None, clip=False):
+        """Append a batch of points in a single step. Points that are out of bounds are ignored,
+        unless clip is set.
+
+        :param points: (N, 2) array or sequence of (x, y) points
+        :param weights: optional sequence of per-point dwell weights. See set_points
+        :param colors: optional sequence of per-point (r, g, b, i) colors. See set_points
+        :param clip: clamp points that are out of bounds to the bounds instead of ignoring them
+        """
+        points, weights, colors = self._fit_to_bounds(points, weights, colors, clip)
+        if len(points) == 0:
+            return self.point_store.snapshot().generation
+        point_set = self.point_store.extend(points, weights, colors)
+        self._frame_cache = None
+        return point_set.generation
+
+    def set_points(
+        self,
+        points,
+        weights=None,
+        colors=None,
+        clip=False,
+        color=None,
+        playback_params=None,
+    ):
+        """Replace all points in a single step. Points that are out of bounds are ignored,
+        unless clip is set.
+
+        :param points: (N, 2) array or sequence of (x, y) points
+        :param weights: optional sequence of per-point dwell weights. Each point gets a share of
+        the laxels in a frame proportional to its weight. Defaults to 1.0 for every point
+        :param colors: optional (N, 4) array or sequence of per-point (r, g, b, i) colors. A
+        color of None (or a row of NaN) means the point is rendered with the global color set by
+        set_color
+        :param clip: clamp points that are out of bounds to the bounds instead of ignoring them
+        :param color: optional new global (r, g, b, i) color, which takes effect in the same frame
+        as the new points
+        :param playback_params: optional new PlaybackParams, which take effect in the same frame
+        as the new points
+        """
+        points, weights, colors = self._fit_to_bounds(points, weights, colors, clip)
+        point_set = self.point_store.replace(
+            points, weights, colors, color, playback_params
+        )
+        self._frame_cache = None
+        return point_set.generation
+
+    def set_paths(self, paths, color=None, playback_params=None):
+        """Replace all points and paths with polylines for the laser to sweep along.
+
+        Vertices that are out of bounds are clamped to the bounds, so that the polyline stays
+        connected. Polylines without any vertices are ignored.
+
+        :param paths: sequence of polylines, each a sequence of (x, y) vertices
+        :param color: optional new global (r, g, b, i) color, which takes effect in the same frame
+        as the new paths
+        :param playback_params: optional new PlaybackParams, which take effect in the same frame
+        as the new paths
+        """
+        min_bounds, max_bounds = self._get_bounds_rect()
+        polylines = []
+        for path in paths:
+            vertices = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+            if len(vertices) > 0:
+                polylines.append(np.clip(vertices, min_bounds, max_bounds))
+        point_set = self.point_store.replace_paths(polylines, color, playback_params)
+        self._frame_cache = None
+        return point_set.generation
+
+    def set_path_params(self, speed=10.0, corner_dwell_ms=0.2):
+        """Set how the laser sweeps along paths.
+
+        :param speed: max speed of the galvos while the laser is on, in field widths per second
+        :param corner_dwell_ms: time to hold a vertex where the path reverses direction.
+        Vertices where the path turns less sharply are held for proportionally less time
+        """
+        self.path_renderer = PathRenderer(speed, corner_dwell_ms)
+        self._frame_cache = None
+
     def remove_point(self):
-        pass
+        """Remove the last added point."""
+        point_set = self.point_store.pop()
+        self._frame_cache = None
+        return point_set.generation
 
-    @abstractmethod
     def clear_points(self):
+        point_set = self.point_store.clear()
+        self._frame_cache = None
+        return point_set.generation
+
+    def add_write_callback(self, callback):
+        """Call callback(generation, written_time) from the playback thread whenever the first
+        frame rendered from a newer point set generation has been written to the DAC.
+
+        :param callback: callable taking the generation, and time.monotonic() when it was written
+        """
+        self._write_callbacks.append(callback)
+
+    def wait_for_generation(self, generation, timeout=None):
+        """Block until a frame rendered from the given point set generation (or a later one) has
+        been written to the DAC. Returns whether it has, which is never the case while the DAC is
+        not playing.
+
+        :param generation: generation returned by a method that changed the points
+        :param timeout: max time to wait in seconds, or None to wait indefinitely
+        """
+        with self._written_condition:
+            return self._written_condition.wait_for(
+                lambda: self.written_generation >= generation, timeout
+            )
+
+    def pulse(
+        self, generation, duration_s, off_color=(0.0, 0.0, 0.0, 0.0), callback=None
+    ):
+        """Turn the laser off duration_s after the first frame rendered from the given
+        generation (or a later one) has been written, by setting the global color to off_color.
+        Returns immediately.
+
+        The pulse is timed by the playback thread at frame granularity (or chunk granularity,
+        when streaming in chunks), so the on time is rounded to the nearest frame. Starting a new
+        pulse cancels the pending one, and stopping playback ends it.
+
+        :param generation: generation returned by the method that turned the laser on, such as
+        set_points with a color
+        :param duration_s: on time, in seconds
+        :param off_color: (r, g, b, i) global color to set at the end of the pulse
+        :param callback: optional callable, called with (on_time, off_time, completed) once the
+        first frame after the pulse has been written, where both times are time.monotonic()
+        timestamps of written frames. on_time is None if the laser was never turned on, and
+        off_time is None if the pulse was cancelled by a newer one. completed is False unless
+        the pulse ran for its full duration, so it is also False if playback was stopped before
+        then, in which case off_time is when it was stopped. Usually called from the playback
+        thread, so it must not block
+        """
+        pulse = _Pulse(generation, duration_s, tuple(off_color), callback)
+        with self._pulse_lock:
+            cancelled, self._pulse = self._pulse, pulse
+        if cancelled is not None and cancelled.callback is not None:
+            cancelled.callback(cancelled.on_time, None, False)
+
+    def hold_pulse(self):
+        """Return a context manager that keeps the pending pulse, if any, from advancing or
+        ending while it is held. Use it to read the color and update the points based on it,
+        without the pulse turning the laser off in between. pulse and stop must not be called
+        while it is held."""
+        return self._pulse_lock
+
+    def _advance_pulse(self):
+        """Advance the pending pulse, if any, after a frame has been written. Called from the
+        playback thread."""
+        with self._pulse_lock:
+            pulse = self._pulse
+            if pulse is None:
+                return
+            now = time.monotonic()
+            write_interval = now - (pulse.check_time or now)
+            pulse.check_time = now
+            if pulse.on_time is None:
+                if self.written_generation >= pulse.generation:
+                    pulse.on_time = self.written_time
+                return
+            if pulse.off_generation is None:
+                # The off color first appears in the next write, about one write interval from
+                # now (one more with pre-rendered frames, which have already been queued). Turn
+                # off there if that is closer to the end of the pulse than the write after it
+                lead_writes = 1.5 if self.frame_ring is None else 2.5
+                elapsed = now - pulse.on_time
+                if elapsed + lead_writes * write_interval >= pulse.duration_s:
+                    pulse.off_generation = self.point_store.set_color(
+                        pulse.off_color
+                    ).generation
+                    self._frame_cache = None
+                return
+            if self.written_generation < pulse.off_generation:
+                return
+            self._pulse = None
+        if pulse.callback is not None:
+            pulse.callback(pulse.on_time, self.written_time, True)
+
+    def _end_pulse(self):
+        """Turn the laser off and end the pending pulse, if any, when playback stops."""
+        with self._pulse_lock:
+            pulse, self._pulse = self._pulse, None
+            if pulse is None:
+                return
+            # The pulse only ran for its full duration if the off color had already been set
+            completed = pulse.off_generation is not None
+            if not completed:
+                self.point_store.set_color(pulse.off_color)
+                self._frame_cache = None
+        if pulse.callback is not None:
+            pulse.callback(pulse.on_time, time.monotonic(), completed)
+
+    def set_path_optimization(self, enabled):
+        """Enable or disable reordering points to minimize galvo travel between them.
+
+        When enabled, points are rendered in the order that minimizes the total travel
+        distance of the galvos over a frame, rather than in the order they were added.
+        """
+        self.path_optimizer = PathOptimizer() if enabled else None
+        self._frame_cache = None
+
+    def set_blanking_curve(self, distances=None, scales=None):
+        """Scale the transition duration before each point by the distance the galvos jump to it.
+
+        :param distances: increasing jump distances, as fractions of the width of the DAC's field.
+        If None, the full transition duration is used before every point.
+        :param scales: fraction of the transition duration to blank for each distance
+        """
+        self.blanking_model = (
+            BlankingModel(distances, scales) if distances is not None else None
+        )
+        self._frame_cache = None
+
+    def set_distortion_correction(self, correction=None):
+        """Correct the geometric distortion of the galvos when rendering.
+
+        :param correction: DistortionCorrection mapping ideal coordinates to DAC coordinates, or
+        None to render coordinates as they are
+        """
+        self.distortion_correction = correction
+        self._frame_cache = None
+
+    def load_distortion_correction(self, file):
+        """Load a distortion correction table from a .npy or .npz file. See DistortionCorrection.
+
+        :param file: path to the file
+        """
+        self.set_distortion_correction(
+            DistortionCorrection.load(file, self.get_bounds(1.0))
+        )
+
+    def _correct_distortion(self, positions, distortion_correction):
+        """Return positions mapped through distortion_correction, clamped to the DAC's bounds."""
+        if distortion_correction is None:
+            return positions
+        min_bounds, max_bounds = self._get_bounds_rect()
+        return np.clip(distortion_correction.apply(positions), min_bounds, max_bounds)
+
+    def _get_field_size(self):
+        bounds = self.get_bounds(1.0)
+        return max(point[0] for point in bounds) - min(point[0] for point in bounds)
+
+    def _get_frame(self, point_set):
+        """Return a structured array of native DAC points representing a frame of point_set, rendered
+        with its playback params. The frame is cached until the points, color or playback params change, and
+        is only valid until the next call to _get_frame.
+
+        :param point_set: PointSet snapshot to render
+        """
+        fps, pps, transition_duration_ms = point_set.playback_params
+        path_optimizer = self.path_optimizer
+        blanking_model = self.blanking_model
+        path_renderer = self.path_renderer
+        distortion_correction = self.distortion_correction
+        key = (
+            point_set.generation,
+            point_set.color,
+            path_optimizer,
+            blanking_model,
+            path_renderer,
+            distortion_correction,
+            fps,
+            pps,
+            transition_duration_ms,
+        )
+        frame_cache = self._frame_cache
+        if frame_cache is not None and frame_cache[0] == key:
+            return frame_cache[1]
+
+        if point_set.paths:
+            positions, lit = path_renderer.render(
+                point_set,
+                self._get_field_size(),
+                pps,
+                transition_duration_ms,
+                blanking_model,
+                self.max_frame_laxels,
+            )
+            positions = self._correct_distortion(positions, distortion_correction)
+            frame = self.frame_builder.build_path(positions, lit, key[1], fps, pps)
+            self._frame_cache = (key, frame)
+            return frame
+
+        points = point_set.points
+        weights = point_set.weights if point_set.has_weights else None
+        colors = None
+        if point_set.has_colors:
+            colors = np.where(
+                np.isnan(point_set.colors), np.asarray(key[1]), point_set.colors
+            )
+        if path_optimizer is not None:
+            order = path_optimizer.get_order(point_set)
+            points = points[order]
+            weights = weights[order] if weights is not None else None
+            colors = colors[order] if colors is not None else None
+        # Every laxel of a point is at the same position, so correcting the points is the same
+        # as correcting each laxel
+        points = self._correct_distortion(points, distortion_correction)
+
+        transition_laxels = None
+        if blanking_model is not None:
+            transition_laxels = blanking_model.transition_laxels(
+                points, self._get_field_size(), pps, transition_duration_ms
+            )
+
+        frame = self.frame_builder.build(
+            points,
+            key[1],
+            fps,
+            pps,
+            transition_duration_ms,
+            transition_laxels,
+            weights,
+            colors,
+        )
+        self._frame_cache = (key, frame)
+        return frame
+
+    def play(
+        self,
+        fps=30,
+        pps=30000,
+        transition_duration_ms=0.5,
+        prerender_frames=0,
+        chunk_duration_ms=0.0,
+    ):
+        """Start playback of points. fps, pps and transition_duration_ms can be changed while
+        playing with set_playback_params.
+
+        :param fps: target frames per second
+        :param pps: target points per second. This should not exceed the capability of the DAC and laser projector.
+        :param transition_duration_ms: duration in ms to turn the laser off between subsequent points. If we are
+        rendering more than one point, we need to provide enough time between subsequent points, or else there may
+        be visible streaks between the points as the galvos take time to move to the new position
+        :param prerender_frames: number of frames to render ahead of the DAC in a separate thread, so that a stall
+        while rendering does not cause the DAC to underflow. If 0, each frame is rendered right before it is written
+        :param chunk_duration_ms: if above 0, and supported by the DAC, stream each frame in chunks of this duration
+        instead of writing whole frames, so that point updates reach the galvos within about a chunk. Takes
+        precedence over prerender_frames, which would add latency
+        """
+        with self._playback_lock:
+            if not self.playing:
+                if chunk_duration_ms > 0 and not self.supports_chunked_streaming:
+                    print(f"{type(self).__name__} does not support chunked streaming")
+                    chunk_duration_ms = 0.0
+                self._chunk_duration_ms = chunk_duration_ms
+                if self.status_wait is not None:
+                    self.status_wait.reset()
+                self.set_playback_params(fps, pps, transition_duration_ms)
+                self._telemetry_params = None
+                self.playing = True
+                if chunk_duration_ms > 0:
+                    self.frame_ring = None
+                    self.playback_thread = threading.Thread(
+                        target=self._stream_thread,
+                        args=(chunk_duration_ms,),
+                        daemon=True,
+                    )
+                elif prerender_frames > 0:
+                    self.frame_ring = FrameRing(prerender_frames)
+                    self.render_thread = threading.Thread(
+                        target=self._render_thread, daemon=True
+                    )
+                    self.render_thread.start()
+                    self.playback_thread = threading.Thread(
+                        target=self._feed_thread, daemon=True
+                    )
+                else:
+                    self.frame_ring = None
+                    self.playback_thread = threading.Thread(
+                        target=self._playback_thread, daemon=True
+                    )
+                self.playback_thread.start()
+
+    def set_playback_params(
+        self, fps=30, pps=30000, transition_duration_ms=0.5, color=None
+    ):
+        """Set the frame rate, point rate and transition duration. See play. Returns the
+        generation of the resulting point set.
+
+        The params are part of the point set, so the playback thread reads them from the same
+        snapshot as the points. While playing, they take effect from the next frame (or chunk,
+        when streaming in chunks), which is regenerated with the new params, without restarting
+        playback. To change them in the same frame as the points, pass them to set_points or
+        set_paths instead.
+
+        :param color: optional new global (r, g, b, i) color, which takes effect in the same frame
+        as the new params
+        """
+        point_set = self.point_store.update(
+            color, PlaybackParams(fps, pps, transition_duration_ms)
+        )
+        self._frame_cache = None
+        return point_set.generation
+
+    def _get_write_rate(self, params):
+        """Return the target number of writes per second."""
+        if self._chunk_duration_ms > 0:
+            return params.pps / self._get_chunk_laxels(params)
+        return params.fps
+
+    def _get_chunk_laxels(self, params):
+        return max(round(self._chunk_duration_ms * params.pps / 1000), 1)
+
+    def _playback_thread(self):
+        while self.playing:
+            frame, generation, params = self._build_and_record()
+            self._wait_and_record()
+            self._write_and_record(
+                frame, self._get_frame_pps(frame, params.fps, params.pps), generation
+            )
+        self._stop_output()
+
+    def _stream_thread(self, chunk_duration_ms):
+        frame_cache = None
+        cursor = 0
+        # Streaming DACs accept points as long as there is room in their FIFO, which would
+        # delay new points by the whole FIFO if it were kept full. Instead, writes are paced to
+        # pps, by tracking when the queued laxels will have been output
+        queue_depth_s = self.stream_queue_chunks * chunk_duration_ms / 1000
+        queue_end_time = time.monotonic()
+        while self.playing:
+            # Render each chunk as late as possible, so that it has the newest points
+            delay = queue_end_time - queue_depth_s - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            frame, generation, params = self._build_and_record()
+            if self._frame_cache is not frame_cache or cursor >= len(frame):
+                # Start new content from the beginning of the frame, which begins with the
+                # blanked jump to the first point
+                frame_cache = self._frame_cache
+                cursor = 0
+            # Chunks are contiguous slices of the frame, so they are passed on without copying
+            chunk = frame[cursor : cursor + self._get_chunk_laxels(params)]
+            cursor = (cursor + len(chunk)) % len(frame)
+            self._wait_and_record()
+            self._write_and_record(chunk, params.pps, generation)
+            # If the queue ran dry, the chunk is output right away
+            queue_end_time = (
+                max(queue_end_time, time.monotonic()) + len(chunk) / params.pps
+            )
+        self._stop_output()
+
+    def _render_thread(self):
+        frame_cache = None
+        entry = None
+        while self.playing:
+            rendered, generation, params = self._build_and_record()
+            changed = self._frame_cache is not frame_cache
+            if changed:
+                # The frame builder reuses its buffer, so the ring needs its own copy. Frames
+                # already in the ring show stale content, so they are flushed
+                frame_cache = self._frame_cache
+                entry = (rendered.copy(), generation, params)
+            self.frame_ring.put(entry, timeout=0.1, flush=changed)
+
+    def _feed_thread(self):
+        # The ring holds (frame, generation, params) entries, so each frame is played at the
+        # rate it was rendered for
+        frame = None
+        while self.playing:
+            if frame is None:
+                entry = self.frame_ring.get(timeout=0.1)
+                if entry is None:
+                    continue
+                frame, generation, params = entry[1]
+                self._wait_and_record()
+            else:
+                self._wait_and_record()
+                # On underflow, repeat the last frame rather than letting the DAC run dry
+                entry = self.frame_ring.get()
+                if entry is not None:
+                    frame, generation, params = entry[1]
+            self._write_and_record(
+                frame, self._get_frame_pps(frame, params.fps, params.pps), generation
+            )
+        self._stop_output()
+
+    def _build_and_record(self):
+        """Render a frame of the current point set. Returns the frame, and the generation and
+        playback params it was rendered with."""
+        point_set = self.point_store.snapshot()
+        params = point_set.playback_params
+        if params is not self._telemetry_params:
+            # Rates are recorded relative to the current targets
+            self._telemetry_params = params
+            self.telemetry.reset(self._get_write_rate(params), params.pps)
+        start = time.perf_counter()
+        frame = self._get_frame(point_set)
+        self.telemetry.record_frame_build(time.perf_counter() - start)
+        return frame, point_set.generation, params
+
+    def _wait_and_record(self):
+        start = time.perf_counter()
+        self._wait_for_ready()
+        self.telemetry.record_wait(time.perf_counter() - start)
+
+    @staticmethod
+    def _get_frame_pps(frame, fps, pps):
+        # Frames that are longer than pps / fps (such as long paths) are played at a lower
+        # frame rate rather than faster than the target point rate
+        return min(len(frame) * fps, pps)
+
+    def _write_and_record(self, frame, pps, generation):
+        start = time.perf_counter()
+        self._write_frame(frame, pps)
+        self.telemetry.record_write(start, time.perf_counter() - start, len(frame))
+        if generation > self.written_generation:
+            with self._written_condition:
+                self.written_time = time.monotonic()
+                self.written_generation = generation
+                self._written_condition.notify_all()
+            for callback in self._write_callbacks:
+                callback(generation, self.written_time)
+        self._advance_pulse()
+
+    @abstractmethod
+    def _wait_for_ready(self):
+        """Block until the DAC is ready to accept the next frame."""
         pass
 
     @abstractmethod
-    def play(self, fps, pps, transition_duration_ms):
+    def _write_frame(self, frame, pps):
+        """Send a frame to the DAC.
+
+        :param frame: structured array of native DAC points
+        :param pps: rate at which the DAC should output the frame
+        """
         pass
 
     @abstractmethod
-    def stop(self):
+    def _stop_output(self):
+        """Stop DAC output. Called from the playback thread when playback ends."""
         pass
 
+    def stop(self):
+        with self._playback_lock:
+            if self.playing:
+                self.playing = False
+                self.playback_thread.join()
+                self.playback_thread = None
+                if self.render_thread is not None:
+                    self.render_thread.join()
+                    self.render_thread = None
+            self.render_thread = None
+            self.frame_ring = None
+            # Don't leave the laser on for the next time playback starts
+            self._end_pulse()
+
+    def get_wait_stats(self):
+        """Return counters for time spent waiting for the DAC to be ready for the next frame."""
+        return self.status_wait.get_stats() if self.status_wait is not None else {}
+
+    def get_telemetry(self):
+        """Return rolling histograms of the achieved frame and point rates, and of the time spent
+        building frames, waiting for the DAC and writing frames."""
+        return self.telemetry.get_stats()
+
+    def get_prerender_stats(self):
+        """Return counters for the ring of pre-rendered frames, if playing with prerender_frames."""
+        return self.frame_ring.get_stats() if self.frame_ring is not None else {}
+
     @abstractmethod
     def close(self):
         pass
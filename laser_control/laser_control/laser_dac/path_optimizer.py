@@ -0,0 +1,108 @@
+import numpy as np
+
+
+def nearest_neighbor_tour(dist, start=0):
+    """Return a closed tour over all points, built by repeatedly visiting the nearest unvisited point.
+
+    :param dist: (N, N) matrix of distances between points
+    :param start: index of the point to start from
+    """
+    num_points = len(dist)
+    tour = np.empty(num_points, dtype=np.intp)
+    visited = np.zeros(num_points, dtype=bool)
+    current = start
+    for idx in range(num_points):
+        tour[idx] = current
+        visited[current] = True
+        if idx < num_points - 1:
+            current = np.argmin(np.where(visited, np.inf, dist[current]))
+    return tour
+
+
+def two_opt(dist, tour, max_iterations=1000):
+    """Refine a closed tour by reversing segments as long as that shortens the tour.
+
+    Each iteration evaluates every possible segment reversal at once and applies the best one.
+
+    :param dist: (N, N) matrix of distances between points
+    :param tour: initial tour, as an array of point indices
+    :param max_iterations: max number of segment reversals to apply
+    """
+    tour = tour.copy()
+    num_points = len(tour)
+    if num_points < 4:
+        return tour
+
+    i, j = np.triu_indices(num_points, k=2)
+    # Skip the edge pair (first, last), which share a point in a closed tour
+    valid = ~((i == 0) & (j == num_points - 1))
+    i, j = i[valid], j[valid]
+
+    for _ in range(max_iterations):
+        a, b = tour[i], tour[i + 1]
+        c, d = tour[j], tour[(j + 1) % num_points]
+        # Change in length from replacing edges (a, b) and (c, d) with (a, c) and (b, d)
+        delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+        best = np.argmin(delta)
+        if delta[best] >= -1e-9:
+            break
+        tour[i[best] + 1 : j[best] + 1] = tour[i[best] + 1 : j[best] + 1][::-1]
+    return tour
+
+
+class PathOptimizer:
+    """Orders points so that the galvos travel the shortest total distance per frame.
+
+    Since frames are played back to back, the path is treated as a closed loop. The order is
+    constructed using nearest neighbor and refined using 2-opt, and is cached per point set.
+
+    Example usage:
+
+      optimizer = PathOptimizer()
+      order = optimizer.get_order(point_set)
+      ordered_points = np.asarray(point_set.points)[order]
+    """
+
+    def __init__(self, max_iterations=1000):
+        self.max_iterations = max_iterations
+        # (points, order). Keyed on the points array rather than the generation, so that
+        # changes that keep the points (such as a new color) don't reorder them again
+        self._cache = None
+
+    def get_order(self, point_set):
+        """Return the indices of point_set.points in the order they should be rendered.
+
+        :param point_set: PointSet to order
+        """
+        cache = self._cache
+        if cache is not None and cache[0] is point_set.points:
+            return cache[1]
+
+        order = self.optimize(point_set.points)
+        self._cache = (point_set.points, order)
+        return order
+
+    def optimize(self, points):
+        """Return the indices of points in an order that minimizes the total travel distance.
+
+        :param points: sequence of (x, y) points
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) < 3:
+            return np.arange(len(points))
+
+        dist = np.linalg.norm(
+            points[:, np.newaxis, :] - points[np.newaxis, :, :], axis=2
+        )
+        tour = two_opt(dist, nearest_neighbor_tour(dist), self.max_iterations)
+        return tour
+
+    @staticmethod
+    def path_length(points, order=None):
+        """Return the length of the closed path through points, in the given order."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if order is not None:
+            points = points[order]
+        if len(points) < 2:
+            return 0.0
+        return float(np.linalg.norm(points - np.roll(points, -1, axis=0), axis=1).sum())
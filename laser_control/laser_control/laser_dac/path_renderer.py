@@ -0,0 +1,158 @@
+import numpy as np
+
+
+def resample_polyline(vertices, step, corner_dwell_laxels):
+    """Return the laxel positions that sweep the laser along a polyline.
+
+    Each segment is split into laxels no more than step apart. Each vertex is held for a number
+    of extra laxels proportional to how sharply the path turns there, so that the galvos can
+    catch up before heading in the new direction. The endpoints are treated as full reversals,
+    since the galvos have to come to a stop there.
+
+    :param vertices: (N, 2) array of polyline vertices
+    :param step: max distance between subsequent laxels, in DAC units
+    :param corner_dwell_laxels: number of extra laxels to hold a vertex where the path reverses
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+    if len(vertices) > 1:
+        # Repeated vertices have no direction, so drop them
+        keep = np.concatenate(([True], np.any(np.diff(vertices, axis=0) != 0, axis=1)))
+        vertices = vertices[keep]
+    if len(vertices) == 1:
+        return np.repeat(vertices, max(int(round(corner_dwell_laxels)), 1), axis=0)
+
+    segments = np.diff(vertices, axis=0)
+    lengths = np.linalg.norm(segments, axis=1)
+    segment_laxels = np.maximum(np.ceil(lengths / step).astype(np.intp), 1)
+    segment_starts = np.cumsum(segment_laxels) - segment_laxels
+    num_laxels = int(segment_laxels.sum())
+    segment_idx = np.repeat(np.arange(len(segments)), segment_laxels)
+    t = (np.arange(num_laxels) - segment_starts[segment_idx]) / segment_laxels[
+        segment_idx
+    ]
+    laxels = np.concatenate(
+        (
+            vertices[segment_idx] + segments[segment_idx] * t[:, np.newaxis],
+            vertices[-1:],
+        )
+    )
+
+    directions = segments / lengths[:, np.newaxis]
+    cos_angles = np.einsum("ij,ij->i", directions[:-1], directions[1:])
+    angles = np.concatenate(
+        ([np.pi], np.arccos(np.clip(cos_angles, -1.0, 1.0)), [np.pi])
+    )
+    dwell_laxels = np.rint(corner_dwell_laxels * angles / np.pi).astype(np.intp)
+    repeats = np.ones(len(laxels), dtype=np.intp)
+    repeats[np.append(segment_starts, num_laxels)] += dwell_laxels
+    return np.repeat(laxels, repeats, axis=0)
+
+
+class PathRenderer:
+    """Renders polylines as laxel sequences that sweep the laser along each polyline.
+
+    The laser moves along each polyline at a limited speed, dwells at corners in proportion to
+    how sharply the path turns, and is blanked while the galvos jump from the end of one
+    polyline to the start of the next. Since frames are played back to back, the first polyline
+    is reached by jumping from the end of the last. The resampled path is cached per point set
+    and playback params, so it is only recomputed when the paths change.
+
+    Example usage:
+
+      renderer = PathRenderer(speed=10.0, corner_dwell_ms=0.2)
+      positions, lit = renderer.render(point_set, field_size=4095, pps=30000, transition_duration_ms=0.5)
+
+    :param speed: max speed of the galvos while the laser is on, in field widths per second
+    :param corner_dwell_ms: time to hold a vertex where the path reverses direction. Vertices
+    where the path turns less sharply are held for proportionally less time
+    """
+
+    def __init__(self, speed=10.0, corner_dwell_ms=0.2):
+        if speed <= 0:
+            raise ValueError("Path speed must be positive")
+        if corner_dwell_ms < 0:
+            raise ValueError("Path corner dwell must not be negative")
+        self.speed = speed
+        self.corner_dwell_ms = corner_dwell_ms
+        # (paths, params, (positions, lit)). Keyed on the paths tuple rather than the
+        # generation, so that changes that keep the paths (such as a new color) don't render
+        # them again
+        self._cache = None
+
+    def render(
+        self,
+        point_set,
+        field_size,
+        pps,
+        transition_duration_ms,
+        blanking_model=None,
+        max_laxels=None,
+    ):
+        """Return the laxel positions for point_set.paths, and whether the laser is on for each.
+
+        :param point_set: PointSet whose paths should be rendered
+        :param field_size: width of the DAC's field, in DAC units
+        :param pps: target points per second
+        :param transition_duration_ms: duration in ms to turn the laser off before each polyline
+        :param blanking_model: optional BlankingModel that scales the transition duration by the
+        distance the galvos jump to each polyline
+        :param max_laxels: max number of laxels the DAC accepts per frame, if any. Paths that
+        would not fit are swept faster than speed so that they do
+        """
+        params = (field_size, pps, transition_duration_ms, blanking_model, max_laxels)
+        cache = self._cache
+        if cache is not None and cache[0] is point_set.paths and cache[1] == params:
+            return cache[2]
+
+        step = self.speed * field_size / pps
+        result = self._render(
+            point_set.paths,
+            step,
+            field_size,
+            pps,
+            transition_duration_ms,
+            blanking_model,
+        )
+        for _ in range(10):
+            if max_laxels is None or len(result[0]) <= max_laxels:
+                break
+            step *= 1.1 * len(result[0]) / max_laxels
+            result = self._render(
+                point_set.paths,
+                step,
+                field_size,
+                pps,
+                transition_duration_ms,
+                blanking_model,
+            )
+        self._cache = (point_set.paths, params, result)
+        return result
+
+    def _render(
+        self, paths, step, field_size, pps, transition_duration_ms, blanking_model
+    ):
+        corner_dwell_laxels = self.corner_dwell_ms * pps / 1000
+        polylines = [
+            resample_polyline(path, step, corner_dwell_laxels) for path in paths
+        ]
+        starts = np.array([polyline[0] for polyline in polylines])
+        ends = np.array([polyline[-1] for polyline in polylines])
+        jumps = np.linalg.norm(starts - np.roll(ends, 1, axis=0), axis=1) / field_size
+        if blanking_model is not None:
+            blank_laxels = blanking_model.laxels_for_jumps(
+                jumps, pps, transition_duration_ms
+            )
+        else:
+            blank_laxels = np.where(
+                jumps > 0, round(transition_duration_ms * pps / 1000), 0
+            )
+
+        # Blank BEFORE each polyline, at its start, so that the galvos settle first
+        positions = []
+        lit = []
+        for polyline, num_blank in zip(polylines, blank_laxels):
+            positions.append(np.repeat(polyline[:1], num_blank, axis=0))
+            positions.append(polyline)
+            lit.append(np.zeros(num_blank, dtype=bool))
+            lit.append(np.ones(len(polyline), dtype=bool))
+        return np.concatenate(positions), np.concatenate(lit)
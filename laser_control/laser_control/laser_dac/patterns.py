@@ -0,0 +1,132 @@
+import functools
+
+import numpy as np
+
+# Number of patterns of each kind to keep, so that repeatedly burning the same targets does not
+# regenerate them
+CACHE_SIZE = 128
+
+
+def _as_key(points):
+    """Return points as a hashable tuple of (x, y) tuples, for use as a cache key."""
+    return tuple(
+        map(tuple, np.asarray(points, dtype=np.float64).reshape(-1, 2).tolist())
+    )
+
+
+def _read_only(polylines):
+    for polyline in polylines:
+        polyline.flags.writeable = False
+    return polylines
+
+
+def raster_fill(outline, spacing, angle=0.0):
+    """Return polylines that fill a polygon with parallel lines, traversed back and forth.
+
+    Lines are spaced evenly and centered within the polygon. Subsequent lines whose ends are
+    close together are joined into one polyline, so the laser stays on while stepping from one
+    line to the next. The result is cached, so it must not be modified.
+
+    :param outline: (N, 2) array or sequence of (x, y) polygon vertices. Self-intersecting and
+    non-convex polygons are filled using the even-odd rule
+    :param spacing: distance between lines, in DAC units
+    :param angle: angle of the lines from the x axis, in radians
+    :return: list of (M, 2) arrays of polyline vertices, for LaserDAC.set_paths
+    """
+    return _raster_fill(_as_key(outline), float(spacing), float(angle))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _raster_fill(outline, spacing, angle):
+    if len(outline) < 3:
+        raise ValueError("Outline must have at least 3 vertices")
+    if spacing <= 0:
+        raise ValueError("Spacing must be greater than 0")
+
+    # Rotate the outline so that the lines are horizontal
+    cos, sin = np.cos(angle), np.sin(angle)
+    rotation = np.array([[cos, -sin], [sin, cos]])
+    starts = np.array(outline) @ rotation
+    ends = np.roll(starts, -1, axis=0)
+    y_min, y_max = starts[:, 1].min(), starts[:, 1].max()
+    # Each line runs through the middle of a band of spacing height, so that lines never run
+    # along an edge at y_min or y_max, where rounding errors would split them up. Allow for
+    # rounding errors from the rotation in the number of bands too
+    num_lines = max(int(np.ceil((y_max - y_min) / spacing - 1e-9)), 1)
+    line_ys = y_min + (y_max - y_min - (num_lines - 1) * spacing) / 2
+    line_ys = (line_ys + np.arange(num_lines) * spacing)[:, np.newaxis]
+
+    # x of the intersection of each line (rows) with each edge (columns). Edges include their
+    # lower end but not their upper end, so that vertices are not counted twice
+    crosses = (starts[:, 1] <= line_ys) != (ends[:, 1] <= line_ys)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (line_ys - starts[:, 1]) / (ends[:, 1] - starts[:, 1])
+    xs = np.where(crosses, starts[:, 0] + t * (ends[:, 0] - starts[:, 0]), np.nan)
+    # Sorting moves the NaNs of edges that are not crossed to the end of each row
+    xs = np.sort(xs, axis=1)
+    if xs.shape[1] % 2 == 1:
+        xs = np.pad(xs, ((0, 0), (0, 1)), constant_values=np.nan)
+    # (line, segment, end) x coordinates of the segments inside the polygon
+    segment_xs = xs.reshape(num_lines, -1, 2)
+    # Traverse every other line in reverse
+    segment_xs[1::2] = segment_xs[1::2, ::-1, ::-1]
+    valid = ~np.isnan(segment_xs[:, :, 0])
+    segment_ys = np.broadcast_to(line_ys[:, :, np.newaxis], segment_xs.shape)
+    # (segment, end, xy) in traversal order, rotated back
+    segments = np.stack((segment_xs[valid], segment_ys[valid]), axis=-1)
+    if len(segments) == 0:
+        return []
+    segments = segments @ rotation.T
+
+    # Join segments into one polyline while the step to the next segment is short
+    steps = np.linalg.norm(segments[1:, 0] - segments[:-1, 1], axis=1)
+    breaks = np.flatnonzero(steps > 2 * spacing) + 1
+    vertices = segments.reshape(-1, 2)
+    return _read_only(np.split(vertices, breaks * 2))
+
+
+def sweep(outline, spacing):
+    """Return polylines that sweep back and forth along the long axis of a polygon, such as the
+    outline of a runner, so that it is covered with as few, long strokes as possible. See
+    raster_fill.
+
+    :param outline: (N, 2) array or sequence of (x, y) polygon vertices
+    :param spacing: distance between strokes, in DAC units
+    :return: list of (M, 2) arrays of polyline vertices, for LaserDAC.set_paths
+    """
+    outline = np.asarray(outline, dtype=np.float64).reshape(-1, 2)
+    if len(outline) < 3:
+        raise ValueError("Outline must have at least 3 vertices")
+    # The long axis is the principal component of the vertices
+    _, eigenvectors = np.linalg.eigh(np.cov(outline, rowvar=False))
+    long_axis = eigenvectors[:, -1]
+    return raster_fill(outline, spacing, np.arctan2(long_axis[1], long_axis[0]))
+
+
+def spiral(center, radius, spacing):
+    """Return a polyline that spirals out from a center point with evenly spaced turns. The
+    result is cached, so it must not be modified.
+
+    :param center: (x, y) center of the spiral
+    :param radius: outer radius of the spiral, in DAC units
+    :param spacing: distance between turns, in DAC units
+    :return: list with one (M, 2) array of polyline vertices, for LaserDAC.set_paths
+    """
+    return _spiral(tuple(map(float, center)), float(radius), float(spacing))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _spiral(center, radius, spacing):
+    if spacing <= 0:
+        raise ValueError("Spacing must be greater than 0")
+    # Archimedean spiral, r = spacing * theta / 2pi, with vertices about spacing / 2 apart along
+    # the curve, using arc length s ~= spacing * theta^2 / 4pi
+    theta_max = 2 * np.pi * max(radius, 0.0) / spacing
+    length = spacing * theta_max**2 / (4 * np.pi)
+    num_vertices = max(int(np.ceil(length / (spacing / 2))), 1) + 1
+    theta = np.sqrt(4 * np.pi * np.linspace(0, length, num_vertices) / spacing)
+    r = spacing * theta / (2 * np.pi)
+    vertices = np.stack(
+        (center[0] + r * np.cos(theta), center[1] + r * np.sin(theta)), axis=-1
+    )
+    return _read_only([vertices])
@@ -0,0 +1,238 @@
+import threading
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+def to_point_arrays(points, weights=None, colors=None):
+    """Convert points, weights and colors to the arrays held by a PointSet.
+
+    Arrays that are already in the right shape and dtype are not copied.
+
+    :param points: (N, 2) array or sequence of (x, y) points
+    :param weights: optional sequence of N per-point dwell weights. Defaults to 1.0
+    :param colors: optional (N, 4) array or sequence of N per-point (r, g, b, i) colors, where a
+    color of None (or a row of NaN) means the point uses the global color
+    :return: tuple of (points, weights, colors) arrays
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if weights is None:
+        weights = np.ones(len(points), dtype=np.float64)
+    else:
+        weights = np.asarray(weights, dtype=np.float64).reshape(-1)
+    if colors is None:
+        colors = np.full((len(points), 4), np.nan)
+    elif isinstance(colors, np.ndarray):
+        colors = np.asarray(colors, dtype=np.float64).reshape(-1, 4)
+    else:
+        colors = np.array(
+            [(np.nan,) * 4 if color is None else color for color in colors],
+            dtype=np.float64,
+        ).reshape(-1, 4)
+    if len(weights) != len(points) or len(colors) != len(points):
+        raise ValueError("weights and colors must be the same length as points")
+    return points, weights, colors
+
+
+_NO_POINTS = _read_only(np.zeros((0, 2), dtype=np.float64))
+_NO_WEIGHTS = _read_only(np.zeros(0, dtype=np.float64))
+_NO_COLORS = _read_only(np.zeros((0, 4), dtype=np.float64))
+
+
+class PlaybackParams(NamedTuple):
+    """Playback params that can be changed while playing. See LaserDAC.play."""
+
+    fps: int = 30
+    pps: int = 30000
+    transition_duration_ms: float = 0.5
+
+
+class PointSet(NamedTuple):
+    """Immutable snapshot of the points to render.
+
+    points is a read-only (N, 2) array, and weights ((N,)) and colors ((N, 4)) run parallel to
+    it. A point's weight sets its share of the laxels in a frame relative to the other points,
+    and a color row of NaN means the point is rendered with the DAC's global color.
+
+    paths holds polylines, each a read-only (M, 2) array of vertices, to sweep the laser along
+    instead of dwelling on points. A point set holds either points or paths, never both.
+
+    color is the global (r, g, b, i) color, and playback_params the frame rate, point rate and
+    transition duration to render with. Both are part of the snapshot so that they change
+    together with the points.
+
+    generation is incremented every time a new point set is published, so it can be used to
+    detect changes without comparing the points themselves.
+    """
+
+    points: np.ndarray = _NO_POINTS
+    weights: np.ndarray = _NO_WEIGHTS
+    colors: np.ndarray = _NO_COLORS
+    paths: Tuple[np.ndarray, ...] = ()
+    generation: int = 0
+    color: Tuple[float, float, float, float] = (1, 1, 1, 1)
+    playback_params: PlaybackParams = PlaybackParams()
+
+    @property
+    def has_weights(self):
+        """Whether any point has a weight other than the default."""
+        return bool(np.any(self.weights != 1.0))
+
+    @property
+    def has_colors(self):
+        """Whether any point has its own color."""
+        return not np.isnan(self.colors).all()
+
+
+class PointStore:
+    """Copy-on-write store for the current point set.
+
+    Writers build a complete new PointSet and publish it with a single reference assignment, so
+    readers (i.e. the playback thread) never block and never observe a partially updated point
+    set. Writers are serialized with a lock so that concurrent read-modify-write updates (such as
+    append) are not lost. The published arrays are read-only, so they can be shared with readers
+    without copying.
+
+    Example usage:
+
+      store = PointStore()
+      store.replace(np.array([(100, 200), (300, 400)]), weights=[9.0, 1.0])
+      point_set = store.snapshot()
+    """
+
+    def __init__(self):
+        self._point_set = PointSet()
+        self._write_lock = threading.Lock()
+
+    def snapshot(self):
+        """Return the current PointSet. Never blocks."""
+        return self._point_set
+
+    def _set(self, point_set):
+        """Make point_set the current one. Called with the write lock held."""
+        self._point_set = point_set
+        return point_set
+
+    def _publish(
+        self, points, weights, colors, paths=(), color=None, playback_params=None
+    ):
+        # Copy arrays that may still be referenced by the caller before making them read-only
+        point_set = self._point_set
+        return self._set(
+            PointSet(
+                _read_only(np.array(points)),
+                _read_only(np.array(weights)),
+                _read_only(np.array(colors)),
+                tuple(paths),
+                point_set.generation + 1,
+                point_set.color if color is None else tuple(color),
+                (
+                    point_set.playback_params
+                    if playback_params is None
+                    else playback_params
+                ),
+            )
+        )
+
+    def replace(
+        self, points, weights=None, colors=None, color=None, playback_params=None
+    ):
+        """Atomically replace all points (and any paths).
+
+        :param points: (N, 2) array or sequence of (x, y) points
+        :param weights: optional sequence of per-point dwell weights. Defaults to 1.0
+        :param colors: optional sequence of per-point (r, g, b, i) colors, or None to use the
+        global color
+        :param color: optional new global (r, g, b, i) color
+        :param playback_params: optional new PlaybackParams
+        """
+        points, weights, colors = to_point_arrays(points, weights, colors)
+        with self._write_lock:
+            return self._publish(
+                points, weights, colors, color=color, playback_params=playback_params
+            )
+
+    def replace_paths(self, paths, color=None, playback_params=None):
+        """Atomically replace all paths (and any points).
+
+        :param paths: sequence of polylines, each an (M, 2) array or sequence of (x, y) vertices
+        :param color: optional new global (r, g, b, i) color
+        :param playback_params: optional new PlaybackParams
+        """
+        paths = [
+            _read_only(np.array(path, dtype=np.float64).reshape(-1, 2))
+            for path in paths
+        ]
+        with self._write_lock:
+            return self._publish(
+                _NO_POINTS, _NO_WEIGHTS, _NO_COLORS, paths, color, playback_params
+            )
+
+    def extend(self, points, weights=None, colors=None):
+        """Atomically append points. Any paths are replaced.
+
+        :param points: (N, 2) array or sequence of (x, y) points
+        :param weights: optional sequence of per-point dwell weights. Defaults to 1.0
+        :param colors: optional sequence of per-point (r, g, b, i) colors, or None to use the
+        global color
+        """
+        points, weights, colors = to_point_arrays(points, weights, colors)
+        with self._write_lock:
+            point_set = self._point_set
+            return self._publish(
+                np.concatenate((point_set.points, points)),
+                np.concatenate((point_set.weights, weights)),
+                np.concatenate((point_set.colors, colors)),
+            )
+
+    def append(self, point, weight=1.0, color=None):
+        return self.extend([point], [weight], [color])
+
+    def pop(self):
+        """Remove the last point, if any."""
+        with self._write_lock:
+            point_set = self._point_set
+            if len(point_set.points) > 0:
+                self._publish(
+                    point_set.points[:-1],
+                    point_set.weights[:-1],
+                    point_set.colors[:-1],
+                )
+            return self._point_set
+
+    def set_color(self, color):
+        """Publish the current points again with a new global (r, g, b, i) color."""
+        return self.update(color=color)
+
+    def update(self, color=None, playback_params=None):
+        """Publish the current points again with a new global (r, g, b, i) color and/or new
+        PlaybackParams. The point and path arrays are kept, so caches keyed on them stay valid.
+        """
+        with self._write_lock:
+            return self._update(color, playback_params)
+
+    def _update(self, color=None, playback_params=None):
+        """See update. Called with the write lock held."""
+        point_set = self._point_set
+        return self._set(
+            point_set._replace(
+                generation=point_set.generation + 1,
+                color=point_set.color if color is None else tuple(color),
+                playback_params=(
+                    point_set.playback_params
+                    if playback_params is None
+                    else playback_params
+                ),
+            )
+        )
+
+    def clear(self):
+        with self._write_lock:
+            if len(self._point_set.points) > 0 or self._point_set.paths:
+                self._publish(_NO_POINTS, _NO_WEIGHTS, _NO_COLORS)
+            return self._point_set
@@ -0,0 +1,351 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .frame_builder import FrameBuilder
+from .helios import HELIOS_POINT_DTYPE, MAX_COLOR, X_BOUNDS, Y_BOUNDS
+from .laser_dac import LaserDAC
+from .wait_strategy import AdaptiveStatusWait
+
+# Laxels of the recorded output stream, with the time at which each laxel was emitted and the
+# position the galvos actually reached by then
+RECORDING_DTYPE = np.dtype(
+    [
+        ("t", np.float64),
+        ("x", np.float64),
+        ("y", np.float64),
+        ("galvo_x", np.float64),
+        ("galvo_y", np.float64),
+        ("r", np.uint8),
+        ("g", np.uint8),
+        ("b", np.uint8),
+        ("i", np.uint8),
+    ]
+)
+# Laxels held by the Ether Dream's FIFO, for simulating a streaming DAC
+ETHER_DREAM_FIFO_DEPTH = 1700
+
+
+class SimulatedDevice:
+    """Timing model of a frame-based laser DAC such as the Helios, or of a streaming DAC such
+    as the Ether Dream.
+
+    By default, the device holds the frame currently being output plus at most one pending
+    frame, and is ready (as reported by get_status) once the pending frame has started playing.
+    Writing while a frame is still pending replaces that frame. With fifo_depth, the device
+    instead queues every write in a FIFO, and is ready as long as fewer than fifo_depth laxels
+    are waiting to be output, so a writer that is not paced fills the FIFO and its writes are
+    only output after everything queued before them. Frames are output back to back at the rate
+    they were written with. If nothing is queued when the current frame finishes, the device
+    underflows and the output stalls until the next write.
+
+    The galvos are modeled as moving towards each commanded position at a constant slew rate.
+    All emitted laxels are recorded so that throughput, underflow, latency and blanking quality
+    can be measured after the fact.
+
+    :param buffer_depth: max number of laxels per frame. Larger frames are rejected.
+    :param max_pps: max output rate of the device. Faster frames are rejected.
+    :param slew_rate: galvo slew rate in DAC units per second
+    :param write_latency_s: time taken by each write, e.g. for the USB transfer
+    :param status_latency_s: time taken by each status query
+    :param max_recorded_frames: number of most recent frames to keep in the recording
+    :param fifo_depth: if given, the number of laxels the FIFO holds before the device is no
+    longer ready, e.g. ETHER_DREAM_FIFO_DEPTH
+    """
+
+    def __init__(
+        self,
+        buffer_depth=4096,
+        max_pps=65535,
+        slew_rate=2.0e6,
+        write_latency_s=0.0005,
+        status_latency_s=0.0001,
+        max_recorded_frames=10000,
+        fifo_depth=None,
+    ):
+        self.buffer_depth = buffer_depth
+        self.max_pps = max_pps
+        self.slew_rate = slew_rate
+        self.write_latency_s = write_latency_s
+        self.status_latency_s = status_latency_s
+        self.fifo_depth = fifo_depth
+        self._lock = threading.Lock()
+        # Entries of (frame, pps, write_time, start_time, end_time)
+        self._frames = deque(maxlen=max_recorded_frames)
+        self._stop_time = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._frames.clear()
+            self._stop_time = None
+            self.frames_written = 0
+            self.frames_rejected = 0
+            self.frames_dropped = 0
+            self.status_queries = 0
+            self.underflow_count = 0
+            self.underflow_time_s = 0.0
+
+    def _last_frame(self):
+        return self._frames[-1] if self._frames else None
+
+    def _queued_laxels(self, now):
+        """Return the number of written laxels that have not been output yet."""
+        queued = 0
+        for frame, pps, _, start_time, end_time in reversed(self._frames):
+            if end_time <= now:
+                break
+            if start_time >= now:
+                queued += len(frame)
+            else:
+                queued += round((end_time - now) * pps)
+        return queued
+
+    def get_queued_laxels(self):
+        """Return the number of written laxels that have not been output yet."""
+        with self._lock:
+            if self._stop_time is not None:
+                return 0
+            return self._queued_laxels(time.perf_counter())
+
+    def get_status(self):
+        """Return 1 if the device is ready to accept a new frame, 0 otherwise."""
+        if self.status_latency_s > 0:
+            time.sleep(self.status_latency_s)
+        with self._lock:
+            self.status_queries += 1
+            last_frame = self._last_frame()
+            if last_frame is None or self._stop_time is not None:
+                return 1
+            now = time.perf_counter()
+            if self.fifo_depth is not None:
+                return 1 if self._queued_laxels(now) < self.fifo_depth else 0
+            # Ready once the most recently written frame has started playing
+            return 1 if now >= last_frame[3] else 0
+
+    def write_frame(self, frame, pps):
+        """Queue a frame for output. Returns 1 on success, or a negative number if rejected.
+
+        :param frame: structured array with x, y, r, g, b, i fields
+        :param pps: rate at which to output the frame
+        """
+        if self.write_latency_s > 0:
+            time.sleep(self.write_latency_s)
+        with self._lock:
+            if len(frame) == 0 or len(frame) > self.buffer_depth or pps > self.max_pps:
+                self.frames_rejected += 1
+                return -1
+
+            now = time.perf_counter()
+            start_time = now
+            last_frame = self._last_frame()
+            if last_frame is not None and self._stop_time is None:
+                if last_frame[3] > now and self.fifo_depth is None:
+                    # A frame is already pending, which is replaced by the new frame
+                    self._frames.pop()
+                    self.frames_dropped += 1
+                    start_time = last_frame[3]
+                elif last_frame[4] > now:
+                    # Queued behind everything written before
+                    start_time = last_frame[4]
+                else:
+                    self.underflow_count += 1
+                    self.underflow_time_s += now - last_frame[4]
+
+            self._stop_time = None
+            self._frames.append(
+                (
+                    np.array(frame, copy=True),
+                    pps,
+                    now,
+                    start_time,
+                    start_time + len(frame) / pps,
+                )
+            )
+            self.frames_written += 1
+            return 1
+
+    def stop(self):
+        """Stop output immediately. Frames that have not started playing are discarded."""
+        with self._lock:
+            now = time.perf_counter()
+            while self._frames and self._frames[-1][3] > now:
+                self._frames.pop()
+            self._stop_time = now
+
+    def _emitted_frames(self, now):
+        end_time = now if self._stop_time is None else min(now, self._stop_time)
+        return [entry for entry in self._frames if entry[3] < end_time], end_time
+
+    def get_recording(self):
+        """Return a RECORDING_DTYPE array of all laxels emitted so far."""
+        with self._lock:
+            frames, end_time = self._emitted_frames(time.perf_counter())
+
+        chunks = []
+        for frame, pps, _, start_time, _ in frames:
+            t = start_time + np.arange(len(frame)) / pps
+            num_emitted = np.searchsorted(t, end_time)
+            chunk = np.zeros(num_emitted, dtype=RECORDING_DTYPE)
+            chunk["t"] = t[:num_emitted]
+            for field in ("x", "y", "r", "g", "b", "i"):
+                chunk[field] = frame[field][:num_emitted]
+            chunks.append(chunk)
+        recording = (
+            np.concatenate(chunks) if chunks else np.zeros(0, dtype=RECORDING_DTYPE)
+        )
+        self._simulate_galvos(recording)
+        return recording
+
+    def _simulate_galvos(self, recording):
+        """Fill in galvo_x and galvo_y, moving towards each commanded position at the slew rate."""
+        if len(recording) == 0:
+            return
+
+        commanded = np.stack((recording["x"], recording["y"]), axis=1)
+        # Split the stream into segments of constant commanded position. Within a segment, the
+        # galvos move in a straight line towards the target until they reach it
+        segment_starts = np.flatnonzero(
+            np.any(np.diff(commanded, axis=0, prepend=np.nan), axis=1)
+        )
+        segment_ends = np.append(segment_starts[1:], len(recording))
+        galvo = np.empty_like(commanded)
+        position = commanded[0]
+        for start, end in zip(segment_starts, segment_ends):
+            target = commanded[start]
+            offset = target - position
+            distance = np.hypot(*offset)
+            elapsed = recording["t"][start:end] - recording["t"][start]
+            travel = np.minimum(elapsed * self.slew_rate, distance)
+            if distance > 0:
+                galvo[start:end] = position + np.outer(travel / distance, offset)
+            else:
+                galvo[start:end] = position
+            position = galvo[end - 1]
+        recording["galvo_x"] = galvo[:, 0]
+        recording["galvo_y"] = galvo[:, 1]
+
+    def get_stats(self, settle_tolerance=2.0):
+        """Return a dict of playback statistics for the recorded output.
+
+        :param settle_tolerance: max distance in DAC units between the galvo and commanded
+        position for a lit laxel to be considered on target
+        """
+        recording = self.get_recording()
+        with self._lock:
+            frames, end_time = self._emitted_frames(time.perf_counter())
+            stats = {
+                "frames_written": self.frames_written,
+                "frames_rejected": self.frames_rejected,
+                "frames_dropped": self.frames_dropped,
+                "status_queries": self.status_queries,
+                "underflow_count": self.underflow_count,
+                "underflow_time_s": self.underflow_time_s,
+            }
+
+        latencies = np.array([entry[3] - entry[2] for entry in frames])
+        duration = end_time - frames[0][3] if frames else 0.0
+        lit = (
+            (recording["r"] > 0)
+            | (recording["g"] > 0)
+            | (recording["b"] > 0)
+            | (recording["i"] > 0)
+        )
+        error = np.hypot(
+            recording["galvo_x"] - recording["x"], recording["galvo_y"] - recording["y"]
+        )
+        stats.update(
+            {
+                "duration_s": duration,
+                "laxels_emitted": len(recording),
+                "achieved_pps": len(recording) / duration if duration > 0 else 0.0,
+                "achieved_fps": len(frames) / duration if duration > 0 else 0.0,
+                "lit_fraction": float(np.mean(lit)) if len(recording) else 0.0,
+                "lit_off_target": int(
+                    np.count_nonzero(lit & (error > settle_tolerance))
+                ),
+                "mean_queue_latency_s": (
+                    float(np.mean(latencies)) if len(latencies) else 0.0
+                ),
+                "max_queue_latency_s": (
+                    float(np.max(latencies)) if len(latencies) else 0.0
+                ),
+            }
+        )
+        return stats
+
+
+class SimDAC(LaserDAC):
+    """Simulated DAC that does not require any hardware or native libraries.
+
+    Behaves like a Helios DAC (same coordinate and color ranges, same frame-based status and
+    write semantics), backed by a SimulatedDevice timing model. Use device.get_recording()
+    and device.get_stats() to inspect what would have been emitted. Pass fifo_depth to model a
+    streaming DAC such as the Ether Dream instead, which supports chunked streaming.
+
+    Example usage:
+
+      dac = SimDAC()
+      dac.initialize()
+      dac.connect(0)
+
+      dac.add_point(100, 200)
+      dac.play()
+      ...
+      dac.stop()
+      print(dac.device.get_stats())
+      dac.close()
+    """
+
+    def __init__(self, num_devices=1, **device_kwargs):
+        super().__init__()
+        self.frame_builder = FrameBuilder(HELIOS_POINT_DTYPE, MAX_COLOR)
+        self.num_devices = num_devices
+        self.device_kwargs = device_kwargs
+        self.device = None
+        self.status_wait = AdaptiveStatusWait(lambda: self.device.get_status() == 1)
+
+    def initialize(self):
+        print("Initializing simulated DAC")
+        return self.num_devices
+
+    def connect(self, dac_idx):
+        self.device = SimulatedDevice(**self.device_kwargs)
+        self.max_frame_laxels = self.device.buffer_depth
+        # Chunks are only played back to back by a device that queues writes, rather than
+        # replacing the pending one
+        self.supports_chunked_streaming = self.device.fifo_depth is not None
+
+    def get_bounds(self, scale=1.0):
+        """Return an array of points representing the corners of the outer bounds"""
+        x_offset = round((X_BOUNDS[1] - X_BOUNDS[0]) / 2 * (1.0 - scale))
+        y_offset = round((Y_BOUNDS[1] - Y_BOUNDS[0]) / 2 * (1.0 - scale))
+        return [
+            (X_BOUNDS[0] + x_offset, Y_BOUNDS[0] + y_offset),
+            (X_BOUNDS[0] + x_offset, Y_BOUNDS[1] - y_offset),
+            (X_BOUNDS[1] - x_offset, Y_BOUNDS[1] - y_offset),
+            (X_BOUNDS[1] - x_offset, Y_BOUNDS[0] + y_offset),
+        ]
+
+    def in_bounds(self, x, y):
+        return (
+            x >= X_BOUNDS[0]
+            and x <= X_BOUNDS[1]
+            and y >= Y_BOUNDS[0]
+            and y <= Y_BOUNDS[1]
+        )
+
+    def _wait_for_ready(self):
+        self.status_wait.wait()
+
+    def _write_frame(self, frame, pps):
+        self.device.write_frame(frame, pps)
+        self.status_wait.frame_written(len(frame), pps)
+
+    def _stop_output(self):
+        self.device.stop()
+
+    def close(self):
+        pass
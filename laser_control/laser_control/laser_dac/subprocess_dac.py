@@ -0,0 +1,502 @@
+from collections import deque
+import functools
+import multiprocessing
+from multiprocessing import shared_memory
+import signal
+import threading
+
+import numpy as np
+
+from .laser_dac import LaserDAC
+from .point_store import PlaybackParams, PointSet, PointStore
+
+
+class SharedPointSetBlock:
+    """A point set and color in a shared memory block, guarded by a lock shared between
+    processes.
+
+    The writer increments the sequence number with each write, so a reader can tell whether
+    the block has changed since it last read it. Reads and writes both hold the lock, which
+    also orders the writes to the block with respect to reads in other processes on any CPU
+    (plain shared memory stores may become visible out of order, e.g. on ARM). A read only
+    holds it while copying the block, so writes wait for at most one copy.
+
+    :param capacity: max number of points, and max total number of path vertices
+    :param lock: multiprocessing lock shared by every process that attaches to the block
+    :param name: name of an existing block to attach to, or None to create a new one
+    """
+
+    def __init__(self, capacity, lock, name=None):
+        self.capacity = capacity
+        self.lock = lock
+        fields = (
+            # sequence number, generation, num points, num paths, num path vertices, pulse ID
+            ("_header", (6,), np.int64),
+            ("_color", (4,), np.float64),
+            # fps, pps, transition duration
+            ("_playback_params", (3,), np.float64),
+            ("_points", (capacity, 2), np.float64),
+            ("_weights", (capacity,), np.float64),
+            ("_colors", (capacity, 4), np.float64),
+            ("_path_lengths", (capacity,), np.int64),
+            ("_vertices", (capacity, 2), np.float64),
+        )
+        size = sum(int(np.prod(shape)) * 8 for _, shape, _ in fields)
+        self.shm = shared_memory.SharedMemory(name, create=name is None, size=size)
+        self.name = self.shm.name
+        offset = 0
+        for attr, shape, dtype in fields:
+            setattr(self, attr, np.ndarray(shape, dtype, self.shm.buf, offset))
+            offset += int(np.prod(shape)) * 8
+
+    def write(self, point_set, pulse_id=-1):
+        """Write a PointSet, including its global color and playback params, to the block.
+
+        :param point_set: PointSet to write
+        :param pulse_id: ID of the last pulse the writer had handled the end of
+
+        :raises ValueError: if the point set does not fit. The block is left unchanged
+        """
+        num_points = len(point_set.points)
+        num_paths = len(point_set.paths)
+        num_vertices = sum(len(path) for path in point_set.paths)
+        if num_points > self.capacity or num_vertices > self.capacity:
+            raise ValueError(
+                f"Point sets are limited to {self.capacity} points or path vertices"
+            )
+
+        with self.lock:
+            self._header[0] += 1
+            self._header[1:] = (
+                point_set.generation,
+                num_points,
+                num_paths,
+                num_vertices,
+                pulse_id,
+            )
+            self._color[:] = point_set.color
+            self._playback_params[:] = point_set.playback_params
+            self._points[:num_points] = point_set.points
+            self._weights[:num_points] = point_set.weights
+            self._colors[:num_points] = point_set.colors
+            if num_paths > 0:
+                self._path_lengths[:num_paths] = [len(path) for path in point_set.paths]
+                self._vertices[:num_vertices] = np.concatenate(point_set.paths)
+
+    def read(self, last_seq=None):
+        """Return (seq, point_set, pulse_id) copied from the block, or None if the sequence
+        number is still last_seq."""
+        with self.lock:
+            seq = int(self._header[0])
+            if seq == last_seq:
+                return None
+            header = self._header[1:].tolist()
+            generation, num_points, num_paths, num_vertices, pulse_id = header
+            color = tuple(self._color.tolist())
+            fps, pps, transition_duration_ms = self._playback_params.tolist()
+            points = self._points[:num_points].copy()
+            weights = self._weights[:num_points].copy()
+            colors = self._colors[:num_points].copy()
+            path_lengths = self._path_lengths[:num_paths].copy()
+            vertices = self._vertices[:num_vertices].copy()
+        paths = np.split(vertices, np.cumsum(path_lengths)[:-1]) if num_paths else ()
+        playback_params = PlaybackParams(int(fps), int(pps), transition_duration_ms)
+        point_set = PointSet(
+            points,
+            weights,
+            colors,
+            tuple(paths),
+            generation,
+            color,
+            playback_params,
+        )
+        return seq, point_set, pulse_id
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class SharedPointStore(PointStore):
+    """PointStore that also writes every point set it publishes to a SharedPointSetBlock.
+
+    :param block: SharedPointSetBlock to write to
+    :param on_write: optional callable, called after each write
+    """
+
+    def __init__(self, block, on_write=None):
+        super().__init__()
+        self.block = block
+        self.on_write = on_write
+        # ID of the last pulse whose end has been handled, written along with each point set
+        self.pulse_id = -1
+
+    def _set(self, point_set):
+        self.block.write(point_set, self.pulse_id)
+        super()._set(point_set)
+        if self.on_write is not None:
+            self.on_write()
+        return point_set
+
+    def end_pulse(self, pulse_id, color=None):
+        """Publish the current points again, marked as written after the end of the pulse with
+        pulse_id was handled.
+
+        :param pulse_id: ID of the pulse that ended
+        :param color: optional new global (r, g, b, i) color
+        """
+        with self._write_lock:
+            self.pulse_id = pulse_id
+            return self._update(color)
+
+
+class SubprocessDAC(LaserDAC):
+    """Runs another LaserDAC in a separate playback process, so that frame timing is isolated
+    from other Python work in this process, such as rclpy callbacks or model inference, that
+    would otherwise compete with the playback thread for the GIL.
+
+    The point set and color are passed to the playback process through a SharedPointSetBlock,
+    so large point sets are never pickled, and point updates wait on the playback process for at
+    most the time it takes to copy a point set.
+    Other calls are forwarded to the playback process through a pipe. Generations and write
+    callbacks work as for any other LaserDAC.
+
+    Each playback process loads its own copy of the DAC's native library, so DACs whose devices
+    can only be opened by one process at a time (such as Helios) are limited to one
+    SubprocessDAC per machine.
+
+    Example usage:
+
+      dac = SubprocessDAC(functools.partial(EtherDreamDAC, "libEtherDream.so"))
+      dac.initialize()
+      dac.connect(0)
+      dac.set_points(points)
+      dac.play()
+      ...
+      dac.close()
+
+    :param dac_factory: picklable callable that creates the LaserDAC to run in the playback
+    process, such as the class itself or a functools.partial of it
+    :param capacity: max number of points, and max total number of path vertices
+    """
+
+    def __init__(self, dac_factory, capacity=65536):
+        super().__init__()
+        self.dac_factory = dac_factory
+        # Forking a process with running threads (such as rclpy's) is not safe
+        self._context = multiprocessing.get_context("spawn")
+        self.block = SharedPointSetBlock(capacity, self._context.Lock())
+        self.point_store = SharedPointStore(self.block, self._sync)
+        self.process = None
+        self._conn = None
+        # Held for the round trip of a call. Point updates only need to send, so they take
+        # _send_lock alone and never wait for a slow call such as stop
+        self._conn_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._event_thread = None
+        self._initialized = False
+        self._bounds = None
+        # pulse ID -> (off_color, callback) of pulses sent to the playback process
+        self._pulse_requests = {}
+        self._next_pulse_id = 0
+
+    def _start(self):
+        if self.process is not None:
+            return
+        self._conn, child_conn = self._context.Pipe()
+        events, child_events = self._context.Pipe(duplex=False)
+        self.process = self._context.Process(
+            target=_run_playback_process,
+            args=(
+                self.dac_factory,
+                self.block.name,
+                self.block.capacity,
+                self.block.lock,
+                child_conn,
+                child_events,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        child_events.close()
+        self._event_thread = threading.Thread(
+            target=self._event_loop, args=(events,), daemon=True
+        )
+        self._event_thread.start()
+
+    def _call(self, name, *args):
+        """Call a method of the DAC in the playback process and return the result."""
+        self._start()
+        with self._conn_lock:
+            with self._send_lock:
+                self._conn.send(("call", name, args))
+            ok, result = self._conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def _sync(self):
+        """Tell the playback process that the shared point set has changed."""
+        if self.process is not None:
+            with self._send_lock:
+                self._conn.send(("sync",))
+
+    def _event_loop(self, events):
+        while True:
+            try:
+                event = events.recv()
+            except EOFError:
+                break
+            if event[0] == "pulse":
+                self._on_pulse_done(*event[1:])
+                continue
+            _, generation, written_time = event
+            with self._written_condition:
+                self.written_time = written_time
+                self.written_generation = generation
+                self._written_condition.notify_all()
+            for callback in self._write_callbacks:
+                callback(generation, written_time)
+        events.close()
+
+    def pulse(
+        self, generation, duration_s, off_color=(0.0, 0.0, 0.0, 0.0), callback=None
+    ):
+        # The pulse is timed by the playback process. Point updates are synced before the
+        # pulse is sent, so the playback process already has the point set that turns the laser
+        # on, and pulses from its current generation
+        with self._pulse_lock:
+            pulse_id = self._next_pulse_id
+            self._next_pulse_id += 1
+            self._pulse_requests[pulse_id] = (tuple(off_color), callback)
+        self._start()
+        with self._send_lock:
+            self._conn.send(("pulse", pulse_id, duration_s, tuple(off_color)))
+
+    def _on_pulse_done(self, pulse_id, on_time, off_time, completed):
+        with self._pulse_lock:
+            off_color, callback = self._pulse_requests.pop(pulse_id)
+            latest = pulse_id == self._next_pulse_id - 1
+        if off_time is not None:
+            # The playback process has turned the laser off. Do the same here, or the next point
+            # update would turn it back on, unless a newer pulse has turned it on again since.
+            # Until the playback process reads this point set, it keeps the laser off for point
+            # sets written before it, which still have the old color
+            self.point_store.end_pulse(pulse_id, off_color if latest else None)
+        if callback is not None:
+            callback(on_time, off_time, completed)
+
+    def initialize(self):
+        self._initialized = True
+        return self._call("initialize")
+
+    def connect(self, dac_idx):
+        # The native library needs to be initialized in each playback process
+        if not self._initialized:
+            self.initialize()
+        self._call("connect", dac_idx)
+        # Send points set before connecting
+        self._sync()
+
+    def get_bounds(self, scale=1.0):
+        """Return an array of points representing the corners of the outer bounds"""
+        if self._bounds is None:
+            self._bounds = self._call("get_bounds", 1.0)
+        bounds = np.asarray(self._bounds)
+        x_min, y_min = bounds.min(axis=0).tolist()
+        x_max, y_max = bounds.max(axis=0).tolist()
+        x_offset = round((x_max - x_min) / 2 * (1.0 - scale))
+        y_offset = round((y_max - y_min) / 2 * (1.0 - scale))
+        return [
+            (x_min + x_offset, y_min + y_offset),
+            (x_min + x_offset, y_max - y_offset),
+            (x_max - x_offset, y_max - y_offset),
+            (x_max - x_offset, y_min + y_offset),
+        ]
+
+    def in_bounds(self, x, y):
+        min_bounds, max_bounds = self._get_bounds_rect()
+        return bool(
+            min_bounds[0] <= x <= max_bounds[0] and min_bounds[1] <= y <= max_bounds[1]
+        )
+
+    def set_path_params(self, speed=10.0, corner_dwell_ms=0.2):
+        super().set_path_params(speed, corner_dwell_ms)
+        self._call("set_path_params", speed, corner_dwell_ms)
+
+    def set_path_optimization(self, enabled):
+        super().set_path_optimization(enabled)
+        self._call("set_path_optimization", enabled)
+
+    def set_blanking_curve(self, distances=None, scales=None):
+        super().set_blanking_curve(distances, scales)
+        self._call("set_blanking_curve", distances, scales)
+
+    def set_distortion_correction(self, correction=None):
+        super().set_distortion_correction(correction)
+        self._call("set_distortion_correction", correction)
+
+    def play(
+        self,
+        fps=30,
+        pps=30000,
+        transition_duration_ms=0.5,
+        prerender_frames=0,
+        chunk_duration_ms=0.0,
+    ):
+        with self._playback_lock:
+            # Later point updates carry the params to the playback process, so they must
+            # match the ones it plays with
+            self.set_playback_params(fps, pps, transition_duration_ms)
+            self._call(
+                "play",
+                fps,
+                pps,
+                transition_duration_ms,
+                prerender_frames,
+                chunk_duration_ms,
+            )
+            self.playing = True
+
+    def stop(self):
+        with self._playback_lock:
+            if self.process is not None:
+                self._call("stop")
+            self.playing = False
+
+    def get_wait_stats(self):
+        return self._call("get_wait_stats")
+
+    def get_telemetry(self):
+        return self._call("get_telemetry")
+
+    def get_prerender_stats(self):
+        return self._call("get_prerender_stats")
+
+    def _wait_for_ready(self):
+        # Playback runs in the playback process
+        pass
+
+    def _write_frame(self, frame, pps):
+        pass
+
+    def _stop_output(self):
+        pass
+
+    def close(self):
+        if self.process is not None:
+            self._call("close")
+            self.process.join()
+            self._event_thread.join()
+            self._conn.close()
+            self.process = None
+        self.playing = False
+        self.block.close()
+        self.block.unlink()
+
+
+def _run_playback_process(dac_factory, block_name, capacity, block_lock, conn, events):
+    """Main function of the playback process of a SubprocessDAC."""
+    # Ctrl-C is handled by the parent process, which then closes the DAC
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    dac = dac_factory()
+    block = SharedPointSetBlock(capacity, block_lock, block_name)
+    # (generation in this process, generation in the parent process) of applied point sets
+    generations = deque()
+    generations_lock = threading.Lock()
+    # Events are sent from both the playback thread and this one
+    events_lock = threading.Lock()
+
+    def send_event(*event):
+        with events_lock:
+            events.send(event)
+
+    def on_written(generation, written_time):
+        parent_generation = None
+        with generations_lock:
+            while generations and generations[0][0] <= generation:
+                parent_generation = generations.popleft()[1]
+        if parent_generation is not None:
+            send_event("written", parent_generation, written_time)
+
+    def apply(point_set, color):
+        # The new color and playback params take effect with the new points
+        if point_set.paths:
+            generation = dac.set_paths(
+                point_set.paths, color, point_set.playback_params
+            )
+        else:
+            generation = dac.set_points(
+                point_set.points,
+                point_set.weights,
+                point_set.colors,
+                color=color,
+                playback_params=point_set.playback_params,
+            )
+        generations.append((generation, point_set.generation))
+
+    dac.add_write_callback(on_written)
+    last_seq = None
+    # Last point set read from the parent process, and whether its color was overridden
+    last_point_set = None
+    overridden = False
+    last_pulse_id = -1
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "sync":
+                snapshot = block.read(last_seq)
+                if snapshot is None:
+                    continue
+                last_seq, point_set, pulse_id = snapshot
+                # The pulse can't end between checking the color and applying it
+                with generations_lock, dac.hold_pulse():
+                    color = dac.point_store.snapshot().color
+                    # If the last pulse has changed the color here, and the parent process
+                    # wrote this point set before handling the end of the pulse, its color is
+                    # the one from before the pulse ended. Keep the current one, or the laser
+                    # would turn back on until the parent process catches up
+                    overridden = (
+                        pulse_id < last_pulse_id
+                        and last_point_set is not None
+                        and color != last_point_set.color
+                    )
+                    apply(point_set, color if overridden else point_set.color)
+                    last_point_set = point_set
+            elif message[0] == "pulse":
+                _, pulse_id, duration_s, off_color = message
+                with generations_lock:
+                    last_pulse_id = pulse_id
+                    if overridden:
+                        # The parent process wrote the last point set to turn the laser on
+                        # for this pulse
+                        apply(last_point_set, last_point_set.color)
+                        overridden = False
+                dac.pulse(
+                    dac.point_store.snapshot().generation,
+                    duration_s,
+                    off_color,
+                    functools.partial(send_event, "pulse", pulse_id),
+                )
+            elif message[1] == "close":
+                dac.stop()
+                dac.close()
+                conn.send((True, None))
+                return
+            else:
+                _, name, args = message
+                try:
+                    conn.send((True, getattr(dac, name)(*args)))
+                except Exception as e:
+                    conn.send((False, e))
+    except EOFError:
+        # The parent process exited without closing the DAC
+        dac.stop()
+        dac.close()
+    finally:
+        block.close()
+        events.close()
+        conn.close()
@@ -0,0 +1,143 @@
+import threading
+
+import numpy as np
+
+
+class RollingHistogram:
+    """Histogram over the most recently recorded values.
+
+    Values are kept in a fixed-size ring, so recording is cheap enough for the playback thread,
+    and the histogram itself is only computed when stats are requested. Values outside of the
+    bins are counted in the first or last bin.
+
+    :param bin_edges: increasing bin edges
+    :param window: number of most recent values to include
+    """
+
+    def __init__(self, bin_edges, window=1000):
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        self.window = window
+        self._values = np.zeros(window, dtype=np.float64)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, bin_edges=None):
+        with self._lock:
+            if bin_edges is not None:
+                self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+            self._count = 0
+
+    def record(self, value):
+        with self._lock:
+            self._values[self._count % self.window] = value
+            self._count += 1
+
+    def get_stats(self):
+        with self._lock:
+            values = self._values[: min(self._count, self.window)].copy()
+            bin_edges = self.bin_edges
+        counts, _ = np.histogram(
+            np.clip(values, bin_edges[0], bin_edges[-1]), bin_edges
+        )
+        stats = {
+            "bin_edges": bin_edges.tolist(),
+            "counts": counts.tolist(),
+            "count": len(values),
+            "mean": 0.0,
+            "min": 0.0,
+            "max": 0.0,
+            "p50": 0.0,
+            "p95": 0.0,
+            "p99": 0.0,
+        }
+        if len(values) > 0:
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            stats.update(
+                mean=float(values.mean()),
+                min=float(values.min()),
+                max=float(values.max()),
+                p50=float(p50),
+                p95=float(p95),
+                p99=float(p99),
+            )
+        return stats
+
+
+class PlaybackTelemetry:
+    """Rolling histograms of DAC playback performance.
+
+    Tracks the achieved frame and point rates, measured between subsequent frame writes, and how
+    long the playback thread spends building frames, waiting for the DAC to be ready, and writing
+    frames to the DAC.
+
+    Example usage:
+
+      telemetry = PlaybackTelemetry()
+      telemetry.reset(fps=30, pps=30000)
+      telemetry.record_frame_build(0.0002)
+      telemetry.record_write(time.perf_counter(), 0.0001, num_laxels=1000)
+      print(telemetry.get_stats()["achieved_fps"]["p50"])
+
+    :param window: number of most recent frames to include in the histograms
+    """
+
+    TIME_BINS_MS = (0.0, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0)
+    # As fractions of the target rate
+    RATE_BINS = (0.0, 0.5, 0.8, 0.9, 0.95, 0.99, 1.01, 1.05, 1.1, 1.5, 2.0)
+
+    def __init__(self, window=1000):
+        self.frame_build_time_ms = RollingHistogram(self.TIME_BINS_MS, window)
+        self.wait_time_ms = RollingHistogram(self.TIME_BINS_MS, window)
+        self.write_time_ms = RollingHistogram(self.TIME_BINS_MS, window)
+        self.achieved_fps = RollingHistogram(self.RATE_BINS, window)
+        self.achieved_pps = RollingHistogram(self.RATE_BINS, window)
+        self._last_write = None  # (start_time, num_laxels)
+        self._num_writes = 0
+
+    def reset(self, fps=30, pps=30000):
+        """Clear the histograms. Call when playback (re)starts.
+
+        :param fps: target frames per second
+        :param pps: target points per second
+        """
+        self.frame_build_time_ms.reset()
+        self.wait_time_ms.reset()
+        self.write_time_ms.reset()
+        self.achieved_fps.reset(np.asarray(self.RATE_BINS) * fps)
+        self.achieved_pps.reset(np.asarray(self.RATE_BINS) * pps)
+        self._last_write = None
+        self._num_writes = 0
+
+    def record_frame_build(self, duration_s):
+        self.frame_build_time_ms.record(duration_s * 1000)
+
+    def record_wait(self, duration_s):
+        self.wait_time_ms.record(duration_s * 1000)
+
+    def record_write(self, start_time, duration_s, num_laxels):
+        """Record a frame write.
+
+        :param start_time: time.perf_counter() when the write started
+        :param duration_s: how long the write blocked
+        :param num_laxels: number of laxels in the frame
+        """
+        self.write_time_ms.record(duration_s * 1000)
+        last_write = self._last_write
+        self._last_write = (start_time, num_laxels)
+        self._num_writes += 1
+        # The time until the next write is how long the DAC took to play the previous frame,
+        # except for the first frame: the DAC is ready for the second frame as soon as the
+        # first one starts playing
+        if self._num_writes > 2 and start_time > last_write[0]:
+            interval_s = start_time - last_write[0]
+            self.achieved_fps.record(1.0 / interval_s)
+            self.achieved_pps.record(last_write[1] / interval_s)
+
+    def get_stats(self):
+        return {
+            "achieved_fps": self.achieved_fps.get_stats(),
+            "achieved_pps": self.achieved_pps.get_stats(),
+            "frame_build_time_ms": self.frame_build_time_ms.get_stats(),
+            "wait_time_ms": self.wait_time_ms.get_stats(),
+            "write_time_ms": self.write_time_ms.get_stats(),
+        }
@@ -0,0 +1,139 @@
+import threading
+import time
+
+
+class AdaptiveStatusWait:
+    """Waits for a frame-based DAC (such as the Helios) to be ready without busy-spinning.
+
+    A frame-based DAC becomes ready for the next frame once the previously written frame starts
+    playing, which happens when the frame before it finishes. Using the duration of the written
+    frames, we estimate when that will be, sleep until shortly before then, and only poll the
+    status for the last stretch, sleeping between polls so that the core and the GIL are free
+    for other work. The estimate is corrected over time using the observed ready times.
+
+    A deadline is missed when the next frame is written after the frame that was playing when
+    the DAC became ready has already finished, i.e. the DAC most likely ran out of points.
+
+    Example usage:
+
+      status_wait = AdaptiveStatusWait(lambda: lib.GetStatus(dac_idx) == 1)
+      while playing:
+          status_wait.wait()
+          lib.WriteFrame(...)
+          status_wait.frame_written(len(frame), pps)
+
+    :param is_ready: callable returning True if the DAC is ready for the next frame
+    :param margin_s: how long before the estimated ready time to start polling
+    :param poll_interval_s: time to sleep between status polls
+    :param timeout_s: max time to poll when the ready time cannot be estimated. When it can,
+    polling stops once the deadline is reached, and the frame is written anyway
+    """
+
+    def __init__(self, is_ready, margin_s=0.001, poll_interval_s=0.0002, timeout_s=0.1):
+        self.is_ready = is_ready
+        self.margin_s = margin_s
+        self.poll_interval_s = poll_interval_s
+        self.timeout_s = timeout_s
+        self._stats_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the current estimate and counters. Call when playback (re)starts."""
+        self._ready_time = None
+        self._expected_ready_time = None
+        self._deadline = None
+        self._playing_duration_s = 0.0
+        self._estimate_error_s = 0.0
+        with self._stats_lock:
+            self.waits = 0
+            self.status_polls = 0
+            self.wait_time_s = 0.0
+            self.sleep_time_s = 0.0
+            self.missed_deadlines = 0
+            self.timeouts = 0
+
+    def wait(self):
+        """Block until the DAC is ready, or until it is too late to keep waiting."""
+        start = time.perf_counter()
+        expected_ready_time = self._expected_ready_time
+        if expected_ready_time is not None:
+            expected_ready_time += self._estimate_error_s
+
+        # Sleep through most of the wait
+        sleep_duration = 0.0
+        if expected_ready_time is not None:
+            sleep_duration = expected_ready_time - self.margin_s - start
+            if sleep_duration > 0:
+                time.sleep(sleep_duration)
+
+        give_up_time = (
+            self._deadline
+            if self._deadline is not None
+            else time.perf_counter() + self.timeout_s
+        )
+        polls = 0
+        timed_out = False
+        while True:
+            polls += 1
+            if self.is_ready():
+                break
+            if time.perf_counter() >= give_up_time:
+                timed_out = True
+                break
+            time.sleep(self.poll_interval_s)
+
+        now = time.perf_counter()
+        # If the first poll succeeded, the DAC may have become ready at any point before now, so
+        # we can only use the ready time to correct the estimate when we actually polled for it
+        self._ready_time = now
+        if polls == 1 and expected_ready_time is not None:
+            self._ready_time = min(now, expected_ready_time)
+        elif expected_ready_time is not None and not timed_out:
+            error = now - self._expected_ready_time
+            self._estimate_error_s += 0.2 * (error - self._estimate_error_s)
+
+        with self._stats_lock:
+            self.waits += 1
+            self.status_polls += polls
+            self.wait_time_s += now - start
+            self.sleep_time_s += max(sleep_duration, 0.0)
+            if timed_out:
+                self.timeouts += 1
+
+    def frame_written(self, num_laxels, pps):
+        """Record that a frame was written, and estimate when the DAC will next be ready.
+
+        :param num_laxels: number of laxels in the written frame
+        :param pps: rate at which the frame will be output
+        """
+        now = time.perf_counter()
+        if self._deadline is not None and now > self._deadline:
+            with self._stats_lock:
+                self.missed_deadlines += 1
+
+        duration_s = num_laxels / pps if pps > 0 else 0.0
+        if (
+            self._ready_time is None
+            or now - self._ready_time > self._playing_duration_s
+        ):
+            # Nothing was playing (or it already finished), so the frame plays right away and
+            # the DAC is ready for the next one immediately
+            self._expected_ready_time = None
+            self._deadline = now + duration_s
+        else:
+            # The written frame starts once the frame that was playing when the DAC became
+            # ready finishes
+            self._expected_ready_time = self._ready_time + self._playing_duration_s
+            self._deadline = self._expected_ready_time + duration_s
+        self._playing_duration_s = duration_s
+
+    def get_stats(self):
+        with self._stats_lock:
+            return {
+                "waits": self.waits,
+                "status_polls": self.status_polls,
+                "wait_time_s": self.wait_time_s,
+                "sleep_time_s": self.sleep_time_s,
+                "missed_deadlines": self.missed_deadlines,
+                "timeouts": self.timeouts,
+            }
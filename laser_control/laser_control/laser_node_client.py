@@ -1,8 +1,60 @@
+import time
+
 import rclpy
+from rclpy.qos import QoSHistoryPolicy, QoSProfile, QoSReliabilityPolicy
 from std_srvs.srv import Empty
 
-from laser_control_interfaces.msg import Point
-from laser_control_interfaces.srv import AddPoint, GetBounds, SetColor, SetPoints
+from laser_control_interfaces.msg import (
+    Color,
+    Path,
+    Point,
+    PointList,
+    PulseDone,
+    UpdateWritten,
+)
+from laser_control_interfaces.srv import (
+    AddPoint,
+    GetBounds,
+    LaserCommand,
+    Pulse,
+    SetColor,
+    SetPaths,
+    SetPattern,
+    SetPlaybackParams,
+    SetPoints,
+)
+
+# Must match LaserControlNode
+POINTS_QOS = QoSProfile(
+    history=QoSHistoryPolicy.KEEP_LAST,
+    depth=1,
+    reliability=QoSReliabilityPolicy.BEST_EFFORT,
+)
+
+
+def _to_point_msgs(points):
+    return [Point(x=int(point[0]), y=int(point[1])) for point in points]
+
+
+def _fill_playback_params(
+    request, fps=30, pps=30000, transition_duration_ms=0.5, chunk_duration_ms=0.0
+):
+    request.fps = int(fps)
+    request.pps = int(pps)
+    request.transition_duration_ms = float(transition_duration_ms)
+    request.chunk_duration_ms = float(chunk_duration_ms)
+
+
+def _to_color_msgs(colors):
+    return [
+        Color(
+            r=float(color[0]),
+            g=float(color[1]),
+            b=float(color[2]),
+            i=float(color[3]) if len(color) > 3 else 0.0,
+        )
+        for color in colors
+    ]
 
 
 # Could make a mixin if desired
@@ -23,32 +75,159 @@ class LaserNodeClient:
         node.laser_set_points = node.create_client(
             SetPoints, f"/{laser_node_name}/set_points"
         )
+        node.laser_set_paths = node.create_client(
+            SetPaths, f"/{laser_node_name}/set_paths"
+        )
+        node.laser_set_pattern = node.create_client(
+            SetPattern, f"/{laser_node_name}/set_pattern"
+        )
+        node.laser_set_playback_params = node.create_client(
+            SetPlaybackParams, f"/{laser_node_name}/set_playback_params"
+        )
         node.laser_play = node.create_client(Empty, f"/{laser_node_name}/play")
         node.laser_stop = node.create_client(Empty, f"/{laser_node_name}/stop")
+        node.laser_command = node.create_client(
+            LaserCommand, f"/{laser_node_name}/laser_command"
+        )
+        node.laser_pulse = node.create_client(Pulse, f"/{laser_node_name}/pulse")
+        node.laser_points_pub = node.create_publisher(
+            PointList, f"/{laser_node_name}/points", POINTS_QOS
+        )
+        # Updates are written in the order they were made, so only the latest ID is tracked
+        self.written_update_id = 0
+        node.laser_update_written_sub = node.create_subscription(
+            UpdateWritten,
+            f"/{laser_node_name}/update_written",
+            self._update_written_callback,
+            10,
+        )
+        # Pulses end in the order they were started, so only the latest is tracked
+        self.pulse_done = None
+        node.laser_pulse_done_sub = node.create_subscription(
+            PulseDone,
+            f"/{laser_node_name}/pulse_done",
+            self._pulse_done_callback,
+            10,
+        )
         self.node = node
 
     def wait_active(self):
         while not self.node.laser_get_bounds.wait_for_service(timeout_sec=1.0):
             self.node.logger.info("laser service not available, waiting again...")
 
-    # TODO Add block option to all calls, if true, wait on spin, if false don't. Could be a decorator?
-    def start_laser(self, point=None, color=None):
-        if point is not None:
-            self.set_point(point)
+    def _update_written_callback(self, msg):
+        self.written_update_id = max(self.written_update_id, msg.update_id)
 
-        if color is not None:
-            self.set_color(color)
+    def _pulse_done_callback(self, msg):
+        if self.pulse_done is None or msg.update_id > self.pulse_done.update_id:
+            self.pulse_done = msg
 
-        request = Empty.Request()
-        response = self.node.laser_play.call_async(request)
-        rclpy.spin_until_future_complete(self.node, response)
+    def wait_for_pulse(self, update_id, timeout_sec=None):
+        """Spin until a pulse has ended. Returns the PulseDone message, or None on timeout.
+
+        :param update_id: sequence ID returned by pulse
+        :param timeout_sec: max time to wait, or None to wait indefinitely
+        """
+        deadline = None if timeout_sec is None else time.monotonic() + timeout_sec
+        while self.pulse_done is None or self.pulse_done.update_id < update_id:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            rclpy.spin_once(self.node, timeout_sec=remaining)
+        return self.pulse_done
+
+    def wait_for_update(self, update_id, timeout_sec=1.0):
+        """Spin until the first frame containing an update has been written to the DAC. Returns
+        whether it has, which is never the case while the laser is stopped.
+
+        :param update_id: sequence ID returned by the call that made the update
+        :param timeout_sec: max time to wait
+        """
+        deadline = time.monotonic() + timeout_sec
+        while self.written_update_id < update_id:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            rclpy.spin_once(self.node, timeout_sec=remaining)
+        return True
+
+    # TODO Add block option to all calls, if true, wait on spin, if false don't. Could be a decorator?
+    def start_laser(self, point=None, color=None):
+        """Start the laser, optionally setting the point and color first. Returns the sequence
+        ID of the update, or 0 if there was none."""
+        return self.command(
+            points=[point] if point is not None else None, color=color, play=True
+        )
 
     def stop_laser(self):
         request = Empty.Request()
         response = self.node.laser_stop.call_async(request)
         rclpy.spin_until_future_complete(self.node, response)
 
+    def command(
+        self,
+        points=None,
+        weights=None,
+        colors=None,
+        color=None,
+        playback_params=None,
+        play=None,
+    ):
+        """Apply any combination of a point update, a color change, playback params and
+        play/stop in a single call. The points and color take effect in the same frame, and
+        playback is started or stopped after they have been applied. Returns the sequence ID
+        of the point or color update, or 0 if neither was set.
+
+        :param points: optional sequence of (x, y) points to replace all points with
+        :param weights: optional sequence of per-point dwell weights
+        :param colors: optional sequence of per-point (r, g, b, i) colors
+        :param color: optional (r, g, b[, i]) global color
+        :param playback_params: optional dict of set_playback_params arguments
+        :param play: True to start playback, False to stop it, or None to leave it as is
+        """
+        request = LaserCommand.Request()
+        if points is not None:
+            request.set_points = True
+            request.points = _to_point_msgs(points)
+            if weights is not None:
+                request.weights = [float(weight) for weight in weights]
+            if colors is not None:
+                request.colors = _to_color_msgs(colors)
+        if color is not None:
+            request.set_color = True
+            request.color = _to_color_msgs([color])[0]
+        if playback_params is not None:
+            request.set_playback_params = True
+            _fill_playback_params(request, **playback_params)
+        if play is not None:
+            request.action = (
+                LaserCommand.Request.ACTION_PLAY
+                if play
+                else LaserCommand.Request.ACTION_STOP
+            )
+        response = self.node.laser_command.call_async(request)
+        rclpy.spin_until_future_complete(self.node, response)
+        return response.result().update_id
+
+    def pulse(self, points, color, duration_s):
+        """Turn the laser on at points in color for duration_s, timed by the laser node, and
+        start playback if needed. Returns immediately with the sequence ID of the pulse, which
+        can be passed to wait_for_pulse.
+
+        :param points: sequence of (x, y) points
+        :param color: (r, g, b[, i]) color while the laser is on
+        :param duration_s: on time, in seconds
+        """
+        request = Pulse.Request()
+        request.points = _to_point_msgs(points)
+        request.color = _to_color_msgs([color])[0]
+        request.duration_s = float(duration_s)
+        response = self.node.laser_pulse.call_async(request)
+        rclpy.spin_until_future_complete(self.node, response)
+        return response.result().update_id
+
     def set_color(self, color):
+        """Set the global color. Returns the sequence ID of the update."""
         request = SetColor.Request()
         request.r = float(color[0])
         request.g = float(color[1])
@@ -56,15 +235,79 @@ class LaserNodeClient:
         request.i = 0.0
         response = self.node.laser_set_color.call_async(request)
         rclpy.spin_until_future_complete(self.node, response)
+        return response.result().update_id
+
+    def set_playback_params(
+        self, fps=30, pps=30000, transition_duration_ms=0.5, chunk_duration_ms=0.0
+    ):
+        """Set the playback params. fps, pps and transition_duration_ms take effect right away
+        if the laser is playing, and chunk_duration_ms the next time it is started."""
+        request = SetPlaybackParams.Request()
+        _fill_playback_params(
+            request, fps, pps, transition_duration_ms, chunk_duration_ms
+        )
+        response = self.node.laser_set_playback_params.call_async(request)
+        rclpy.spin_until_future_complete(self.node, response)
 
     def set_point(self, point):
-        self.set_points([point])
+        return self.set_points([point])
 
-    def set_points(self, points):
+    def set_points(self, points, weights=None, colors=None):
+        """Replace all points. Returns the sequence ID of the update."""
         request = SetPoints.Request()
-        request.points = [Point(x=int(point[0]), y=int(point[1])) for point in points]
+        request.points = _to_point_msgs(points)
+        if weights is not None:
+            request.weights = [float(weight) for weight in weights]
+        if colors is not None:
+            request.colors = _to_color_msgs(colors)
         response = self.node.laser_set_points.call_async(request)
         rclpy.spin_until_future_complete(self.node, response)
+        return response.result().update_id
+
+    def publish_points(self, points, weights=None, colors=None):
+        """Replace all points without waiting for the laser node, for streaming updates such as
+        closed-loop aiming. Delivery is best effort, and if updates arrive faster than the laser
+        node handles them, only the newest is applied."""
+        msg = PointList()
+        msg.points = _to_point_msgs(points)
+        if weights is not None:
+            msg.weights = [float(weight) for weight in weights]
+        if colors is not None:
+            msg.colors = _to_color_msgs(colors)
+        self.node.laser_points_pub.publish(msg)
+
+    def set_paths(self, paths):
+        """Replace all points with polylines. Returns the sequence ID of the update."""
+        request = SetPaths.Request()
+        request.paths = [Path(points=_to_point_msgs(path)) for path in paths]
+        response = self.node.laser_set_paths.call_async(request)
+        rclpy.spin_until_future_complete(self.node, response)
+        return response.result().update_id
+
+    def set_pattern(
+        self, pattern, spacing, outline=(), center=(0, 0), radius=0.0, angle=0.0
+    ):
+        """Replace all points with a scan pattern that spreads the laser over an area. Returns
+        the sequence ID of the update.
+
+        :param pattern: "raster" or "sweep" to fill outline, or "spiral" to fill the circle at
+        center with radius
+        :param spacing: distance between adjacent lines or turns of the pattern
+        :param outline: sequence of (x, y) polygon vertices, for raster and sweep
+        :param center: (x, y) center, for spiral
+        :param radius: radius, for spiral
+        :param angle: angle of the lines from the x axis in radians, for raster
+        """
+        request = SetPattern.Request()
+        request.pattern = pattern
+        request.outline = _to_point_msgs(outline)
+        request.center = Point(x=int(center[0]), y=int(center[1]))
+        request.radius = float(radius)
+        request.spacing = float(spacing)
+        request.angle = float(angle)
+        response = self.node.laser_set_pattern.call_async(request)
+        rclpy.spin_until_future_complete(self.node, response)
+        return response.result().update_id
 
     def clear_points(self):
         request = Empty.Request()
@@ -77,6 +320,7 @@ class LaserNodeClient:
         response = self.node.laser_add_point.call_async(request)
         rclpy.spin_until_future_complete(self.node, response)
         self.node.logger.debug(f"Added laser point: {point}")
+        return response.result().update_id
 
     def get_bounds(self, scale=1.0):
         request = GetBounds.Request()
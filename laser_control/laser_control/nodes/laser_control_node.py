@@ -1,21 +1,60 @@
+from collections import OrderedDict
+import functools
 import os
+import threading
+import time
 
+import numpy as np
 import rclpy
 from ament_index_python.packages import get_package_share_directory
+from rcl_interfaces.msg import ParameterDescriptor, ParameterType
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
+from rclpy.executors import MultiThreadedExecutor
 from rclpy.node import Node
+from rclpy.qos import QoSHistoryPolicy, QoSProfile, QoSReliabilityPolicy
 
-from laser_control.laser_dac import EtherDreamDAC, HeliosDAC
-from laser_control_interfaces.msg import Point
+from laser_control.laser_dac import (
+    EtherDreamDAC,
+    HeliosDAC,
+    LaserDACGroup,
+    PlaybackParams,
+    SimDAC,
+    SubprocessDAC,
+)
+from laser_control.laser_dac.patterns import raster_fill, spiral, sweep
+from laser_control.laser_dac.sim import ETHER_DREAM_FIFO_DEPTH
+from laser_control_interfaces.msg import (
+    Histogram,
+    PlaybackTelemetry,
+    Point,
+    PointList,
+    PulseDone,
+    UpdateWritten,
+)
 from laser_control_interfaces.srv import (
     AddPoint,
     GetBounds,
+    LaserCommand,
+    Pulse,
     SetColor,
+    SetPaths,
+    SetPattern,
     SetPlaybackParams,
     SetPoints,
 )
 from std_srvs.srv import Empty
 from std_msgs.msg import Bool
 
+# Only the newest point list matters, and a late one is worse than a lost one. Must match
+# LaserNodeClient
+POINTS_QOS = QoSProfile(
+    history=QoSHistoryPolicy.KEEP_LAST,
+    depth=1,
+    reliability=QoSReliabilityPolicy.BEST_EFFORT,
+)
+# Updates made while not playing are never written, so only the most recent ones are tracked
+MAX_PENDING_UPDATES = 1000
+
 
 class LaserControlNode(Node):
     def __init__(self):
@@ -26,11 +65,52 @@ class LaserControlNode(Node):
         self.declare_parameters(
             namespace="",
             parameters=[
-                ("dac_type", "helios"),  # "helios" or "ether_dream"
+                ("dac_type", "helios"),  # "helios", "ether_dream" or "sim"
                 ("dac_index", 0),
+                # DACs at dac_index, dac_index + 1, ... are driven together
+                ("num_dacs", 1),
+                # Workspace region covered by each DAC, as a flat list of
+                # [x_min, y_min, x_max, y_max, ...]. Leave unset to tile the DACs along x.
+                # Declared without a default, as an empty list would be typed as a byte array
+                (
+                    "dac_regions",
+                    None,
+                    ParameterDescriptor(type=ParameterType.PARAMETER_DOUBLE_ARRAY),
+                ),
+                # Where to remember which Ether Dream DAC is at each index, so that it can be
+                # connected without waiting for all DACs to be found. "" to disable
+                (
+                    "ether_dream_id_cache_file",
+                    "~/.ros/laser_control/ether_dream_dac_ids.json",
+                ),
+                # Run each DAC's playback loop in its own process, so that frame timing is not
+                # affected by other work in this process holding the GIL
+                ("playback_process", False),
                 ("fps", 30),
                 ("pps", 30000),
                 ("transition_duration_ms", 0.5),
+                # Frames to render ahead of the DAC in a separate thread. 0 to disable
+                ("prerender_frames", 2),
+                # Stream frames in chunks of this duration for lower latency, on DACs that
+                # support it (others write whole frames). 0 to disable
+                ("chunk_duration_ms", 0.0),
+                ("optimize_path", False),
+                # Blanking before each point as a fraction of transition_duration_ms (scales), by
+                # jump distance as a fraction of the field width (distances)
+                ("blanking_curve_distances", [0.0, 1.0]),
+                ("blanking_curve_scales", [1.0, 1.0]),
+                # Max galvo speed while sweeping paths, in field widths per second
+                ("path_speed", 10.0),
+                ("path_corner_dwell_ms", 0.2),
+                # Galvo distortion correction table (.npy or .npz) for each DAC. Leave unset, or
+                # set an entry to "", to render without correction
+                (
+                    "distortion_lut_files",
+                    None,
+                    ParameterDescriptor(type=ParameterType.PARAMETER_STRING_ARRAY),
+                ),
+                # Period for publishing playback telemetry. 0 to disable
+                ("diagnostics_period_s", 1.0),
             ],
         )
 
@@ -40,6 +120,18 @@ class LaserControlNode(Node):
         self.dac_index = (
             self.get_parameter("dac_index").get_parameter_value().integer_value
         )
+        self.num_dacs = (
+            self.get_parameter("num_dacs").get_parameter_value().integer_value
+        )
+        self.dac_regions = list(self.get_parameter_or("dac_regions").value or [])
+        self.ether_dream_id_cache_file = (
+            self.get_parameter("ether_dream_id_cache_file")
+            .get_parameter_value()
+            .string_value
+        )
+        self.playback_process = (
+            self.get_parameter("playback_process").get_parameter_value().bool_value
+        )
         self.fps = self.get_parameter("fps").get_parameter_value().integer_value
         self.pps = self.get_parameter("pps").get_parameter_value().integer_value
         self.transition_duration_ms = (
@@ -47,59 +139,225 @@ class LaserControlNode(Node):
             .get_parameter_value()
             .double_value
         )
+        self.prerender_frames = (
+            self.get_parameter("prerender_frames").get_parameter_value().integer_value
+        )
+        self.chunk_duration_ms = (
+            self.get_parameter("chunk_duration_ms").get_parameter_value().double_value
+        )
+        self.optimize_path = (
+            self.get_parameter("optimize_path").get_parameter_value().bool_value
+        )
+        self.blanking_curve_distances = (
+            self.get_parameter("blanking_curve_distances")
+            .get_parameter_value()
+            .double_array_value
+        )
+        self.blanking_curve_scales = (
+            self.get_parameter("blanking_curve_scales")
+            .get_parameter_value()
+            .double_array_value
+        )
+        self.path_speed = (
+            self.get_parameter("path_speed").get_parameter_value().double_value
+        )
+        self.path_corner_dwell_ms = (
+            self.get_parameter("path_corner_dwell_ms")
+            .get_parameter_value()
+            .double_value
+        )
+
+        self.distortion_lut_files = list(
+            self.get_parameter_or("distortion_lut_files").value or []
+        )
+
+        self.diagnostics_period_s = (
+            self.get_parameter("diagnostics_period_s")
+            .get_parameter_value()
+            .double_value
+        )
+
+        # Callback groups. Callbacks in different groups run concurrently, so that point
+        # updates never wait for a play/stop transition (which joins the playback threads) and
+        # diagnostics never wait for either. Callbacks within a group run one at a time, so
+        # point updates are applied in the order they were received. Commands that combine a
+        # point update with play/stop get a group of their own
+
+        self.config_callback_group = MutuallyExclusiveCallbackGroup()
+        self.points_callback_group = MutuallyExclusiveCallbackGroup()
+        self.command_callback_group = MutuallyExclusiveCallbackGroup()
+        self.diagnostics_callback_group = MutuallyExclusiveCallbackGroup()
 
         # Services
 
         self.set_color_srv = self.create_service(
-            SetColor, "~/set_color", self._set_color_callback
+            SetColor,
+            "~/set_color",
+            self._set_color_callback,
+            callback_group=self.points_callback_group,
         )
         self.get_bounds_srv = self.create_service(
-            GetBounds, "~/get_bounds", self._get_bounds_callback
+            GetBounds,
+            "~/get_bounds",
+            self._get_bounds_callback,
+            callback_group=self.points_callback_group,
         )
         self.add_point_srv = self.create_service(
-            AddPoint, "~/add_point", self._add_point_callback
+            AddPoint,
+            "~/add_point",
+            self._add_point_callback,
+            callback_group=self.points_callback_group,
         )
         self.set_points_srv = self.create_service(
-            SetPoints, "~/set_points", self._set_points_callback
+            SetPoints,
+            "~/set_points",
+            self._set_points_callback,
+            callback_group=self.points_callback_group,
+        )
+        self.set_paths_srv = self.create_service(
+            SetPaths,
+            "~/set_paths",
+            self._set_paths_callback,
+            callback_group=self.points_callback_group,
+        )
+        self.set_pattern_srv = self.create_service(
+            SetPattern,
+            "~/set_pattern",
+            self._set_pattern_callback,
+            callback_group=self.points_callback_group,
         )
         self.remove_point_srv = self.create_service(
-            Empty, "~/remove_point", self._remove_point_callback
+            Empty,
+            "~/remove_point",
+            self._remove_point_callback,
+            callback_group=self.points_callback_group,
         )
         self.clear_points_srv = self.create_service(
-            Empty, "~/clear_points", self._clear_points_callback
+            Empty,
+            "~/clear_points",
+            self._clear_points_callback,
+            callback_group=self.points_callback_group,
         )
         self.set_playback_params_srv = self.create_service(
             SetPlaybackParams,
             "~/set_playback_params",
             self._set_playback_params_callback,
+            callback_group=self.config_callback_group,
+        )
+        self.play_srv = self.create_service(
+            Empty,
+            "~/play",
+            self._play_callback,
+            callback_group=self.config_callback_group,
+        )
+        self.stop_srv = self.create_service(
+            Empty,
+            "~/stop",
+            self._stop_callback,
+            callback_group=self.config_callback_group,
+        )
+        self.laser_command_srv = self.create_service(
+            LaserCommand,
+            "~/laser_command",
+            self._laser_command_callback,
+            callback_group=self.command_callback_group,
+        )
+        self.pulse_srv = self.create_service(
+            Pulse,
+            "~/pulse",
+            self._pulse_callback,
+            callback_group=self.command_callback_group,
         )
-        self.play_srv = self.create_service(Empty, "~/play", self._play_callback)
-        self.stop_srv = self.create_service(Empty, "~/stop", self._stop_callback)
 
         # Pub/sub
 
         self.playing_pub = self.create_publisher(Bool, "~/playing", 5)
+        self.diagnostics_pub = self.create_publisher(
+            PlaybackTelemetry, "~/diagnostics", 5
+        )
+        self.update_written_pub = self.create_publisher(
+            UpdateWritten, "~/update_written", 10
+        )
+        self.pulse_done_pub = self.create_publisher(PulseDone, "~/pulse_done", 10)
+        # Streaming alternative to the set_points service, for updates at camera rate
+        self.points_sub = self.create_subscription(
+            PointList,
+            "~/points",
+            self._points_callback,
+            POINTS_QOS,
+            callback_group=self.points_callback_group,
+        )
+
+        # Point and color updates are stamped with a sequence ID, and tracked until the first frame
+        # containing them has been written to every DAC
+        self._updates_lock = threading.Lock()
+        self._next_update_id = 1
+        # update_id -> (received_time, generation of each DAC)
+        self._pending_updates = OrderedDict()
 
-        # Initialize DAC
+        # Initialize DACs
 
         include_dir = os.path.join(
             get_package_share_directory("laser_control"), "include"
         )
         self.dac = None
+        dacs = [self._create_dac(include_dir) for _ in range(self.num_dacs)]
+        # The native libraries are shared between DACs of the same type, so they only need to
+        # be initialized once
+        num_dacs = dacs[0].initialize()
+        self.get_logger().info(f"{num_dacs} DACs of type {self.dac_type} found")
+        for offset, dac in enumerate(dacs):
+            dac.connect(self.dac_index + offset)
+        self.dac = LaserDACGroup(dacs, self.dac_regions or None)
+        for dac in dacs:
+            dac.add_write_callback(
+                lambda generation, written_time: self._publish_written_updates()
+            )
+        self.dac.set_path_optimization(self.optimize_path)
+        self.dac.set_blanking_curve(
+            self.blanking_curve_distances, self.blanking_curve_scales
+        )
+        self.dac.set_path_params(self.path_speed, self.path_corner_dwell_ms)
+        for dac, lut_file in zip(self.dac.dacs, self.distortion_lut_files):
+            if lut_file:
+                dac.load_distortion_correction(lut_file)
+                self.get_logger().info(f"Loaded distortion correction from {lut_file}")
+
+        if self.diagnostics_period_s > 0:
+            self.diagnostics_timer = self.create_timer(
+                self.diagnostics_period_s,
+                self._publish_diagnostics,
+                callback_group=self.diagnostics_callback_group,
+            )
+
+    def _create_dac(self, include_dir):
         if self.dac_type == "helios":
-            self.dac = HeliosDAC(os.path.join(include_dir, "libHeliosDacAPI.so"))
+            dac_factory = functools.partial(
+                HeliosDAC, os.path.join(include_dir, "libHeliosDacAPI.so")
+            )
         elif self.dac_type == "ether_dream":
-            self.dac = EtherDreamDAC(os.path.join(include_dir, "libEtherDream.so"))
+            dac_factory = functools.partial(
+                EtherDreamDAC,
+                os.path.join(include_dir, "libEtherDream.so"),
+                os.path.expanduser(self.ether_dream_id_cache_file) or None,
+            )
+        elif self.dac_type == "sim":
+            # Chunked streaming is simulated on a streaming DAC
+            dac_factory = functools.partial(
+                SimDAC,
+                fifo_depth=(
+                    ETHER_DREAM_FIFO_DEPTH if self.chunk_duration_ms > 0 else None
+                ),
+            )
         else:
             raise Exception(f"Unknown dac_type: {self.dac_type}")
-
-        num_dacs = self.dac.initialize()
-        self.get_logger().info(f"{num_dacs} DACs of type {self.dac_type} found")
-        self.dac.connect(self.dac_index)
+        return SubprocessDAC(dac_factory) if self.playback_process else dac_factory()
 
     def _set_color_callback(self, request, response):
         if self.dac is not None:
-            self.dac.set_color(request.r, request.g, request.b, request.i)
+            received_time = time.monotonic()
+            generations = self.dac.set_color(request.r, request.g, request.b, request.i)
+            response.update_id = self._stamp_update(received_time, generations)
         return response
 
     def _get_bounds_callback(self, request, response):
@@ -112,54 +370,275 @@ class LaserControlNode(Node):
 
     def _add_point_callback(self, request, response):
         if self.dac is not None:
-            self.dac.add_point(request.point.x, request.point.y)
+            received_time = time.monotonic()
+            generations = self.dac.add_point(request.point.x, request.point.y)
+            response.update_id = self._stamp_update(received_time, generations)
         return response
 
     def _set_points_callback(self, request, response):
         if self.dac is not None:
-            self.dac.clear_points()
-            for point in request.points:
-                self.dac.add_point(point.x, point.y)
+            received_time = time.monotonic()
+            generations = self._set_points(
+                request.points, request.weights, request.colors
+            )
+            if generations is not None:
+                response.update_id = self._stamp_update(received_time, generations)
+        return response
+
+    def _points_callback(self, msg):
+        # Topic updates have no response to return an update ID in, so they are not stamped
+        if self.dac is not None:
+            self._set_points(msg.points, msg.weights, msg.colors)
+
+    def _set_points(
+        self, points, weights=(), colors=(), color=None, playback_params=None
+    ):
+        """Replace the points, and optionally the global (r, g, b, i) color and playback
+        params along with them. Returns the generation of each DAC, or None if the points are
+        invalid.
+
+        :param points: Point messages
+        :param weights: optional per-point dwell weights. Empty for even weights
+        :param colors: optional Color messages. Empty to use the global color
+        :param color: optional (r, g, b, i) global color
+        :param playback_params: optional PlaybackParams
+        """
+        # Message fields are lists of message objects, so gather them into arrays once and
+        # leave the rest of the processing to vectorized operations
+        points = np.array([(point.x, point.y) for point in points], dtype=np.float64)
+        weights = np.asarray(weights) if len(weights) > 0 else None
+        colors = (
+            np.array(
+                [(color.r, color.g, color.b, color.i) for color in colors],
+                dtype=np.float64,
+            )
+            if len(colors) > 0
+            else None
+        )
+        try:
+            return self.dac.set_points(
+                points,
+                weights,
+                colors,
+                color=color,
+                playback_params=playback_params,
+            )
+        except ValueError as e:
+            self.get_logger().warning(f"Could not set points: {e}")
+            return None
+
+    def _set_paths_callback(self, request, response):
+        if self.dac is not None:
+            received_time = time.monotonic()
+            paths = [
+                [(point.x, point.y) for point in path.points] for path in request.paths
+            ]
+            generations = self.dac.set_paths(paths)
+            response.update_id = self._stamp_update(received_time, generations)
+        return response
+
+    def _set_pattern_callback(self, request, response):
+        if self.dac is not None:
+            received_time = time.monotonic()
+            outline = [(point.x, point.y) for point in request.outline]
+            try:
+                if request.pattern == "raster":
+                    paths = raster_fill(outline, request.spacing, request.angle)
+                elif request.pattern == "sweep":
+                    paths = sweep(outline, request.spacing)
+                elif request.pattern == "spiral":
+                    center = (request.center.x, request.center.y)
+                    paths = spiral(center, request.radius, request.spacing)
+                else:
+                    raise ValueError(f"Unknown pattern: {request.pattern}")
+            except ValueError as e:
+                self.get_logger().warning(f"Could not set pattern: {e}")
+                return response
+            generations = self.dac.set_paths(paths)
+            response.update_id = self._stamp_update(received_time, generations)
         return response
 
     def _remove_point_callback(self, request, response):
         if self.dac is not None:
-            self.dac.remove_point()
+            received_time = time.monotonic()
+            self._stamp_update(received_time, self.dac.remove_point())
         return response
 
     def _clear_points_callback(self, request, response):
         if self.dac is not None:
-            self.dac.clear_points()
+            received_time = time.monotonic()
+            self._stamp_update(received_time, self.dac.clear_points())
         return response
 
+    def _stamp_update(self, received_time, generations):
+        """Assign a sequence ID to a point update. Returns the ID."""
+        with self._updates_lock:
+            update_id = self._next_update_id
+            self._next_update_id += 1
+            self._pending_updates[update_id] = (received_time, generations)
+            while len(self._pending_updates) > MAX_PENDING_UPDATES:
+                self._pending_updates.popitem(last=False)
+        # The update may have been written before it was stamped
+        self._publish_written_updates()
+        return update_id
+
+    def _publish_written_updates(self):
+        """Publish the pending updates that have been written to every DAC. Called from the
+        playback threads whenever a DAC writes a frame from a newer point set."""
+        written_generations = [dac.written_generation for dac in self.dac.dacs]
+        written_time = max(
+            (dac.written_time for dac in self.dac.dacs if dac.written_time is not None),
+            default=None,
+        )
+        with self._updates_lock:
+            # Updates are written in order, so stop at the first one that hasn't been
+            while self._pending_updates:
+                update_id, (received_time, generations) = next(
+                    iter(self._pending_updates.items())
+                )
+                if any(
+                    written < generation
+                    for written, generation in zip(written_generations, generations)
+                ):
+                    break
+                del self._pending_updates[update_id]
+                msg = UpdateWritten()
+                msg.update_id = update_id
+                msg.received_time = received_time
+                msg.written_time = written_time
+                self.update_written_pub.publish(msg)
+
     def _set_playback_params_callback(self, request, response):
+        if self.dac is not None:
+            # Applied from the next frame if playing
+            self.dac.set_playback_params(
+                request.fps, request.pps, request.transition_duration_ms
+            )
+        self._store_playback_params(request)
+        return response
+
+    def _store_playback_params(self, request):
+        """Store the playback params from request, which playback is started with. Only called
+        once they have been applied to the DAC, so that the two stay in sync.
+
+        :param request: request with fps, pps, transition_duration_ms and chunk_duration_ms
+        """
         self.fps = request.fps
         self.pps = request.pps
         self.transition_duration_ms = request.transition_duration_ms
-        return response
+        # chunk_duration_ms changes how frames are streamed, so it takes effect the next time
+        # playback is started
+        self.chunk_duration_ms = request.chunk_duration_ms
 
     def _play_callback(self, request, response):
         if self.dac is not None:
-            self.dac.play(self.fps, self.pps, self.transition_duration_ms)
-            self._publish_playing()
+            self._play()
         return response
 
     def _stop_callback(self, request, response):
         if self.dac is not None:
-            self.dac.stop()
-            self._publish_playing()
+            self._stop()
+        return response
+
+    def _play(self):
+        self.dac.play(
+            self.fps,
+            self.pps,
+            self.transition_duration_ms,
+            self.prerender_frames,
+            self.chunk_duration_ms,
+        )
+        self._publish_playing()
+
+    def _stop(self):
+        self.dac.stop()
+        self._publish_playing()
+
+    def _laser_command_callback(self, request, response):
+        if self.dac is None:
+            return response
+        received_time = time.monotonic()
+        playback_params = None
+        if request.set_playback_params:
+            playback_params = PlaybackParams(
+                request.fps, request.pps, request.transition_duration_ms
+            )
+        color = None
+        if request.set_color:
+            color = (request.color.r, request.color.g, request.color.b, request.color.i)
+        generations = None
+        # The points, color and playback params are published as one point set, so they take
+        # effect in the same frame
+        if request.set_points:
+            generations = self._set_points(
+                request.points, request.weights, request.colors, color, playback_params
+            )
+            if generations is None:
+                # Don't start playback with stale points, or keep playback params that were
+                # not applied
+                return response
+        elif playback_params is not None:
+            generations = self.dac.set_playback_params(*playback_params, color)
+        elif color is not None:
+            generations = self.dac.set_color(*color)
+        if playback_params is not None:
+            self._store_playback_params(request)
+        if generations is not None:
+            response.update_id = self._stamp_update(received_time, generations)
+        # Start playback after the update, so that the first frame already contains it
+        if request.action == LaserCommand.Request.ACTION_PLAY:
+            self._play()
+        elif request.action == LaserCommand.Request.ACTION_STOP:
+            self._stop()
         return response
 
+    def _pulse_callback(self, request, response):
+        if self.dac is None:
+            return response
+        received_time = time.monotonic()
+        color = (request.color.r, request.color.g, request.color.b, request.color.i)
+        generations = self._set_points(request.points, color=color)
+        if generations is None:
+            return response
+        response.update_id = self._stamp_update(received_time, generations)
+        # The playback threads time the pulse, so this returns right away
+        self.dac.pulse(
+            generations,
+            request.duration_s,
+            callback=functools.partial(self._publish_pulse_done, response.update_id),
+        )
+        if not self.dac.playing:
+            self._play()
+        return response
+
+    def _publish_pulse_done(self, update_id, on_time, off_time, completed):
+        """Called from the playback threads once a pulse has ended."""
+        msg = PulseDone()
+        msg.update_id = update_id
+        msg.completed = completed
+        msg.on_time = on_time or 0.0
+        msg.off_time = off_time or 0.0
+        self.pulse_done_pub.publish(msg)
+
     def _publish_playing(self):
         msg = Bool()
         msg.data = self.dac.playing
         self.playing_pub.publish(msg)
 
+    def _publish_diagnostics(self):
+        for dac_idx, dac in enumerate(self.dac.dacs):
+            msg = PlaybackTelemetry()
+            msg.dac_index = dac_idx
+            msg.playing = dac.playing
+            for name, stats in dac.get_telemetry().items():
+                setattr(msg, name, Histogram(**stats))
+            self.diagnostics_pub.publish(msg)
+
 
 def main(args=None):
     rclpy.init(args=args)
     node = LaserControlNode()
-    rclpy.spin(node)
+    rclpy.spin(node, executor=MultiThreadedExecutor())
     node.destroy_node()
     rclpy.shutdown()
 
@@ -0,0 +1,33 @@
+import pytest
+
+from laser_control.laser_dac import SimDAC
+from laser_control.laser_dac.sim import ETHER_DREAM_FIFO_DEPTH
+
+
+@pytest.fixture
+def dac(request):
+    # Chunked streaming needs a streaming DAC, so it is tested against a simulated FIFO the
+    # size of the Ether Dream's
+    playback_kwargs = (
+        request.getfixturevalue("playback_kwargs")
+        if "playback_kwargs" in request.fixturenames
+        else {}
+    )
+    if playback_kwargs.get("chunk_duration_ms", 0.0) > 0:
+        dac = SimDAC(fifo_depth=ETHER_DREAM_FIFO_DEPTH)
+    else:
+        dac = SimDAC()
+    dac.initialize()
+    dac.connect(0)
+    yield dac
+    dac.stop()
+    dac.close()
+
+
+@pytest.fixture(
+    params=[{}, {"prerender_frames": 2}, {"chunk_duration_ms": 2.0}],
+    ids=["frames", "prerender", "chunked"],
+)
+def playback_kwargs(request):
+    """Keyword arguments to LaserDAC.play for each playback mode."""
+    return request.param
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from laser_control.laser_dac import LaserDACGroup, SimDAC
+
+
+def make_group(num_dacs=2, regions=None):
+    dacs = []
+    for dac_idx in range(num_dacs):
+        dac = SimDAC()
+        dac.connect(dac_idx)
+        dacs.append(dac)
+    return LaserDACGroup(dacs, regions)
+
+
+def test_default_regions_tile_along_x():
+    group = make_group()
+    assert group.regions.tolist() == [[0, 0, 4095, 4095], [4096, 0, 8191, 4095]]
+    assert group.get_bounds() == [(0, 0), (0, 4095), (8191, 4095), (8191, 0)]
+    assert group.in_bounds(5000, 100)
+    assert not group.in_bounds(9000, 100)
+
+
+def test_set_points_routes_points():
+    group = make_group()
+    generations = group.set_points(
+        [(100, 200), (5000, 300), (9000, 0), (4096, 4095)],
+        weights=[1.0, 2.0, 3.0, 4.0],
+        color=(1, 0, 0, 1),
+    )
+    dac0, dac1 = group.dacs
+    assert generations == [1, 1]
+    assert dac0.points.tolist() == [[100.0, 200.0]]
+    # Workspace coordinates are offset into the second DAC's field. The point outside of every
+    # region is ignored
+    assert dac1.points.tolist() == [[904.0, 300.0], [0.0, 4095.0]]
+    assert dac1.point_store.snapshot().weights.tolist() == [2.0, 4.0]
+    assert dac0.color == dac1.color == (1, 0, 0, 1)
+
+
+def test_regions_are_scaled_to_dac_bounds():
+    group = make_group(regions=[(0, 0, 100, 100), (100, 0, 300, 100)])
+    # Overlapping edges go to the first DAC
+    group.set_points([(50, 25), (100, 100), (200, 50)])
+    assert group.dacs[0].points.tolist() == [[2047.5, 1023.75], [4095.0, 4095.0]]
+    assert group.dacs[1].points.tolist() == [[2047.5, 2047.5]]
+
+
+def test_add_and_remove_points():
+    group = make_group()
+    assert group.add_point(100, 100) == [1, 0]
+    assert group.add_point(5000, 100) == [1, 1]
+    assert group.add_points([(200, 200), (6000, 200)]) == [2, 2]
+    # Points are removed in the reverse order they were added
+    assert group.remove_point() == [2, 3]
+    assert group.remove_point() == [3, 3]
+    assert group.dacs[0].points.tolist() == [[100.0, 100.0]]
+    assert group.dacs[1].points.tolist() == [[904.0, 100.0]]
+
+
+def test_set_paths_routes_by_centroid():
+    group = make_group()
+    group.set_paths([[(100, 100), (200, 100)], [(4000, 0), (4500, 0), (5000, 0)]])
+    paths0 = group.dacs[0].point_store.snapshot().paths
+    paths1 = group.dacs[1].point_store.snapshot().paths
+    assert [path.tolist() for path in paths0] == [[[100.0, 100.0], [200.0, 100.0]]]
+    # The vertex left of the second DAC's region is clamped to its edge
+    assert [path.tolist() for path in paths1] == [
+        [[0.0, 0.0], [404.0, 0.0], [904.0, 0.0]]
+    ]
+
+
+def test_set_color_and_playback_params():
+    group = make_group()
+    group.set_points([(100, 100), (5000, 100)])
+    assert group.set_color(0, 1, 0, 1) == [2, 2]
+    assert group.set_playback_params(60, 20000, 1.0) == [3, 3]
+    for dac in group.dacs:
+        assert dac.color == (0, 1, 0, 1)
+        assert tuple(dac.playback_params) == (60, 20000, 1.0)
+
+
+def test_play_and_stop_all_dacs():
+    group = make_group()
+    group.play()
+    try:
+        assert all(dac.playing for dac in group.dacs)
+        generations = group.set_points([(100, 100), (5000, 100)])
+        assert group.wait_for_generations(generations, timeout=2.0)
+    finally:
+        group.close()
+    assert not group.playing
+
+
+class SlowSimDAC(SimDAC):
+    """Takes a while to start playing, like a DAC starting its playback threads."""
+
+    def play(self, *args):
+        time.sleep(0.005)
+        super().play(*args)
+
+
+def test_concurrent_play_and_stop_agree():
+    dacs = [SlowSimDAC() for _ in range(3)]
+    for dac_idx, dac in enumerate(dacs):
+        dac.connect(dac_idx)
+    group = LaserDACGroup(dacs)
+    try:
+        for _ in range(5):
+            play_thread = threading.Thread(target=group.play)
+            play_thread.start()
+            # Stop while the group is partway through starting its DACs
+            time.sleep(0.007)
+            group.stop()
+            play_thread.join()
+            assert len({dac.playing for dac in group.dacs}) == 1
+    finally:
+        group.close()
+
+
+def test_invalid_regions():
+    with pytest.raises(ValueError):
+        make_group(regions=[(0, 0, 100, 100)])
+    with pytest.raises(ValueError):
+        make_group(regions=[(0, 0, 100, 100), (200, 0, 100, 100)])
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from laser_control.laser_dac import SimDAC
+from laser_control.laser_dac.distortion import DistortionCorrection
+
+BOUNDS = [(0, 0), (0, 4095), (4095, 4095), (4095, 0)]
+
+
+def affine_table(rows, cols, scale, offset):
+    """Return a table that maps ideal coordinates over the DAC's bounds to scale * p + offset."""
+    xs = np.linspace(0, 4095, cols)
+    ys = np.linspace(0, 4095, rows)
+    grid = np.stack(np.meshgrid(xs, ys), axis=-1)
+    return grid * scale + offset
+
+
+def test_affine_table_is_interpolated_exactly():
+    correction = DistortionCorrection(
+        affine_table(5, 9, (0.5, 0.25), (100, 200)), (0, 4095), (0, 4095)
+    )
+    points = np.array([(0, 0), (4095, 4095), (1000.5, 3000.25), (17, 4000)])
+    expected = points * (0.5, 0.25) + (100, 200)
+    assert np.allclose(correction.apply(points), expected)
+    # Points outside of the grid are extrapolated from the nearest cell
+    assert np.allclose(correction.apply([(-100, 5000)]), [(50, 1450)])
+
+
+def test_bilinear_interpolation():
+    table = np.zeros((2, 2, 2))
+    table[1, 1] = (100, 100)
+    correction = DistortionCorrection(table, (0, 10), (0, 10))
+    assert correction.apply([(5, 5)]).tolist() == [[25.0, 25.0]]
+    assert correction.apply([(10, 5)]).tolist() == [[50.0, 50.0]]
+    assert correction.apply([(0, 0)]).tolist() == [[0.0, 0.0]]
+
+
+def test_load_npy_and_npz(tmp_path):
+    table = affine_table(3, 3, (1.0, 1.0), (10, -10))
+    np.save(tmp_path / "table.npy", table)
+    correction = DistortionCorrection.load(tmp_path / "table.npy", BOUNDS)
+    assert correction.x_range == (0.0, 4095.0)
+    assert np.allclose(correction.apply([(2000, 2000)]), [(2010, 1990)])
+
+    np.savez(tmp_path / "table.npz", table=table, x_range=(0, 100), y_range=(0, 50))
+    correction = DistortionCorrection.load(tmp_path / "table.npz", BOUNDS)
+    assert correction.x_range == (0.0, 100.0)
+    assert correction.y_range == (0.0, 50.0)
+    assert np.allclose(correction.apply([(50, 25)]), [(2057.5, 2037.5)])
+
+
+def test_invalid_tables():
+    with pytest.raises(ValueError):
+        DistortionCorrection(np.zeros((1, 3, 2)), (0, 1), (0, 1))
+    with pytest.raises(ValueError):
+        DistortionCorrection(np.zeros((3, 3)), (0, 1), (0, 1))
+    with pytest.raises(ValueError):
+        DistortionCorrection(np.zeros((3, 3, 2)), (1, 0), (0, 1))
+
+
+def test_dac_renders_corrected_points():
+    dac = SimDAC()
+    dac.connect(0)
+    dac.set_points([(1000, 2000), (4000, 4000)])
+    dac.set_distortion_correction(
+        DistortionCorrection(
+            affine_table(3, 3, (1.0, 1.0), (50, 50)), (0, 4095), (0, 4095)
+        )
+    )
+    frame = dac._get_frame(dac.point_store.snapshot())
+    # Corrected points are clamped to the DAC's bounds
+    assert sorted(set(zip(frame["x"].tolist(), frame["y"].tolist()))) == [
+        (1050, 2050),
+        (4050, 4050),
+    ]
+    dac.set_points([(4094, 4094)])
+    frame = dac._get_frame(dac.point_store.snapshot())
+    assert set(zip(frame["x"].tolist(), frame["y"].tolist())) == {(4095, 4095)}
+
+    dac.set_distortion_correction(None)
+    frame = dac._get_frame(dac.point_store.snapshot())
+    assert set(zip(frame["x"].tolist(), frame["y"].tolist())) == {(4094, 4094)}
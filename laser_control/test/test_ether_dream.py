@@ -0,0 +1,85 @@
+import ctypes
+import json
+
+import pytest
+
+from laser_control.laser_dac import ether_dream
+from laser_control.laser_dac.ether_dream import EtherDreamDAC, EtherDreamError
+
+
+class FakeLib:
+    """Stands in for the native library, with a fixed set of online DACs."""
+
+    def __init__(self, dac_ids):
+        self.dac_ids = dac_ids
+
+    def etherdream_lib_start(self):
+        pass
+
+    def etherdream_dac_count(self):
+        return len(self.dac_ids)
+
+    def etherdream_get_id(self, idx):
+        return self.dac_ids[idx]
+
+    def etherdream_connect(self, dac_id):
+        return 0
+
+    def etherdream_stop(self, dac_id):
+        pass
+
+    def etherdream_disconnect(self, dac_id):
+        pass
+
+
+@pytest.fixture
+def make_dac(monkeypatch, tmp_path):
+    # Discovery has already run for a full round, and no DACs are connected yet
+    monkeypatch.setattr(
+        EtherDreamDAC, "discovery_start_time", -ether_dream.DISCOVERY_ROUND_S
+    )
+    monkeypatch.setattr(EtherDreamDAC, "connected_dac_ids", {})
+    id_cache_file = tmp_path / "ether_dream_ids.json"
+
+    def make_dac(dac_ids, cached_ids=None):
+        if cached_ids is not None:
+            id_cache_file.write_text(json.dumps(cached_ids))
+        monkeypatch.setattr(
+            ctypes.cdll, "LoadLibrary", lambda lib_file: FakeLib(dac_ids)
+        )
+        return EtherDreamDAC("libEtherDream.so", str(id_cache_file))
+
+    return make_dac
+
+
+def test_connect_in_discovery_order(make_dac):
+    dacs = [make_dac([11, 22, 33]) for _ in range(3)]
+    for dac_idx, dac in enumerate(dacs):
+        dac.connect(dac_idx, timeout=0.0)
+    assert [dac.connected_dac_id for dac in dacs] == [11, 22, 33]
+
+
+def test_cached_ids_are_not_reused(make_dac):
+    # DAC 33 is cached at index 0, so the other indices are assigned the remaining DACs
+    dacs = [make_dac([11, 22, 33], cached_ids={"0": 33}) for _ in range(3)]
+    for dac_idx in (1, 2, 0):
+        dacs[dac_idx].connect(dac_idx, timeout=0.0)
+    assert [dac.connected_dac_id for dac in dacs] == [33, 11, 22]
+
+
+def test_connected_ids_are_not_reused(make_dac):
+    # Without a cache file, DACs connected at other indices are still excluded, even if a DAC
+    # found later comes first in the discovery order
+    first = make_dac([22])
+    first.id_cache_file = None
+    first.connect(0, timeout=0.0)
+    second = make_dac([11, 22])
+    second.id_cache_file = None
+    second.connect(1, timeout=0.0)
+    assert (first.connected_dac_id, second.connected_dac_id) == (22, 11)
+
+
+def test_not_enough_unclaimed_dacs(make_dac):
+    make_dac([11, 22], cached_ids={"0": 11, "1": 22}).connect(0, timeout=0.0)
+    with pytest.raises(EtherDreamError):
+        make_dac([11, 22]).connect(2, timeout=0.0)
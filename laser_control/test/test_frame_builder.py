@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from laser_control.laser_dac.frame_builder import FrameBuilder
+from laser_control.laser_dac.helios import HELIOS_POINT_DTYPE, MAX_COLOR
+
+FIELDS = ["x", "y", "r", "g", "b", "i"]
+
+
+def reference_frame(points, color, fps, pps, transition_duration_ms):
+    """Build a frame laxel by laxel, the way frames were built before FrameBuilder."""
+    laxels_per_transition = round(transition_duration_ms / (1000 / pps))
+    ppf = pps / fps
+    num_points = len(points)
+    laxels_per_point = round(ppf if num_points == 0 else ppf / num_points)
+    if num_points == 0:
+        return [(0, 0, 0, 0, 0, 0)] * laxels_per_point
+    frame = []
+    for point in points:
+        for laxel_idx in range(laxels_per_point):
+            is_transition = num_points > 1 and laxel_idx < laxels_per_transition
+            channels = [
+                0 if is_transition else int(value * MAX_COLOR) for value in color
+            ]
+            frame.append((int(point[0]), int(point[1]), *channels))
+    return frame
+
+
+def as_tuples(frame):
+    return [tuple(int(value) for value in laxel) for laxel in frame[FIELDS].tolist()]
+
+
+@pytest.mark.parametrize(
+    "points",
+    [
+        [],
+        [(100, 200)],
+        [(100, 200), (300, 400), (4095, 0)],
+        [(10.7, 20.2), (0, 4095), (2047.5, 2047.5), (1, 1), (4000, 100)],
+    ],
+)
+@pytest.mark.parametrize(
+    "fps, pps, transition_duration_ms",
+    [(30, 30000, 0.5), (60, 20000, 1.0), (30, 1000, 50.0)],
+)
+def test_build_matches_reference(points, fps, pps, transition_duration_ms):
+    builder = FrameBuilder(HELIOS_POINT_DTYPE, MAX_COLOR)
+    color = (1.0, 0.5, 0.0, 0.1)
+    frame = builder.build(points, color, fps, pps, transition_duration_ms)
+    assert frame.dtype == HELIOS_POINT_DTYPE
+    assert as_tuples(frame) == reference_frame(
+        points, color, fps, pps, transition_duration_ms
+    )
+
+
+def test_build_reuses_buffer():
+    builder = FrameBuilder(HELIOS_POINT_DTYPE, MAX_COLOR)
+    first = builder.build([(100, 200)], (1, 1, 1, 1))
+    second = builder.build([(300, 400)], (1, 1, 1, 1))
+    assert first is second
+    assert as_tuples(second)[0][:2] == (300, 400)
+
+
+def test_allocate_laxels():
+    counts = FrameBuilder.allocate_laxels(1000, [3.0, 1.0, 0.0, 1.0])
+    assert counts.sum() == 1000
+    assert counts.tolist() == [600, 200, 0, 200]
+    # Weights that are all zero are treated as even
+    assert FrameBuilder.allocate_laxels(9, [0.0, 0.0, 0.0]).tolist() == [3, 3, 3]
+    counts = FrameBuilder.allocate_laxels(10, [1.0, 1.0, 1.0])
+    assert counts.sum() == 10
+    assert sorted(counts.tolist()) == [3, 3, 4]
+
+
+def test_build_with_weights_and_colors():
+    builder = FrameBuilder(HELIOS_POINT_DTYPE, MAX_COLOR)
+    colors = np.array([(1.0, 0.0, 0.0, 1.0), (0.0, 1.0, 0.0, 1.0)])
+    frame = builder.build(
+        [(100, 200), (300, 400)],
+        (0.0, 0.0, 1.0, 1.0),
+        fps=30,
+        pps=30000,
+        transition_duration_ms=1.0,
+        weights=[3.0, 1.0],
+        colors=colors,
+    )
+    assert len(frame) == 1000
+    first, second = frame[:750], frame[750:]
+    assert np.all(first["x"] == 100) and np.all(second["x"] == 300)
+    # Each point is blanked for the transition, then lit with its own color
+    assert np.all(first["r"][:30] == 0) and np.all(first["r"][30:] == MAX_COLOR)
+    assert np.all(first["g"] == 0)
+    assert np.all(second["g"][:30] == 0) and np.all(second["g"][30:] == MAX_COLOR)
+    assert np.all(frame["b"] == 0)
+
+
+def test_build_path_repeats_path():
+    builder = FrameBuilder(HELIOS_POINT_DTYPE, MAX_COLOR)
+    positions = np.array([(0.0, 0.0), (10.0, 0.0), (20.0, 0.0)])
+    lit = np.array([False, True, True])
+    frame = builder.build_path(positions, lit, (1, 0, 0, 1), fps=30, pps=250)
+    # 8 laxels per frame fit the path twice, after 2 blanked laxels at the start of the path
+    assert frame["x"].tolist() == [0, 0, 0, 10, 20, 0, 10, 20]
+    assert frame["r"].tolist() == [0, 0, 0, 255, 255, 0, 255, 255]
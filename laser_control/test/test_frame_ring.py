@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+from laser_control.laser_dac.frame_ring import FrameRing
+
+
+def test_frames_are_taken_in_order():
+    ring = FrameRing(capacity=3)
+    assert [ring.put(frame) for frame in ("a", "b", "c")] == [0, 1, 2]
+    assert len(ring) == 3
+    assert ring.get() == (0, "a")
+    assert ring.put("d") == 3
+    assert [ring.get() for _ in range(3)] == [(1, "b"), (2, "c"), (3, "d")]
+    stats = ring.get_stats()
+    assert stats["frames_rendered"] == 4
+    assert stats["frames_taken"] == 4
+    assert stats["last_sequence"] == 3
+    assert stats["queued"] == 0
+
+
+def test_underflow_is_counted_after_first_frame():
+    ring = FrameRing(capacity=2)
+    # Nothing has been played yet, so this is not an underflow
+    assert ring.get() is None
+    assert ring.underflows == 0
+    ring.put("a")
+    ring.get()
+    assert ring.get() is None
+    assert ring.get(timeout=0.01) is None
+    assert ring.underflows == 2
+
+
+def test_overflow_drops_frame():
+    ring = FrameRing(capacity=2)
+    ring.put("a")
+    ring.put("b")
+    assert ring.put("c", timeout=0.01) is None
+    assert ring.overflows == 1
+    assert ring.frames_rendered == 2
+    assert [ring.get(), ring.get()] == [(0, "a"), (1, "b")]
+
+
+def test_flush_drops_queued_frames():
+    ring = FrameRing(capacity=3)
+    ring.put("a")
+    ring.put("b")
+    assert ring.put("c", flush=True) == 2
+    assert ring.frames_flushed == 2
+    assert ring.get() == (2, "c")
+    assert ring.get() is None
+
+
+def test_put_waits_for_free_slot():
+    ring = FrameRing(capacity=1)
+    ring.put("a")
+    sequences = []
+    thread = threading.Thread(
+        target=lambda: sequences.append(ring.put("b", timeout=2.0))
+    )
+    thread.start()
+    assert ring.get(timeout=1.0) == (0, "a")
+    thread.join()
+    assert sequences == [1]
+    assert ring.get() == (1, "b")
+    assert ring.overflows == 0
+
+
+def test_reset():
+    ring = FrameRing(capacity=2)
+    ring.put("a")
+    ring.get()
+    ring.get()
+    ring.put("b", flush=True)
+    ring.reset()
+    assert ring.get_stats() == {
+        "capacity": 2,
+        "queued": 0,
+        "frames_rendered": 0,
+        "frames_taken": 0,
+        "frames_flushed": 0,
+        "underflows": 0,
+        "overflows": 0,
+        "last_sequence": -1,
+    }
+    assert ring.put("c") == 0
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        FrameRing(capacity=0)
+
+
+def test_prerender_ring_counters(dac):
+    dac.play(fps=100, pps=20000, prerender_frames=2)
+    for idx in range(5):
+        generation = dac.set_points([(100 + idx, 200)])
+        assert dac.wait_for_generation(generation, timeout=2.0)
+    stats = dac.get_prerender_stats()
+    assert stats["capacity"] == 2
+    assert stats["frames_taken"] > 0
+    # Frames rendered before a change are flushed rather than played
+    assert stats["frames_flushed"] > 0
+    assert stats["frames_rendered"] >= stats["frames_taken"] + stats["frames_flushed"]
+    dac.stop()
+    assert dac.get_prerender_stats() == {}
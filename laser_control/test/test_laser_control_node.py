@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+rclpy = pytest.importorskip("rclpy")
+pytest.importorskip("laser_control_interfaces")
+
+from laser_control.nodes.laser_control_node import LaserControlNode  # noqa: E402
+from laser_control_interfaces.msg import Color, Point, PointList  # noqa: E402
+from laser_control_interfaces.srv import (  # noqa: E402
+    LaserCommand,
+    Pulse,
+    SetPoints,
+)
+
+OFF = (0.0, 0.0, 0.0, 0.0)
+
+
+@pytest.fixture
+def node():
+    rclpy.init(args=["--ros-args", "-p", "dac_type:=sim", "-p", "prerender_frames:=0"])
+    node = LaserControlNode()
+    yield node
+    node.dac.close()
+    node.destroy_node()
+    rclpy.shutdown()
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_pulse_callback(node):
+    request = Pulse.Request()
+    request.points = [Point(x=100, y=200)]
+    request.color = Color(r=0.0, g=0.0, b=1.0, i=1.0)
+    request.duration_s = 0.2
+    response = node._pulse_callback(request, Pulse.Response())
+
+    dac = node.dac.dacs[0]
+    assert response.update_id > 0
+    assert node.dac.playing
+    assert dac.points.tolist() == [[100.0, 200.0]]
+    assert dac.color == (0.0, 0.0, 1.0, 1.0)
+    assert wait_until(lambda: dac.color == OFF)
+    # The burn point is kept, with the laser off
+    assert dac.points.tolist() == [[100.0, 200.0]]
+
+
+def test_set_points_callback(node):
+    request = SetPoints.Request()
+    request.points = [Point(x=10, y=20), Point(x=30, y=40)]
+    request.weights = [3.0, 1.0]
+    request.colors = [Color(r=1.0, g=0.0, b=0.0, i=1.0)] * 2
+    response = node._set_points_callback(request, SetPoints.Response())
+
+    point_set = node.dac.dacs[0].point_store.snapshot()
+    assert response.update_id > 0
+    assert point_set.points.tolist() == [[10.0, 20.0], [30.0, 40.0]]
+    assert point_set.weights.tolist() == [3.0, 1.0]
+    assert point_set.colors.tolist() == [[1.0, 0.0, 0.0, 1.0]] * 2
+
+
+def test_points_callback(node):
+    msg = PointList()
+    msg.points = [Point(x=50, y=60)]
+    node._points_callback(msg)
+    assert node.dac.dacs[0].points.tolist() == [[50.0, 60.0]]
+
+
+def test_laser_command_callback(node):
+    request = LaserCommand.Request()
+    request.set_points = True
+    request.points = [Point(x=1, y=2)]
+    request.set_color = True
+    request.color = Color(r=0.5, g=0.0, b=0.0, i=1.0)
+    request.action = LaserCommand.Request.ACTION_PLAY
+    response = node._laser_command_callback(request, LaserCommand.Response())
+
+    point_set = node.dac.dacs[0].point_store.snapshot()
+    assert response.update_id > 0
+    assert node.dac.playing
+    assert point_set.points.tolist() == [[1.0, 2.0]]
+    assert point_set.color == (0.5, 0.0, 0.0, 1.0)
+
+    request = LaserCommand.Request()
+    request.action = LaserCommand.Request.ACTION_STOP
+    response = node._laser_command_callback(request, LaserCommand.Response())
+    assert response.update_id == 0
+    assert not node.dac.playing
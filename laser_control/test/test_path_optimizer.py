@@ -0,0 +1,34 @@
+import numpy as np
+
+from laser_control.laser_dac.path_optimizer import PathOptimizer
+from laser_control.laser_dac.point_store import PointStore
+
+
+def test_optimize_shortens_path():
+    points = np.random.default_rng(0).uniform(0, 4095, (50, 2))
+    order = PathOptimizer().optimize(points)
+    assert sorted(order.tolist()) == list(range(50))
+    assert PathOptimizer.path_length(points, order) < 0.5 * PathOptimizer.path_length(
+        points
+    )
+
+
+def test_order_is_cached_until_points_change():
+    store = PointStore()
+    optimizer = PathOptimizer()
+    point_set = store.replace(np.random.default_rng(1).uniform(0, 4095, (20, 2)))
+    order = optimizer.get_order(point_set)
+    # A new color keeps the points, so the order is not recomputed
+    assert optimizer.get_order(store.set_color((1, 0, 0, 1))) is order
+    assert optimizer.get_order(store.replace(point_set.points.copy())) is not order
+
+
+def test_color_change_reuses_rendered_points(dac):
+    dac.set_path_optimization(True)
+    dac.set_points(np.random.default_rng(0).uniform(0, 4095, (50, 2)))
+    frame = dac._get_frame(dac.point_store.snapshot())
+    order = frame[["x", "y"]].copy()
+    dac.set_color(1, 0, 0, 1)
+    frame = dac._get_frame(dac.point_store.snapshot())
+    assert np.array_equal(frame[["x", "y"]], order)
+    assert np.all(frame["g"] == 0) and np.any(frame["r"] == 255)
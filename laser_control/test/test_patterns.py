@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from laser_control.laser_dac.patterns import raster_fill, spiral, sweep
+
+SQUARE = [(0, 0), (100, 0), (100, 100), (0, 100)]
+
+
+def test_raster_fill_square():
+    polylines = raster_fill(SQUARE, 10)
+    # Lines are close together, so they are joined into one polyline traversed back and forth
+    assert len(polylines) == 1
+    vertices = polylines[0]
+    # Each line runs through the middle of a band of spacing height
+    assert vertices.shape == (20, 2)
+    assert np.allclose(vertices[:, 1], np.repeat(np.arange(5, 100, 10), 2))
+    assert vertices[:4, 0].tolist() == [0.0, 100.0, 100.0, 0.0]
+
+
+def test_raster_fill_centers_lines():
+    vertices = raster_fill(SQUARE, 30)[0]
+    assert np.allclose(np.unique(vertices[:, 1]), [5, 35, 65, 95])
+    vertices = raster_fill(SQUARE, 300)[0]
+    assert vertices.tolist() == [[0.0, 50.0], [100.0, 50.0]]
+
+
+def test_raster_fill_angle():
+    vertices = raster_fill(SQUARE, 10, angle=np.pi / 2)[0]
+    # Lines run along y
+    assert np.allclose(vertices[0::2, 0], vertices[1::2, 0])
+    assert np.allclose(np.abs(vertices[0::2, 1] - vertices[1::2, 1]), 100)
+
+
+def test_raster_fill_non_convex():
+    # U shape, where the lines across the arms are split in two
+    outline = [
+        (0, 0),
+        (300, 0),
+        (300, 300),
+        (200, 300),
+        (200, 100),
+        (100, 100),
+        (100, 300),
+        (0, 300),
+    ]
+    polylines = raster_fill(outline, 10)
+    vertices = np.concatenate(polylines)
+    # Nothing is filled inside the notch of the U
+    inside_notch = (
+        (vertices[:, 0] > 100) & (vertices[:, 0] < 200) & (vertices[:, 1] > 100)
+    )
+    assert not inside_notch.any()
+    segments = vertices.reshape(-1, 2, 2)
+    assert np.all(segments[:, 0, 1] == segments[:, 1, 1])
+    lengths = np.abs(segments[:, 1, 0] - segments[:, 0, 0])
+    assert np.allclose(lengths[segments[:, 0, 1] < 100], 300)
+    assert np.allclose(lengths[segments[:, 0, 1] > 100], 100)
+
+
+def test_raster_fill_is_cached_and_read_only():
+    polylines = raster_fill(np.array(SQUARE), 10)
+    assert raster_fill(SQUARE, 10.0) is polylines
+    with pytest.raises(ValueError):
+        polylines[0][0] = (1, 1)
+
+
+def test_raster_fill_invalid():
+    with pytest.raises(ValueError):
+        raster_fill([(0, 0), (1, 1)], 10)
+    with pytest.raises(ValueError):
+        raster_fill(SQUARE, 0)
+
+
+def test_sweep_follows_long_axis():
+    outline = [(0, 0), (20, 0), (20, 400), (0, 400)]
+    polylines = sweep(outline, 5)
+    assert len(polylines) == 1
+    # Strokes run along y, the long axis, so only a few are needed
+    strokes = polylines[0].reshape(-1, 2, 2)
+    assert len(strokes) == 4
+    assert np.allclose(strokes[:, 0, 0], strokes[:, 1, 0])
+    assert np.allclose(np.sort(strokes[:, 0, 0]), [2.5, 7.5, 12.5, 17.5])
+    assert np.allclose(np.abs(strokes[:, 1, 1] - strokes[:, 0, 1]), 400)
+
+
+def test_spiral():
+    polylines = spiral((1000, 2000), 100, 10)
+    assert len(polylines) == 1
+    vertices = polylines[0]
+    assert vertices[0].tolist() == [1000.0, 2000.0]
+    radii = np.linalg.norm(vertices - (1000, 2000), axis=1)
+    assert radii[-1] == pytest.approx(100)
+    assert np.all(np.diff(radii) >= 0)
+    # Vertices are about half the spacing apart, after the first turn
+    steps = np.linalg.norm(np.diff(vertices, axis=0), axis=1)
+    assert np.allclose(steps[len(steps) // 4 :], 5, rtol=0.1)
+    # Turns are the spacing apart: the angle advances 2 pi for every 10 units of radius
+    angles = np.unwrap(np.arctan2(*(vertices - (1000, 2000))[1:, ::-1].T))
+    assert np.allclose(np.diff(radii[1:]) / np.diff(angles), 10 / (2 * np.pi))
+    assert spiral([1000, 2000], 100.0, 10.0) is polylines
+
+
+def test_spiral_invalid():
+    with pytest.raises(ValueError):
+        spiral((0, 0), 100, 0)
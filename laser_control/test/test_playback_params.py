@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+
+from laser_control.laser_dac import PlaybackParams
+
+
+def laxel_rates(recording, x=None):
+    """Return the point rates between subsequent laxels (at the given x position, if any).
+    Intervals that don't match a point rate, such as gaps after an underflow, are left out.
+    """
+    intervals = np.diff(recording["t"])
+    if x is not None:
+        at_x = recording["x"] == x
+        intervals = intervals[at_x[1:] & at_x[:-1]]
+    rates = np.rint(1 / intervals)
+    return rates[np.isin(rates, (10000, 20000))]
+
+
+def test_playback_params_change_while_playing(dac, playback_kwargs):
+    dac.set_points([(100, 200)])
+    dac.play(fps=100, pps=20000, **playback_kwargs)
+    playback_thread = dac.playback_thread
+    assert dac.wait_for_generation(dac.point_store.snapshot().generation, timeout=2.0)
+
+    generation = dac.set_playback_params(100, 10000, 0.5)
+    assert dac.playback_params == PlaybackParams(100, 10000, 0.5)
+    assert dac.wait_for_generation(generation, timeout=2.0)
+    time.sleep(0.05)
+    # Applied without restarting playback
+    assert dac.playing and dac.playback_thread is playback_thread
+    rates = laxel_rates(dac.device.get_recording())
+    # The old rate, then the new one
+    num_old = np.count_nonzero(rates == 20000)
+    assert num_old > 0 and np.all(rates[:num_old] == 20000)
+    assert np.all(rates[num_old:] == 10000) and len(rates) > num_old
+
+
+def test_points_and_playback_params_change_together(dac, playback_kwargs):
+    dac.set_points([(100, 200)])
+    dac.play(fps=100, pps=20000, **playback_kwargs)
+    time.sleep(0.05)
+    generation = dac.set_points(
+        [(300, 400)],
+        color=(0, 1, 0, 1),
+        playback_params=PlaybackParams(100, 10000, 0.5),
+    )
+    assert dac.wait_for_generation(generation, timeout=2.0)
+    time.sleep(0.05)
+    dac.stop()
+    recording = dac.device.get_recording()
+    # Every laxel of the new point is played at the new rate and with the new color
+    rates = laxel_rates(recording, 300)
+    assert len(rates) > 0 and np.all(rates == 10000)
+    assert np.all(recording["g"][recording["x"] == 300] == 255)
+    rates = laxel_rates(recording, 100)
+    assert len(rates) > 0 and np.all(rates == 20000)
@@ -0,0 +1,148 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from laser_control.laser_dac.point_store import PlaybackParams, PointStore
+
+
+def test_replace_publishes_read_only_copy():
+    store = PointStore()
+    points = np.array([(100.0, 200.0), (300.0, 400.0)])
+    point_set = store.replace(points, weights=[2.0, 1.0])
+    points[0] = (0.0, 0.0)
+
+    assert point_set is store.snapshot()
+    assert point_set.points.tolist() == [[100.0, 200.0], [300.0, 400.0]]
+    assert point_set.weights.tolist() == [2.0, 1.0]
+    assert point_set.has_weights and not point_set.has_colors
+    with pytest.raises(ValueError):
+        point_set.points[0] = (1.0, 1.0)
+
+
+def test_generations_increase_on_every_publish():
+    store = PointStore()
+    assert store.snapshot().generation == 0
+    generations = [
+        store.replace([(1, 1)]).generation,
+        store.append((2, 2)).generation,
+        store.extend([(3, 3), (4, 4)]).generation,
+        store.pop().generation,
+        store.set_color((1, 0, 0, 1)).generation,
+        store.update(playback_params=PlaybackParams(60, 20000, 1.0)).generation,
+        store.replace_paths([[(0, 0), (10, 10)]]).generation,
+        store.clear().generation,
+    ]
+    assert generations == list(range(1, 9))
+    # Nothing to clear or pop, so nothing is published
+    assert store.clear().generation == 8
+    assert store.pop().generation == 8
+
+
+def test_snapshots_are_not_modified():
+    store = PointStore()
+    before = store.replace([(1, 1)], colors=[(1, 0, 0, 1)])
+    store.append((2, 2))
+    store.set_color((0, 1, 0, 1))
+    assert before.points.tolist() == [[1.0, 1.0]]
+    assert before.color == (1, 1, 1, 1)
+
+    after = store.snapshot()
+    assert after.points.tolist() == [[1.0, 1.0], [2.0, 2.0]]
+    assert after.colors[0].tolist() == [1.0, 0.0, 0.0, 1.0]
+    assert np.isnan(after.colors[1]).all()
+    assert after.color == (0, 1, 0, 1)
+
+
+def test_update_keeps_arrays():
+    store = PointStore()
+    before = store.replace([(1, 1), (2, 2)])
+    after = store.update(color=(1, 0, 0, 1), playback_params=PlaybackParams(60))
+    assert after.points is before.points
+    assert after.weights is before.weights
+    assert after.colors is before.colors
+    assert after.color == (1, 0, 0, 1)
+    assert after.playback_params == PlaybackParams(60, 30000, 0.5)
+    # Later updates keep the color and params unless they are given
+    assert store.replace([(3, 3)]).color == (1, 0, 0, 1)
+    assert store.set_color((0, 0, 0, 0)).playback_params.fps == 60
+
+
+def test_points_and_paths_replace_each_other():
+    store = PointStore()
+    store.replace([(1, 1)])
+    point_set = store.replace_paths([[(0, 0), (10, 10)], [(20, 20)]])
+    assert len(point_set.points) == 0
+    assert [path.tolist() for path in point_set.paths] == [
+        [[0.0, 0.0], [10.0, 10.0]],
+        [[20.0, 20.0]],
+    ]
+    point_set = store.extend([(1, 1)])
+    assert point_set.paths == ()
+
+
+def test_mismatched_lengths_are_rejected():
+    store = PointStore()
+    with pytest.raises(ValueError):
+        store.replace([(1, 1), (2, 2)], weights=[1.0])
+    assert store.snapshot().generation == 0
+
+
+def test_readers_never_see_partial_updates():
+    store = PointStore()
+    stop = threading.Event()
+    errors = []
+
+    def write():
+        value = 0
+        while not stop.is_set():
+            value += 1
+            num_points = value % 50 + 1
+            store.replace(
+                np.full((num_points, 2), value),
+                weights=np.full(num_points, value),
+                color=(value, 0, 0, 0),
+            )
+
+    def read():
+        last_generation = 0
+        while not stop.is_set():
+            point_set = store.snapshot()
+            value = point_set.color[0]
+            if point_set.generation < last_generation:
+                errors.append("generation went backwards")
+            last_generation = point_set.generation
+            if not (
+                len(point_set.weights) == len(point_set.points)
+                and np.all(point_set.points == value)
+                and np.all(point_set.weights == value)
+            ):
+                errors.append(f"inconsistent point set {point_set.generation}")
+
+    threads = [threading.Thread(target=write), threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert store.snapshot().generation > 0
+
+
+def test_concurrent_appends_are_not_lost():
+    store = PointStore()
+
+    def append():
+        for idx in range(200):
+            store.append((idx, idx))
+
+    threads = [threading.Thread(target=append) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    point_set = store.snapshot()
+    assert len(point_set.points) == 800
+    assert point_set.generation == 800
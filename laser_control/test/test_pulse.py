@@ -0,0 +1,97 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+OFF = (0.0, 0.0, 0.0, 0.0)
+
+
+def wait_for_pulse(dac, generation, duration_s):
+    done = threading.Event()
+    result = []
+
+    def on_done(on_time, off_time, completed):
+        result.append((on_time, off_time, completed))
+        done.set()
+
+    dac.pulse(generation, duration_s, callback=on_done)
+    assert done.wait(duration_s + 2.0)
+    on_time, off_time, completed = result[0]
+    assert completed
+    return on_time, off_time
+
+
+def test_pulse_timing(dac, playback_kwargs):
+    fps = 50
+    dac.play(fps=fps, pps=20000, **playback_kwargs)
+    dac.set_points([(100, 200)], color=OFF)
+    time.sleep(0.05)
+    generation = dac.set_points([(300, 400)], color=(1, 0, 0, 1))
+    on_time, off_time = wait_for_pulse(dac, generation, 0.2)
+    # Pulses are timed at frame granularity, and a stalled playback thread can be off by about
+    # another frame
+    tolerance = 2.5 / fps
+    assert off_time - on_time == pytest.approx(0.2, abs=tolerance)
+    assert dac.color == OFF
+    # The point is kept, with the laser off
+    assert dac.points.tolist() == [[300.0, 400.0]]
+
+    time.sleep(0.05)
+    dac.stop()
+    recording = dac.device.get_recording()
+    lit = recording["t"][recording["i"] > 0]
+    assert lit[-1] - lit[0] == pytest.approx(0.2, abs=tolerance)
+    assert np.all(recording["x"][recording["i"] > 0] == 300)
+
+
+def test_new_pulse_cancels_pending_pulse(dac):
+    dac.play(fps=100, pps=20000)
+    results = []
+    generation = dac.set_points([(100, 200)], color=(1, 0, 0, 1))
+    dac.pulse(generation, 1.0, callback=lambda *times: results.append(times))
+    on_time, off_time = wait_for_pulse(dac, generation, 0.1)
+    assert off_time - on_time == pytest.approx(0.1, abs=0.025)
+    assert len(results) == 1
+    _, off_time, completed = results[0]
+    assert off_time is None and not completed
+
+
+def test_stop_ends_pulse(dac):
+    dac.play(fps=100, pps=20000)
+    results = []
+    generation = dac.set_points([(100, 200)], color=(1, 0, 0, 1))
+    dac.pulse(generation, 10.0, callback=lambda *times: results.append(times))
+    assert dac.wait_for_generation(generation, timeout=2.0)
+    dac.stop()
+    assert dac.color == OFF
+    # The pulse was cut short, so it is reported as not completed
+    assert len(results) == 1
+    on_time, off_time, completed = results[0]
+    assert on_time is not None and off_time is not None and not completed
+
+
+def test_stop_before_laser_on(dac):
+    results = []
+    generation = dac.set_points([(100, 200)], color=(1, 0, 0, 1))
+    dac.pulse(generation, 0.1, callback=lambda *result: results.append(result))
+    dac.stop()
+    assert dac.color == OFF
+    assert len(results) == 1
+    on_time, _, completed = results[0]
+    assert on_time is None and not completed
+
+
+def test_hold_pulse_delays_end(dac):
+    dac.play(fps=100, pps=20000)
+    done = threading.Event()
+    generation = dac.set_points([(100, 200)], color=(1, 0, 0, 1))
+    assert dac.wait_for_generation(generation, timeout=2.0)
+    with dac.hold_pulse():
+        dac_color = dac.color
+        dac.pulse(generation, 0.02, callback=lambda *result: done.set())
+        # The pulse can't advance while held, so the color stays as it was read
+        assert not done.wait(0.1)
+        assert dac.color == dac_color
+    assert done.wait(2.0)
+    assert dac.color == OFF
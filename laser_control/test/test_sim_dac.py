@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+
+from laser_control.laser_dac import SimDAC
+from laser_control.laser_dac.helios import HELIOS_POINT_DTYPE
+from laser_control.laser_dac.sim import ETHER_DREAM_FIFO_DEPTH, SimulatedDevice
+
+
+def make_frame(num_laxels, x=100):
+    frame = np.zeros(num_laxels, dtype=HELIOS_POINT_DTYPE)
+    frame["x"] = x
+    frame["i"] = 255
+    return frame
+
+
+def test_device_replaces_pending_frame():
+    device = SimulatedDevice(write_latency_s=0.0, status_latency_s=0.0)
+    assert device.get_status() == 1
+    assert device.write_frame(make_frame(1000, x=1), 10000) == 1
+    # The first frame plays right away, so the device is ready for the next one
+    assert device.get_status() == 1
+    assert device.write_frame(make_frame(1000, x=2), 10000) == 1
+    assert device.get_status() == 0
+    # The pending frame is replaced before it starts playing
+    assert device.write_frame(make_frame(1000, x=3), 10000) == 1
+    time.sleep(0.15)
+    stats = device.get_stats()
+    assert stats["frames_written"] == 3
+    assert stats["frames_dropped"] == 1
+    assert set(device.get_recording()["x"].tolist()) == {1.0, 3.0}
+
+
+def test_fifo_device_queues_writes():
+    device = SimulatedDevice(fifo_depth=250, write_latency_s=0.0, status_latency_s=0.0)
+    for x in range(1, 4):
+        assert device.get_status() == 1
+        assert device.write_frame(make_frame(100, x=x), 1000) == 1
+    # Writes are never replaced, so the FIFO fills up until the device is no longer ready
+    assert device.get_status() == 0
+    assert 200 < device.get_queued_laxels() <= 300
+    time.sleep(0.35)
+    assert device.get_stats()["frames_dropped"] == 0
+    assert device.get_queued_laxels() == 0
+    assert (
+        device.get_recording()["x"].tolist() == [1.0] * 100 + [2.0] * 100 + [3.0] * 100
+    )
+
+
+def test_chunked_streaming_is_paced():
+    dac = SimDAC(fifo_depth=ETHER_DREAM_FIFO_DEPTH)
+    dac.initialize()
+    dac.connect(0)
+    dac.set_points([(100, 200)])
+    dac.play(fps=30, pps=20000, chunk_duration_ms=2.0)
+    time.sleep(0.3)
+    dac.stop()
+    stats = dac.device.get_stats()
+    dac.close()
+    # Only a few chunks are queued, rather than the whole FIFO (85 ms at this rate)
+    assert stats["laxels_emitted"] > 0
+    assert stats["mean_queue_latency_s"] < 0.02
+
+
+def test_device_rejects_invalid_frames():
+    device = SimulatedDevice(buffer_depth=100, max_pps=1000, write_latency_s=0.0)
+    assert device.write_frame(make_frame(0), 1000) < 0
+    assert device.write_frame(make_frame(101), 1000) < 0
+    assert device.write_frame(make_frame(10), 1001) < 0
+    assert device.get_stats()["frames_rejected"] == 3
+
+
+def test_out_of_bounds_points_are_ignored(dac):
+    assert dac.in_bounds(0, 4095)
+    assert not dac.in_bounds(-1, 100)
+    dac.set_points([(100, 200), (-1, 100), (4096, 4096)])
+    assert dac.points.tolist() == [[100.0, 200.0]]
+    dac.set_points([(-1, 100), (4096, 4096)], clip=True)
+    assert dac.points.tolist() == [[0.0, 100.0], [4095.0, 4095.0]]
+
+
+def test_playback_writes_new_points(dac, playback_kwargs):
+    written = []
+    dac.add_write_callback(lambda generation, written_time: written.append(generation))
+    dac.play(fps=100, pps=20000, transition_duration_ms=0.5, **playback_kwargs)
+    generation = dac.set_points([(100, 200), (300, 400)])
+    assert dac.wait_for_generation(generation, timeout=2.0)
+    assert written[-1] >= generation
+    assert not dac.wait_for_generation(generation + 1, timeout=0.05)
+    time.sleep(0.05)
+    dac.stop()
+    recording = dac.device.get_recording()
+    positions = set(zip(recording["x"].tolist(), recording["y"].tolist()))
+    assert {(100.0, 200.0), (300.0, 400.0)} <= positions
+    assert dac.device.get_stats()["frames_rejected"] == 0
+
+
+def test_stopped_dac_writes_nothing(dac):
+    dac.set_points([(100, 200)])
+    generation = dac.point_store.snapshot().generation
+    assert not dac.wait_for_generation(generation, timeout=0.05)
+    assert dac.device.get_stats()["frames_written"] == 0
+    assert not SimDAC().playing
@@ -0,0 +1,121 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from laser_control.laser_dac import PlaybackParams, SimDAC, SubprocessDAC
+from laser_control.laser_dac.point_store import PointStore
+from laser_control.laser_dac.subprocess_dac import SharedPointSetBlock
+
+OFF = (0.0, 0.0, 0.0, 0.0)
+
+
+class LitFramesSimDAC(SimDAC):
+    """SimDAC that records when each frame was written, and whether the laser was on in it."""
+
+    def __init__(self):
+        super().__init__()
+        self.lit_frames = []
+
+    def _write_frame(self, frame, pps):
+        self.lit_frames.append((time.monotonic(), bool((frame["i"] > 0).any())))
+        super()._write_frame(frame, pps)
+
+    def get_lit_frames(self):
+        return self.lit_frames
+
+
+def test_shared_block_round_trip():
+    block = SharedPointSetBlock(16, multiprocessing.get_context("spawn").Lock())
+    reader = SharedPointSetBlock(16, block.lock, block.name)
+    try:
+        point_set = PointStore().replace_paths(
+            [[(0, 0), (10, 10)], [(20, 20)]], color=(1, 0, 0, 1)
+        )
+        block.write(point_set, pulse_id=3)
+        seq, read_point_set, pulse_id = reader.read()
+        assert pulse_id == 3
+        assert read_point_set.generation == point_set.generation
+        assert read_point_set.color == (1, 0, 0, 1)
+        assert [path.tolist() for path in read_point_set.paths] == [
+            [[0.0, 0.0], [10.0, 10.0]],
+            [[20.0, 20.0]],
+        ]
+        # Nothing new to read until the next write
+        assert reader.read(seq) is None
+        block.write(point_set)
+        assert reader.read(seq)[0] > seq
+        with pytest.raises(ValueError):
+            block.write(PointStore().replace([(1, 1)] * 17))
+    finally:
+        reader.close()
+        block.close()
+        block.unlink()
+
+
+@pytest.fixture
+def dac():
+    dac = SubprocessDAC(LitFramesSimDAC)
+    dac.initialize()
+    dac.connect(0)
+    yield dac
+    dac.close()
+
+
+def test_point_updates_reach_playback_process(dac):
+    dac.play(fps=100, pps=20000)
+    generation = dac.set_points(
+        [(100, 200), (300, 400)],
+        color=(1, 0, 0, 1),
+        playback_params=PlaybackParams(60, 10000, 1.0),
+    )
+    assert dac.wait_for_generation(generation, timeout=2.0)
+    assert dac.written_generation >= generation
+    assert dac.points.tolist() == [[100.0, 200.0], [300.0, 400.0]]
+    assert dac.color == (1, 0, 0, 1)
+    assert dac.playback_params == PlaybackParams(60, 10000, 1.0)
+
+
+def test_pulse_is_not_relit_by_concurrent_updates(dac):
+    dac.play(fps=200, pps=20000)
+    dac.set_points([(100, 200)], color=OFF)
+    time.sleep(0.05)
+
+    stop = threading.Event()
+
+    def update_points():
+        # Updates that don't set a color keep the one from before the pulse ended until the
+        # parent process learns that it has
+        while not stop.is_set():
+            dac.set_points([(100, 200)])
+
+    done = threading.Event()
+    result = []
+    generation = dac.set_points([(100, 200)], color=(1, 0, 0, 1))
+    dac.pulse(
+        generation, 0.1, callback=lambda *times: (result.append(times), done.set())
+    )
+    thread = threading.Thread(target=update_points)
+    thread.start()
+    try:
+        assert done.wait(2.0)
+        time.sleep(0.1)
+    finally:
+        stop.set()
+        thread.join()
+    on_time, off_time, completed = result[0]
+    assert off_time is not None and completed
+    assert dac.color == OFF
+    lit_frames = dac._call("get_lit_frames")
+    assert any(lit for _, lit in lit_frames)
+    assert not any(lit for written_time, lit in lit_frames if written_time >= off_time)
+
+    # A new pulse turns the laser on again
+    done.clear()
+    generation = dac.set_points([(100, 200)], color=(0, 1, 0, 1))
+    dac.pulse(generation, 0.05, callback=lambda *times: done.set())
+    assert done.wait(2.0)
+    lit_frames = dac._call("get_lit_frames")[len(lit_frames) :]
+    assert any(lit for _, lit in lit_frames)
+    assert dac.color == OFF